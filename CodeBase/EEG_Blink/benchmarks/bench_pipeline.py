@@ -0,0 +1,278 @@
+"""Stage-level benchmark of the offline blink-analysis pipeline on seeded synthetic recordings.
+
+Recordings of increasing length and channel count are generated with blinks at known times (the ground truth
+markers), then every stage of the notebook pipeline is timed on its own with the notebook parameters. The
+stages are the src/ functions the notebook imports: bessel_lowpass, detect_blinks_threshold,
+detect_blinks_adaptive_batch (all the channels at once), get_blink_amplitudes, detect_blink_boundaries_baseline,
+extract_blink_segments, extract_rf_features, RF training and inference.
+For each stage the report gives the median / min time of --repeats runs, the throughput (recording samples
+per second), the peak memory of one traced run (tracemalloc: Python objects and NumPy buffers) and, across
+recording lengths, the scaling exponent (slope of log time against log samples: 1 = linear).
+
+The report (JSON) is meant to be kept as a baseline: --baseline prints the time ratio of every stage against
+a previous report and exits with 1 when one is slower by more than --threshold.
+
+Usage: python bench_pipeline.py --durations 60,300,1200 --channels 4,16 --repeats 5 --output pipeline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+from scipy.signal import lfilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from blink_detection import (detect_blinks_threshold, detect_blinks_adaptive_batch,  # noqa: E402
+                             get_blink_amplitudes, detect_blink_boundaries_baseline, extract_blink_segments,
+                             filter_blinks_with_markers)
+from blink_features import extract_rf_features  # noqa: E402
+from marker_matching import match_blinks_to_markers  # noqa: E402
+from parameter_sweep import DEFAULT_PARAMS  # noqa: E402
+from xdf_loader import bessel_lowpass  # noqa: E402
+
+try:
+    from sklearn.ensemble import RandomForestClassifier
+except ImportError:
+    RandomForestClassifier = None
+
+STAGES = ("bessel_lowpass", "detect_blinks_threshold", "detect_blinks_adaptive_batch", "get_blink_amplitudes",
+          "detect_blink_boundaries_baseline", "extract_blink_segments", "extract_rf_features", "rf_train",
+          "rf_predict")
+
+
+def make_recording(duration, n_channels, sfreq=250.0, blink_rate=15.0, blink_channel=3, seed=0):
+    """
+    Synthetic EEG (uV) with blinks at known times.
+
+    Background: white plus red noise, slow drift and 50 Hz line noise. Blinks (300 ms, 150-300 uV on
+    blink_channel, weaker on the others) follow a Poisson process of blink_rate per minute with at least 1 s
+    between two blinks; the markers are the blink peaks plus a few ms of jitter, like the Blink_Index markers
+    of a session.
+
+    Returns:
+        eeg_data (n_samples, n_channels), eeg_timestamps, blink_peaks (sample indices), marker_timestamps
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = int(duration * sfreq)
+    t = np.arange(n_samples) / sfreq
+
+    # Background: white noise plus a leaky integration of it (red noise), roughly 1/f below 10 Hz
+    white = rng.standard_normal((n_samples, n_channels))
+    background = white + lfilter([0.2], [1.0, -0.98], white, axis=0)
+    eeg = 10.0 * background / background.std(axis=0)
+    drift_freqs, drift_phases = rng.uniform(0.02, 0.1, n_channels), rng.uniform(0, 2 * np.pi, n_channels)
+    eeg += 20.0 * np.sin(2 * np.pi * drift_freqs * t[:, None] + drift_phases)
+    eeg += 3.0 * np.sin(2 * np.pi * 50.0 * t[:, None])
+
+    gaps = rng.exponential(60.0 / blink_rate, int(duration * blink_rate / 60 * 2) + 10) + 1.0
+    onsets = (np.cumsum(gaps) * sfreq).astype(int)
+    rise, fall = int(0.1 * sfreq), int(0.2 * sfreq)
+    template = np.concatenate([np.sin(0.5 * np.pi * np.arange(rise) / rise) ** 2,
+                               np.cos(0.5 * np.pi * np.arange(fall) / fall) ** 2])
+    onsets = onsets[onsets + len(template) < n_samples]
+    weights = 0.3 ** np.abs(np.arange(n_channels) - blink_channel)
+    for onset, amplitude in zip(onsets, rng.uniform(150, 300, len(onsets))):
+        eeg[onset:onset + len(template)] += amplitude * np.outer(template, weights)
+
+    blink_peaks = onsets + rise
+    timestamps = 1000.0 + t
+    marker_timestamps = timestamps[blink_peaks] + rng.normal(0, 0.01, len(blink_peaks))
+    return eeg, timestamps, blink_peaks, marker_timestamps
+
+
+class StageTimer:
+    """Calls a stage and records its wall time (or, with trace_memory, its peak traced memory)."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.values = {}
+
+    def __call__(self, stage, func, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = func(*args, **kwargs)
+            value = tracemalloc.get_traced_memory()[1] - before
+        else:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            value = time.perf_counter() - start
+        self.values.setdefault(stage, []).append(value)
+        return result
+
+
+def _blink_features(blink_segments, non_blink_segments):
+    # The notebook extracts the blink and non-blink features in two calls
+    return extract_rf_features(blink_segments), extract_rf_features(non_blink_segments)
+
+
+def _rf_train(X, y, seed=15):
+    rf = RandomForestClassifier(n_estimators=100, random_state=seed)
+    rf.fit(X, y)
+    return rf
+
+
+def run_pipeline(eeg, timestamps, sfreq, marker_timestamps, channel, measure, params=DEFAULT_PARAMS):
+    """The notebook pipeline, every stage called through `measure`. Returns counts for the report."""
+    filtered = measure("bessel_lowpass", bessel_lowpass, eeg, fs=sfreq, cutoff=params["lowpass"], order=4, axis=0)
+    signal = filtered[:, channel]
+    measure("detect_blinks_threshold", detect_blinks_threshold, filtered, timestamps, channel,
+            threshold=params["threshold"], refractory=params["refractory"], sfreq=sfreq)
+    # Like the notebook: every channel in one batched call, then the selected one
+    blink_indices = measure("detect_blinks_adaptive_batch", detect_blinks_adaptive_batch, filtered, fs=sfreq,
+                            win_size=params["window_sec"], th_mult=params["th_mult"],
+                            refractory=params["refractory"], use_abs=params["use_abs"])[channel]
+    measure("get_blink_amplitudes", get_blink_amplitudes, filtered, blink_indices, channel=channel, use_abs=False,
+            fs=sfreq, window_sec=0.12, baseline_sec=0.05, plot_distribution=False, verbose=False)
+    boundaries = measure("detect_blink_boundaries_baseline", detect_blink_boundaries_baseline, signal,
+                         blink_indices, fs=sfreq, search_window=0.5)
+    segments, segment_times = measure("extract_blink_segments", extract_blink_segments, filtered, timestamps,
+                                      channel, boundaries)
+
+    # Labels from the ground truth markers (not a timed stage)
+    blink_segments, _, _, non_blink_segments, _, _ = filter_blinks_with_markers(
+        segments, segment_times, blink_indices, marker_timestamps, tolerance=0.3)
+    X_blinks, X_non_blinks = measure("extract_rf_features", _blink_features, blink_segments, non_blink_segments)
+    X = np.vstack([f for f in (X_blinks, X_non_blinks) if len(f)]) if len(X_blinks) or len(X_non_blinks) else []
+    y = np.array([1] * len(X_blinks) + [0] * len(X_non_blinks))
+    if RandomForestClassifier is not None and len(X):
+        rf = measure("rf_train", _rf_train, X, y)
+        measure("rf_predict", rf.predict, X)
+    return {"detected": len(blink_indices), "segments": len(segments), "blink_segments": len(blink_segments),
+            "recall": float(np.mean(match_blinks_to_markers(marker_timestamps, timestamps[blink_indices],
+                                                            tolerance=0.3)["matched"]))}
+
+
+def bench_recording(duration, n_channels, sfreq=250.0, repeats=5, seed=0):
+    """Time every stage on one synthetic recording, returns the report entry."""
+    eeg, timestamps, blink_peaks, marker_timestamps = make_recording(duration, n_channels, sfreq, seed=seed)
+    channel = min(3, n_channels - 1)
+    n_samples = len(timestamps)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        run_pipeline(eeg, timestamps, sfreq, marker_timestamps, channel, StageTimer())  # warm-up
+        timer = StageTimer()
+        for _ in range(repeats):
+            counts = run_pipeline(eeg, timestamps, sfreq, marker_timestamps, channel, timer)
+        memory = StageTimer(trace_memory=True)
+        tracemalloc.start()
+        try:
+            run_pipeline(eeg, timestamps, sfreq, marker_timestamps, channel, memory)
+        finally:
+            tracemalloc.stop()
+
+    stages = {}
+    for stage in STAGES:
+        if stage not in timer.values:
+            continue
+        times = np.array(timer.values[stage])
+        median = float(np.median(times))
+        stages[stage] = {"median_s": median, "min_s": float(times.min()), "max_s": float(times.max()),
+                         "samples_per_s": n_samples / median if median > 0 else float("inf"),
+                         "peak_memory_mb": memory.values[stage][0] / 2 ** 20}
+    return {"duration": duration, "channels": n_channels, "sfreq": sfreq, "samples": n_samples,
+            "blinks": len(blink_peaks), "repeats": repeats, **counts, "stages": stages}
+
+
+def scaling_exponents(entries):
+    """Slope of log(median time) against log(samples) for every stage, per channel count."""
+    scaling = {}
+    for n_channels in sorted({e["channels"] for e in entries}):
+        group = sorted((e for e in entries if e["channels"] == n_channels), key=lambda e: e["samples"])
+        if len(group) < 2:
+            continue
+        scaling[str(n_channels)] = {}
+        for stage in STAGES:
+            points = [(e["samples"], e["stages"][stage]["median_s"]) for e in group
+                      if stage in e["stages"] and e["stages"][stage]["median_s"] > 0]
+            if len(points) >= 2:
+                x, y = np.log(np.array(points)).T
+                scaling[str(n_channels)][stage] = float(np.polyfit(x, y, 1)[0])
+    return scaling
+
+
+def entry_key(entry):
+    return f"{entry['duration']:g}s/{entry['channels']}ch/{entry['sfreq']:g}Hz"
+
+
+def compare(report, baseline, threshold=0.2):
+    """Print the median time ratio (new / baseline) of every stage, returns the regressions."""
+    old = {entry_key(e): e for e in baseline.get("recordings", [])}
+    regressions = []
+    print(f"\n{'recording':<20} {'stage':<34} {'baseline s':>11} {'new s':>11} {'ratio':>7}")
+    for entry in report["recordings"]:
+        key = entry_key(entry)
+        if key not in old:
+            continue
+        for stage, new in entry["stages"].items():
+            ref = old[key]["stages"].get(stage)
+            if not ref:
+                continue
+            ratio = new["median_s"] / ref["median_s"] if ref["median_s"] > 0 else float("inf")
+            flag = ""
+            # Sub-millisecond stages are too noisy to flag
+            if ratio > 1 + threshold and new["median_s"] - ref["median_s"] > 1e-3:
+                flag = "  [REGRESSION]"
+                regressions.append((key, stage))
+            print(f"{key:<20} {stage:<34} {ref['median_s']:>11.4f} {new['median_s']:>11.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(durations=(60, 300, 1200), channels=(4, 16), sfreq=250.0, repeats=5, seed=0,
+         output="pipeline_report.json", baseline=None, threshold=0.2):
+    if RandomForestClassifier is None:
+        print("[WARN] scikit-learn is not installed: rf_train and rf_predict are skipped")
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"), "host": platform.node(), "platform": platform.platform(),
+            "python": platform.python_version(), "numpy": np.__version__, "seed": seed, "params": DEFAULT_PARAMS,
+        },
+        "recordings": [],
+    }
+    for n_channels in channels:
+        for duration in durations:
+            entry = bench_recording(duration, n_channels, sfreq, repeats, seed)
+            report["recordings"].append(entry)
+            print(f"\n=== {entry_key(entry)}: {entry['samples']} samples, {entry['blinks']} blinks, "
+                  f"{entry['detected']} detected (recall {entry['recall']:.2f}), {entry['segments']} segments ===")
+            for stage, s in entry["stages"].items():
+                print(f"{stage:<34} {s['median_s'] * 1000:10.2f} ms  {s['samples_per_s']:14,.0f} samples/s  "
+                      f"{s['peak_memory_mb']:8.2f} MB")
+    report["scaling"] = scaling_exponents(report["recordings"])
+    if report["scaling"]:
+        print("\nScaling exponent (time ~ samples^k):")
+        for n_channels, stages in report["scaling"].items():
+            print(f"  {n_channels} channels: " + ", ".join(f"{stage} {k:.2f}" for stage, k in stages.items()))
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nReport written to {output}")
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(report, json.load(f), threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--durations", default="60,300,1200", help="Comma-separated recording lengths (s).")
+    parser.add_argument("--channels", default="4,16", help="Comma-separated channel counts.")
+    parser.add_argument("--sfreq", default=250.0, type=float, help="Sampling rate (Hz).")
+    parser.add_argument("--repeats", default=5, type=int, help="Timed runs per recording.")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed of the recordings.")
+    parser.add_argument("--output", default="pipeline_report.json", help="JSON report.")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare with (exit 1 on regression).")
+    parser.add_argument("--threshold", default=0.2, type=float, help="Slowdown flagged as a regression (0.2 = 20%%).")
+    arg = parser.parse_args()
+
+    main(durations=[float(v) for v in arg.durations.split(",")], channels=[int(v) for v in arg.channels.split(",")],
+         sfreq=arg.sfreq, repeats=arg.repeats, seed=arg.seed, output=arg.output, baseline=arg.baseline,
+         threshold=arg.threshold)
@@ -0,0 +1,454 @@
+"""
+Project : Vigilens
+Description : Blink detection functions of blink_detection.ipynb as an importable module, plus a batched,
+              multi-channel engine for the adaptive threshold detector.
+"""
+
+import numpy as np
+
+from marker_matching import match_blinks_to_markers
+
+
+def detect_blinks_threshold(eeg_data: np.ndarray,
+                            eeg_timestamps: np.ndarray,
+                            channel_index: int,
+                            threshold: float = 180.0,
+                            refractory: float = 0.5,
+                            sfreq: float = None):
+    """
+    Detect blinks in EEG using a fixed threshold.
+
+    Args:
+        eeg_data (ndarray): shape (n_samples, n_channels)
+        eeg_timestamps (ndarray): EEG timestamps
+        channel_index (int): channel to analyze
+        threshold (float): threshold in µV
+        refractory (float): refractory period in seconds (to avoid double-counting)
+        sfreq (float): sampling frequency (Hz). If None, inferred from timestamps.
+
+    Returns:
+        blink_times (list): list of blink times in seconds
+        blink_indices (list): sample indices of blinks
+    """
+    signal = eeg_data[:, channel_index]
+
+    # Estimate sampling frequency if not provided
+    if sfreq is None:
+        diffs = np.diff(eeg_timestamps)
+        sfreq = 1.0 / np.median(diffs)
+
+    # Indices where signal > threshold
+    candidate_indices = np.where(signal > threshold)[0]
+
+    blink_indices = []
+    last_idx = -np.inf
+    refractory_samples = int(refractory * sfreq)
+
+    for idx in candidate_indices:
+        if idx - last_idx > refractory_samples:  # new blink
+            blink_indices.append(idx)
+            last_idx = idx
+
+    blink_times = eeg_timestamps[blink_indices]
+
+    return blink_times, blink_indices
+
+
+def robust_threshold(segment: np.ndarray, mult: float = 2) -> float:
+    med = np.median(segment)
+    mad = 1.4826 * np.median(np.abs(segment - med))  # ≈ robust σ
+    return med + mult * mad
+
+
+def detect_blinks_adaptive(eeg, fs, win_size=2.0, th_mult=2, refractory=0.2, use_abs=True):
+    """
+    Detect blinks using adaptive thresholding.
+
+    Args:
+        eeg       : 1D EEG signal (single channel).
+        fs        : Sampling frequency (Hz).
+        win_size  : Window size in seconds for threshold estimation.
+        th_mult   : Threshold multiplier (mean + th_mult*std).
+        refractory: Minimum time (s) between detected blinks.
+        use_abs   : Whether to use absolute amplitude (recommended).
+
+    Returns:
+        blink_indices (list of sample indices)
+    """
+    signal = np.abs(eeg) if use_abs else eeg
+    n_samples = len(signal)
+    win_len = int(win_size * fs)
+    refractory_samples = int(refractory * fs)
+
+    blink_indices = []
+    last_idx = -np.inf
+
+    for start in range(0, n_samples, win_len):
+        end = min(start + win_len, n_samples)
+        segment = signal[start:end]
+
+        threshold = robust_threshold(segment, th_mult)
+        above_th = np.where(segment > threshold)[0]
+
+        if len(above_th) > 0:
+            # Pick max point in this window
+            blink_idx = start + above_th[np.argmax(segment[above_th])]
+
+            # Apply refractory period
+            if blink_idx - last_idx > refractory_samples:
+                blink_indices.append(blink_idx)
+                last_idx = blink_idx
+
+    return blink_indices
+
+
+def _window_peaks(windows: np.ndarray, th_mult: float):
+    """
+    Robust threshold and supra-threshold maximum of every window at once.
+
+    Args:
+        windows : np.ndarray, shape (n_channels, n_windows, win_len)
+
+    Returns:
+        peak_rel : np.ndarray, shape (n_channels, n_windows), offset of the maximum inside its window
+        has_peak : np.ndarray, shape (n_channels, n_windows), False where no sample exceeds the threshold
+    """
+    med = np.median(windows, axis=-1, keepdims=True)
+    mad = 1.4826 * np.median(np.abs(windows - med), axis=-1, keepdims=True)
+    above = windows > med + th_mult * mad
+
+    # argmax over the masked windows returns the first maximum among supra-threshold samples,
+    # which is what np.argmax(segment[above_th]) picks in the loop version
+    masked = np.where(above, windows, -np.inf)
+    return masked.argmax(axis=-1), above.any(axis=-1)
+
+
+def _apply_refractory(candidates: np.ndarray, refractory_samples: int, win_len: int) -> np.ndarray:
+    """
+    Greedy refractory filtering of sorted candidates (at most one per window).
+
+    A candidate is kept when it lies more than `refractory_samples` after the last kept one. When the
+    refractory period is not longer than a window, candidates two apart are always further than that,
+    so only neighbours can conflict and the greedy choice inside a chain of conflicting neighbours
+    keeps every other candidate. Longer refractory periods jump from kept blink to kept blink with
+    searchsorted instead.
+    """
+    if len(candidates) == 0:
+        return candidates
+
+    if refractory_samples <= win_len:
+        conflict = np.diff(candidates) <= refractory_samples
+        chain_start = np.concatenate(([True], ~conflict))
+        starts = np.flatnonzero(chain_start)
+        pos_in_chain = np.arange(len(candidates)) - starts[np.cumsum(chain_start) - 1]
+        return candidates[pos_in_chain % 2 == 0]
+
+    keep = []
+    i = 0
+    while i < len(candidates):
+        keep.append(i)
+        i = np.searchsorted(candidates, candidates[i] + refractory_samples, side='right')
+    return candidates[keep]
+
+
+def detect_blinks_adaptive_batch(eeg, fs, win_size=2.0, th_mult=2, refractory=0.2, use_abs=True):
+    """
+    Vectorized, multi-channel detect_blinks_adaptive.
+
+    Every window threshold is computed in one pass over a (n_channels, n_windows, win_len) view of the
+    channel-major recording and the refractory period is applied with array operations. The result is the
+    same as calling detect_blinks_adaptive on each channel.
+
+    Args:
+        eeg       : np.ndarray
+                    1D (n_samples,) or 2D (n_samples, n_channels) EEG, e.g. eeg_data from load_xdf_data.
+        fs        : Sampling frequency (Hz).
+        win_size  : Window size in seconds for threshold estimation.
+        th_mult   : Threshold multiplier (median + th_mult*MAD).
+        refractory: Minimum time (s) between detected blinks.
+        use_abs   : Whether to use absolute amplitude (recommended).
+
+    Returns:
+        blink_indices : list of np.ndarray
+                        Sample indices of the blinks, one array per channel.
+    """
+    eeg = np.asarray(eeg)
+    signal = np.abs(eeg) if use_abs else eeg
+    if signal.ndim == 1:
+        signal = signal[:, None]
+
+    n_samples, n_channels = signal.shape
+    win_len = int(win_size * fs)
+    refractory_samples = int(refractory * fs)
+
+    # Channel-major copy so that every window is contiguous in memory
+    signal = np.ascontiguousarray(signal.T)
+    n_full = n_samples // win_len
+    peak_idx = np.empty((n_channels, 0), dtype=np.int64)
+    has_peak = np.empty((n_channels, 0), dtype=bool)
+
+    if n_full > 0:
+        windows = signal[:, :n_full * win_len].reshape(n_channels, n_full, win_len)
+        peak_rel, has_peak = _window_peaks(windows, th_mult)
+        peak_idx = peak_rel + np.arange(n_full) * win_len
+
+    if n_full * win_len < n_samples:
+        # Shorter last window, exactly like the loop version
+        tail_rel, tail_has = _window_peaks(signal[:, None, n_full * win_len:], th_mult)
+        peak_idx = np.hstack((peak_idx, tail_rel + n_full * win_len))
+        has_peak = np.hstack((has_peak, tail_has))
+
+    return [_apply_refractory(peak_idx[ch, has_peak[ch]], refractory_samples, win_len)
+            for ch in range(n_channels)]
+
+
+def get_blink_amplitudes(eeg,
+                         blink_indices,
+                         channel: int = 0,
+                         use_abs: bool = True,
+                         fs: float = None,
+                         window_sec: float = 0.10,
+                         baseline_sec: float = 0.05,
+                         timestamps: np.ndarray = None,
+                         plot_distribution: bool = True,
+                         bins: int = 10,
+                         verbose: bool = True):
+    """
+    Return amplitudes of blinks at (or near) given indices.
+
+    Args:
+        eeg               : np.ndarray
+                            1D (n_samples,) or 2D (n_samples, n_channels) EEG.
+        blink_indices     : list[int]
+                            Sample indices of detected blinks.
+        channel           : int
+                            Channel to use if EEG is 2D.
+        use_abs           : bool
+                            If True, report positive magnitudes (|peak - baseline|).
+        fs                : float | None
+                            Sampling rate (Hz). If None, inferred from timestamps.
+        window_sec        : float | None
+                            Full window (±window_sec/2) around each index to search the peak (sec).
+                            If None, use the exact sample at the index.
+        baseline_sec      : float | None
+                            Length of pre-blink baseline window to subtract (sec).
+                            If None or 0, no baseline subtraction.
+        timestamps        : np.ndarray | None
+                            If provided, prints times for each blink.
+        plot_distribution : If True, plot histogram of blink amplitudes (needs matplotlib).
+        bins              : Number of bins for histogram.
+        verbose           : bool
+                            If True, prints per-blink info.
+
+    Returns:
+        amplitudes : list[float]
+                     Blink amplitudes (one per index in range).
+    """
+    if fs is None and timestamps is not None:
+        fs = 1 / np.median(np.diff(timestamps))
+
+    # Select the signal (1D)
+    signal = eeg[:, channel] if getattr(eeg, "ndim", 1) == 2 else np.asarray(eeg)
+
+    n = len(signal)
+    amplitudes = []
+
+    # Convert windows to samples
+    halfwin = 0
+    if window_sec and fs:
+        halfwin = max(0, int(round(window_sec * fs / 2)))
+    basewin = 0
+    if baseline_sec and fs:
+        basewin = max(0, int(round(baseline_sec * fs)))
+
+    for idx in blink_indices:
+        if idx < 0 or idx >= n:
+            continue  # skip out-of-range indices
+
+        # Search a local peak around the blink index (robust to small misalignment)
+        if halfwin > 0:
+            i0 = max(0, idx - halfwin)
+            i1 = min(n, idx + halfwin + 1)
+            seg = signal[i0:i1]
+            # Find the largest-magnitude point in the window
+            local_rel = int(np.argmax(np.abs(seg)))
+            peak_val = seg[local_rel]
+            peak_idx = i0 + local_rel
+        else:
+            peak_val = signal[idx]
+            peak_idx = idx
+
+        # Optional baseline subtraction (pre-blink median)
+        if basewin > 0:
+            b0 = max(0, peak_idx - basewin)
+            b1 = peak_idx
+            baseline = float(np.median(signal[b0:b1])) if b1 > b0 else 0.0
+        else:
+            baseline = 0.0
+
+        amp = peak_val - baseline
+        if use_abs:
+            amp = abs(amp)
+
+        amplitudes.append(float(amp))
+
+        if verbose:
+            t_str = f" @ {timestamps[peak_idx]:.3f}s" if timestamps is not None else ""
+            print(f"Blink at sample {peak_idx}{t_str}: amplitude = {amp:.2f} µV"
+                  f" (peak {peak_val:.2f} µV, baseline {baseline:.2f} µV)")
+
+    # ---- Plot amplitude distribution ----
+    if plot_distribution and len(amplitudes) > 0:
+        import matplotlib.pyplot as plt
+
+        plt.figure(figsize=(8, 4))
+        counts, edges, patches = plt.hist(amplitudes, bins=bins,
+                                          color='skyblue', edgecolor='black', alpha=0.7)
+        plt.xlabel("Blink Amplitude (µV)")
+        plt.ylabel("Count")
+        plt.title("Distribution of Blink Amplitudes")
+        plt.grid(True, linestyle="--", alpha=0.6)
+
+        # modal range (bin with max count)
+        max_bin = np.argmax(counts)
+        modal_range = (edges[max_bin], edges[max_bin+1])
+        plt.axvspan(*modal_range, color='orange', alpha=0.3,
+                    label=f"Modal Range: {modal_range[0]:.1f}–{modal_range[1]:.1f} µV")
+        plt.legend()
+
+        plt.tight_layout()
+        plt.show()
+
+    return amplitudes
+
+
+def detect_blink_boundaries_baseline(eeg, blink_indices, fs, search_window=0.5, tolerance=10):
+    """
+    Detect blink boundaries where signal leaves and returns to baseline.
+
+    Args:
+        eeg            : 1D EEG signal.
+        blink_indices  : List of blink peak indices.
+        fs             : Sampling frequency (Hz).
+        search_window  : Time window (s) around blink to search boundaries.
+        tolerance      : µV tolerance around baseline to consider "returned".
+
+    Returns:
+        boundaries : list of (left_boundary, right_boundary) tuples.
+    """
+    win_len = int(search_window * fs)
+    boundaries = []
+
+    for blink_idx in blink_indices:
+        # define search window
+        start = max(blink_idx - win_len, 0)
+        end   = min(blink_idx + win_len, len(eeg) - 1)
+
+        # baseline = mean before blink (small pre-window)
+        baseline = np.median(eeg[max(0, start-20):start])  
+
+        # --- find left boundary ---
+        left_boundary = start
+        for i in range(blink_idx, start, -1):  # backward from blink peak
+            if abs(eeg[i] - baseline) <= tolerance:
+                left_boundary = i
+                break
+
+        # --- Find negative peak (eyelid opening) after blink ---
+        post_segment = eeg[blink_idx:end]
+        if len(post_segment) > 0:
+            neg_peak_rel = np.argmin(post_segment)
+            neg_peak_idx = blink_idx + neg_peak_rel
+        else:
+            neg_peak_idx = blink_idx
+
+        # --- Right boundary (after return to baseline) ---
+        right_boundary = end
+        for i in range(neg_peak_idx, end):
+            if abs(eeg[i] - baseline) <= tolerance:
+                right_boundary = i
+                break
+
+        boundaries.append((left_boundary, right_boundary))
+
+    return boundaries
+
+
+def extract_blink_segments(eeg_data, eeg_timestamps, channel_index, boundaries):
+    """
+    Extract EEG blink segments and timestamps from given boundaries.
+
+    Args:
+        eeg_data       : np.ndarray, shape (n_samples, n_channels)
+                         Full EEG data.
+        eeg_timestamps : np.ndarray, shape (n_samples,)
+                         Timestamps aligned with eeg_data.
+        channel_index  : int
+                         EEG channel to extract from.
+        boundaries     : list of (left_idx, right_idx) tuples
+                         Boundaries of detected blinks.
+
+    Returns:
+        blink_segments : list of np.ndarray
+                         List of EEG signal segments per blink.
+        blink_times    : list of np.ndarray
+                         List of timestamps for each blink.
+    """
+    blink_segments = []
+    blink_times = []
+
+    signal = eeg_data[:, channel_index]
+
+    for (left, right) in boundaries:
+        if left < 0 or right >= len(signal) or left >= right:
+            continue  # skip invalid boundaries
+
+        segment = signal[left:right+1]
+        times = eeg_timestamps[left:right+1]
+
+        blink_segments.append(segment)
+        blink_times.append(times)
+
+    return blink_segments, blink_times
+
+
+def filter_blinks_with_markers(blink_segments, blink_times, blink_indices,
+                               marker_timestamps, tolerance=0.2, one_to_one=False):
+    """
+    Keep only blink segments whose center index is close to a marker.
+
+    Args:
+        blink_segments   : list of np.ndarray
+                           Segments of detected blinks.
+        blink_times      : list of np.ndarray
+                           Timestamps corresponding to each blink segment.
+        blink_indices    : list or np.ndarray
+                           Indices of detected blink peaks.
+        marker_timestamps: np.ndarray
+                           Ground-truth blink event times (same time scale as eeg_timestamps).
+        tolerance        : float
+                           Allowed time difference (in seconds) between blink index and marker.
+        one_to_one       : bool
+                           If True, each marker can validate one blink only (see match_blinks_to_markers).
+
+    Returns:
+        filtered_segments : list of np.ndarray
+        filtered_times    : list of np.ndarray
+        filtered_indices  : list of int
+    """
+    n = min(len(blink_segments), len(blink_times), len(blink_indices))
+    centers = [t[len(t)//2] for t in blink_times[:n]]  # approximate blink center time
+    matched = match_blinks_to_markers(centers, marker_timestamps, tolerance=tolerance,
+                                      one_to_one=one_to_one)["matched"]
+
+    keep = np.flatnonzero(matched)
+    drop = np.flatnonzero(~matched)
+    filtered_segments = [blink_segments[i] for i in keep]
+    filtered_times = [blink_times[i] for i in keep]
+    filtered_indices = [blink_indices[i] for i in keep]
+
+    non_blink_segment = [blink_segments[i] for i in drop]
+    non_blink_times = [blink_times[i] for i in drop]
+    non_blink_idx = [blink_indices[i] for i in drop]
+
+    return filtered_segments, filtered_times, filtered_indices, non_blink_segment, non_blink_times, non_blink_idx
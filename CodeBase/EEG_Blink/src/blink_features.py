@@ -0,0 +1,150 @@
+"""
+Project : Vigilens
+Description : Random forest features of blink_detection.ipynb (SampEn, SD, RA, RG) as an importable module,
+              with a batched Sample Entropy engine for building training sets from many sessions.
+"""
+
+import numpy as np
+
+
+def sample_entropy(signal, m=2, r=None):
+    """
+    Compute Sample Entropy (SampEn).
+    signal: 1D numpy array
+    m: embedding dimension (default 2)
+    r: tolerance (default 0.2 * std of signal)
+    """
+    N = len(signal)
+    if r is None:
+        r = 0.2 * np.std(signal)
+
+    def _phi(m):
+        x = np.array([signal[i:i+m] for i in range(N-m+1)])
+        C = np.sum([np.sum(np.abs(x - xi).max(axis=1) <= r) - 1 for xi in x])
+        return C / ((N - m + 1) * (N - m))
+
+    return -np.log(_phi(m+1) / _phi(m) + 1e-12)  # small epsilon for stability
+
+
+def _count_template_matches(padded: np.ndarray, r: np.ndarray, m: int):
+    """
+    Count matching template pairs of length m and m+1 for a batch of NaN-padded segments.
+
+    Pairs are enumerated by lag d = j - i, so one pass over the lags covers every pair. For each lag the
+    Chebyshev distance of the m-templates is a running max over m sample differences, and the distance
+    of the (m+1)-templates reuses it with one extra difference. Templates running into the NaN padding
+    never match, which keeps the per-segment template counts right without explicit masks.
+
+    Args:
+        padded : np.ndarray, shape (n_segments, max_len)
+        r      : np.ndarray, shape (n_segments,), tolerance of each segment
+        m      : int, embedding dimension
+
+    Returns:
+        count_m, count_m1 : np.ndarray of int64, number of ordered pairs (i != j) within r
+    """
+    n_segments, max_len = padded.shape
+    r = r[:, None]
+    count_m = np.zeros(n_segments, dtype=np.int64)
+    count_m1 = np.zeros(n_segments, dtype=np.int64)
+
+    with np.errstate(invalid='ignore'):
+        for d in range(1, max_len - m + 1):
+            diff = np.abs(padded[:, d:] - padded[:, :-d])  # |s[i+d] - s[i]|, shape (n, max_len - d)
+            n_templates = max_len - d - m + 1
+
+            cheb = diff[:, :n_templates]
+            for k in range(1, m):
+                cheb = np.maximum(cheb, diff[:, k:k + n_templates])
+            match_m = cheb <= r
+            count_m += match_m.sum(axis=1)
+
+            if n_templates > 1:
+                match_m1 = match_m[:, :-1] & (diff[:, m:m + n_templates - 1] <= r)
+                count_m1 += match_m1.sum(axis=1)
+
+    # Each unordered pair stands for (i, j) and (j, i)
+    return 2 * count_m, 2 * count_m1
+
+
+def sample_entropy_batch(segments, m=2, r=None, group_size=256):
+    """
+    Sample Entropy of many variable-length segments in one call.
+
+    Gives the same numbers as sample_entropy applied to each segment. Segments are sorted by length and
+    processed in groups padded to the longest member, so the work is a loop over lags with whole-group
+    array operations instead of one Python-level comparison per template.
+
+    Args:
+        segments   : list of 1D np.ndarray
+        m          : int
+                     Embedding dimension (default 2).
+        r          : float or None
+                     Tolerance. If None, 0.2 * std of each segment.
+        group_size : int
+                     Number of segments padded and processed together.
+
+    Returns:
+        sampen : np.ndarray, shape (n_segments,), in the order of `segments`
+    """
+    segments = [np.asarray(seg, dtype=np.float64) for seg in segments]
+    lengths = np.array([len(seg) for seg in segments], dtype=np.int64)
+    if r is None:
+        tolerances = np.array([0.2 * np.std(seg) for seg in segments])
+    else:
+        tolerances = np.full(len(segments), r, dtype=np.float64)
+
+    count_m = np.zeros(len(segments), dtype=np.int64)
+    count_m1 = np.zeros(len(segments), dtype=np.int64)
+
+    order = np.argsort(lengths, kind='stable')
+    for start in range(0, len(order), group_size):
+        members = order[start:start + group_size]
+        max_len = lengths[members].max()
+        if max_len <= m:
+            continue
+        padded = np.full((len(members), max_len), np.nan)
+        for row, idx in enumerate(members):
+            padded[row, :lengths[idx]] = segments[idx]
+        count_m[members], count_m1[members] = _count_template_matches(padded, tolerances[members], m)
+
+    N = lengths
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi_m = count_m / ((N - m + 1) * (N - m))
+        phi_m1 = count_m1 / ((N - m) * (N - m - 1))
+        return -np.log(phi_m1 / phi_m + 1e-12)
+
+
+def extract_rf_features(blink_segments):
+    """
+    blink_segments: list of 1D numpy arrays, each representing a blink segment.
+    Returns: list of feature vectors [SampEn, SD, RA, RG]
+    """
+    features = []
+    kept = []
+    for seg in blink_segments:
+        seg = np.array(seg)
+        if len(seg) < 3:  # too short
+            continue
+
+        # Standard deviation
+        sd = np.std(seg)
+
+        # Range of amplitude
+        ra = np.max(seg) - np.min(seg)
+
+        # Rate of grade
+        idx_max, idx_min = np.argmax(seg), np.argmin(seg)
+        denom = abs(idx_max - idx_min) if idx_max != idx_min else 1
+        rg = (np.max(seg) - np.min(seg)) / denom
+
+        features.append([0.0, sd, ra, rg])
+        kept.append(seg)
+
+    if not features:
+        return np.array(features)
+
+    # Sample entropy of all segments at once
+    features = np.array(features)
+    features[:, 0] = sample_entropy_batch(kept)
+    return features
@@ -0,0 +1,94 @@
+"""
+Project : Vigilens
+Description : Matching of detected blinks to LSL markers on sorted timestamps (np.searchsorted), in
+              O((B + M) log M) instead of one full pass over the markers per blink.
+"""
+
+import numpy as np
+
+MATCH_DTYPE = np.dtype([
+    ("blink", np.int64),          # position of the blink in the input
+    ("blink_time", np.float64),
+    ("marker", np.int64),         # position of the nearest (or assigned) marker in the input, -1 if none
+    ("marker_time", np.float64),
+    ("offset", np.float64),       # blink_time - marker_time
+    ("matched", np.bool_),
+])
+
+
+def nearest(reference: np.ndarray, query: np.ndarray):
+    """
+    Nearest element of a sorted reference array for every query time.
+
+    Returns:
+        idx  : np.ndarray of int, position in `reference` (-1 if reference is empty)
+        dist : np.ndarray of float, |reference[idx] - query| (inf if reference is empty)
+    """
+    query = np.asarray(query, dtype=np.float64)
+    if len(reference) == 0:
+        return np.full(len(query), -1, dtype=np.int64), np.full(len(query), np.inf)
+
+    right = np.clip(np.searchsorted(reference, query), 0, len(reference) - 1)
+    left = np.clip(right - 1, 0, len(reference) - 1)
+    d_left = np.abs(reference[left] - query)
+    d_right = np.abs(reference[right] - query)
+    use_left = d_left <= d_right
+    return np.where(use_left, left, right), np.where(use_left, d_left, d_right)
+
+
+def match_blinks_to_markers(blink_times, marker_timestamps, tolerance=0.2, one_to_one=False):
+    """
+    Match every blink to the nearest marker within `tolerance` seconds.
+
+    Args:
+        blink_times       : array of blink times (any order)
+        marker_timestamps : array of marker times (any order)
+        tolerance         : float
+                            Allowed time difference (s) between a blink and a marker.
+        one_to_one        : bool
+                            If True, a marker can be matched by one blink only. Blinks are visited in time
+                            order and take the earliest free marker within tolerance, which gives the
+                            largest possible number of matched pairs.
+
+    Returns:
+        matches : structured np.ndarray of MATCH_DTYPE, one row per blink in input order.
+    """
+    blink_times = np.asarray(blink_times, dtype=np.float64)
+    marker_timestamps = np.asarray(marker_timestamps, dtype=np.float64)
+
+    order = np.argsort(marker_timestamps, kind="stable")
+    sorted_markers = marker_timestamps[order]
+
+    matches = np.zeros(len(blink_times), dtype=MATCH_DTYPE)
+    matches["blink"] = np.arange(len(blink_times))
+    matches["blink_time"] = blink_times
+
+    if len(sorted_markers) == 0:
+        matches["marker"] = -1
+        matches["marker_time"] = np.nan
+    else:
+        idx, dist = nearest(sorted_markers, blink_times)
+        matches["marker"] = order[idx]
+        matches["marker_time"] = sorted_markers[idx]
+        matches["matched"] = dist <= tolerance
+    matches["offset"] = blink_times - matches["marker_time"]
+
+    if one_to_one and len(sorted_markers) and len(blink_times):
+        # Earliest free marker in [t - tolerance, t + tolerance] for every blink in time order
+        first = np.searchsorted(sorted_markers, blink_times - tolerance, side="left")
+        last = np.searchsorted(sorted_markers, blink_times + tolerance, side="right")
+        matched = np.zeros(len(blink_times), dtype=bool)
+        assigned = np.full(len(blink_times), -1, dtype=np.int64)
+        next_free = 0
+        for b in np.argsort(blink_times, kind="stable"):
+            m = max(first[b], next_free)
+            if m < last[b] and abs(sorted_markers[m] - blink_times[b]) <= tolerance:
+                matched[b] = True
+                assigned[b] = m
+                next_free = m + 1
+        matches["matched"] = matched
+        matches["marker"][matched] = order[assigned[matched]]
+        matches["marker_time"][matched] = sorted_markers[assigned[matched]]
+        matches["offset"][matched] = blink_times[matched] - sorted_markers[assigned[matched]]
+
+    return matches
@@ -0,0 +1,229 @@
+"""
+Project : Vigilens
+Description : Parallel parameter sweep for tuning the blink detector.
+
+Every trial runs detection -> detect_blink_boundaries_baseline -> extract_blink_segments ->
+filter_blinks_with_markers on one session and scores the detections against the Blink_Index:* markers.
+Sessions are decoded and filtered once per low-pass value in the parent process and handed to the worker
+processes through shared memory, so the EEG is never pickled per trial.
+
+Example:
+    grid = parameter_grid(lowpass=[5, 10, 15], window_sec=[0.5, 1, 2], th_mult=[1.5, 2, 3],
+                          refractory=[0.2, 0.3, 0.5], use_abs=[False])
+    results = run_sweep(session_files, grid, channel=3)
+    best = summarize(results)[0]
+"""
+
+import csv
+import itertools
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from blink_detection import (detect_blinks_threshold, detect_blinks_adaptive_batch,
+                             detect_blink_boundaries_baseline, extract_blink_segments,
+                             filter_blinks_with_markers)
+from marker_matching import nearest
+from xdf_cache import XdfSessionCache
+
+# Notebook defaults (blink_detection.ipynb, "Providing Arguments")
+DEFAULT_PARAMS = {
+    "detector": "adaptive",
+    "lowpass": 10,
+    "window_sec": 1,
+    "th_mult": 2.0,
+    "refractory": 0.3,
+    "use_abs": False,
+    "threshold": 170.0,
+}
+
+# Worker-side views on the shared sessions, filled by _init_worker
+_SESSIONS = {}
+_SHM_HANDLES = []
+
+
+def parameter_grid(**axes):
+    """
+    Cartesian product of parameter values.
+
+    Example: parameter_grid(th_mult=[1.5, 2], refractory=[0.2, 0.3]) gives 4 configurations. Parameters that
+    are not given keep their DEFAULT_PARAMS value.
+    """
+    keys = list(axes)
+    return [dict(DEFAULT_PARAMS, **dict(zip(keys, values))) for values in itertools.product(*axes.values())]
+
+
+def _to_shared(array: np.ndarray, handles: list):
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    handles.append(shm)
+    return {"shm": shm.name, "shape": array.shape, "dtype": array.dtype.str}
+
+
+def _from_shared(desc: dict):
+    shm = shared_memory.SharedMemory(name=desc["shm"])
+    _SHM_HANDLES.append(shm)
+    return np.ndarray(desc["shape"], dtype=np.dtype(desc["dtype"]), buffer=shm.buf)
+
+
+def _init_worker(descriptors):
+    # Empty pre-blink baselines at the start of a recording warn on every trial
+    warnings.simplefilter("ignore", RuntimeWarning)
+    for key, desc in descriptors.items():
+        _SESSIONS[key] = {
+            "eeg": _from_shared(desc["eeg"]),
+            "timestamps": _from_shared(desc["timestamps"]),
+            "sfreq": desc["sfreq"],
+            "marker_times": desc["marker_times"],
+        }
+
+
+def score_detections(blink_times: np.ndarray, marker_times: np.ndarray, tolerance: float):
+    """
+    Number of markers that have a detected blink within `tolerance` seconds.
+
+    Returns:
+        n_hit_markers : int
+    """
+    _, dist = nearest(np.sort(blink_times), marker_times)
+    return int(np.sum(dist <= tolerance))
+
+
+def run_trial(eeg, timestamps, sfreq, marker_times, params, channel=3, tolerance=0.3, search_window=0.5):
+    """
+    One configuration on one session.
+
+    Returns:
+        dict with n_detected, n_matched (kept by filter_blinks_with_markers), n_markers, n_hit_markers,
+        precision, recall and f1.
+    """
+    signal = eeg[:, channel]
+    if params["detector"] == "threshold":
+        _, blink_indices = detect_blinks_threshold(eeg, timestamps, channel_index=channel,
+                                                   threshold=params["threshold"],
+                                                   refractory=params["refractory"], sfreq=sfreq)
+        blink_indices = np.asarray(blink_indices, dtype=np.int64)
+    else:
+        blink_indices = detect_blinks_adaptive_batch(signal, fs=sfreq, win_size=params["window_sec"],
+                                                     th_mult=params["th_mult"], refractory=params["refractory"],
+                                                     use_abs=params["use_abs"])[0]
+
+    boundaries = detect_blink_boundaries_baseline(signal, blink_indices, fs=sfreq, search_window=search_window)
+    blink_segments, blink_times = extract_blink_segments(eeg, timestamps, channel_index=channel,
+                                                         boundaries=boundaries)
+    filtered = filter_blinks_with_markers(blink_segments, blink_times, blink_indices, marker_times,
+                                          tolerance=tolerance)
+
+    n_detected = len(blink_indices)
+    n_matched = len(filtered[2])
+    n_hit = score_detections(timestamps[blink_indices], marker_times, tolerance)
+    precision = n_matched / n_detected if n_detected else 0.0
+    recall = n_hit / len(marker_times) if len(marker_times) else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+    return {"n_detected": n_detected, "n_matched": n_matched, "n_markers": len(marker_times),
+            "n_hit_markers": n_hit, "precision": precision, "recall": recall, "f1": f1}
+
+
+def _run_task(task):
+    session_key, session_name, params, channel, tolerance, search_window = task
+    s = _SESSIONS[session_key]
+    t0 = time.perf_counter()
+    scores = run_trial(s["eeg"], s["timestamps"], s["sfreq"], s["marker_times"], params,
+                       channel=channel, tolerance=tolerance, search_window=search_window)
+    return dict(session=session_name, **params, **scores, seconds=time.perf_counter() - t0)
+
+
+def run_sweep(sessions, grid, channel=3, tolerance=0.3, search_window=0.5, marker_prefix="Blink_Index:",
+              workers=None, cache: XdfSessionCache = None, verbose=True):
+    """
+    Run every configuration of `grid` on every session in a process pool.
+
+    Args:
+        sessions      : list of str
+                        XDF files.
+        grid          : list of dict
+                        Configurations, e.g. from parameter_grid.
+        channel       : int
+                        EEG channel used for detection.
+        tolerance     : float
+                        Allowed time difference (s) between a blink and a marker.
+        search_window : float
+                        Boundary search window (s) of detect_blink_boundaries_baseline.
+        marker_prefix : str
+                        Markers whose label starts with this are the ground truth.
+        workers       : int or None
+                        Number of worker processes (default: number of CPUs).
+        cache         : XdfSessionCache or None
+                        Cache used to decode and filter the sessions.
+
+    Returns:
+        results : list of dict, one per (session, configuration), with the parameters and the scores.
+    """
+    cache = cache or XdfSessionCache()
+    lowpass_values = sorted({p["lowpass"] for p in grid})
+    handles = []
+    descriptors = {}
+
+    try:
+        for path in sessions:
+            streams = cache.load_streams(path)
+            labels = streams["marker_data"]
+            marker_times = np.asarray(streams["marker_timestamps"], dtype=np.float64)
+            marker_times = np.sort(marker_times[[str(m).startswith(marker_prefix) for m in labels]]) \
+                if len(labels) else np.array([])
+            timestamps = _to_shared(np.asarray(streams["eeg_timestamps"]), handles)
+            for lowpass in lowpass_values:
+                eeg = cache.load_filtered(path, lowpass, streams=streams)
+                descriptors[(path, lowpass)] = {"eeg": _to_shared(eeg, handles), "timestamps": timestamps,
+                                                "sfreq": streams["sfreq"], "marker_times": marker_times}
+
+        tasks = [((path, p["lowpass"]), os.path.basename(path), p, channel, tolerance, search_window)
+                 for p in grid for path in sessions]
+        if verbose:
+            print(f"[INFO] {len(grid)} configurations x {len(sessions)} sessions = {len(tasks)} trials", flush=True)
+
+        results = []
+        start = time.time()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(descriptors,)) as pool:
+            chunksize = max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))
+            for i, result in enumerate(pool.map(_run_task, tasks, chunksize=chunksize)):
+                results.append(result)
+                if verbose and (i + 1) % max(1, len(tasks) // 10) == 0:
+                    print(f"[INFO] {i + 1}/{len(tasks)} trials ({time.time() - start:.1f} s)", flush=True)
+        return results
+    finally:
+        for shm in handles:
+            shm.close()
+            shm.unlink()
+
+
+def summarize(results, sort_by="f1"):
+    """Mean scores of every configuration over the sessions, best first."""
+    score_keys = ("precision", "recall", "f1")
+    groups = {}
+    for r in results:
+        key = tuple((k, r[k]) for k in DEFAULT_PARAMS)
+        groups.setdefault(key, []).append(r)
+
+    summary = []
+    for key, rows in groups.items():
+        entry = dict(key)
+        entry.update({k: float(np.mean([r[k] for r in rows])) for k in score_keys})
+        entry["n_sessions"] = len(rows)
+        summary.append(entry)
+    return sorted(summary, key=lambda e: e[sort_by], reverse=True)
+
+
+def save_results_csv(results, output_csv):
+    if not results:
+        return
+    with open(output_csv, mode="w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"[INFO] Sweep results saved to {output_csv}")
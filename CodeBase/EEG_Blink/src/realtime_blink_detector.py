@@ -0,0 +1,252 @@
+"""
+Project : Vigilens
+Description : Online blink detector. Pulls chunks from the Ganglion EEG LSL stream, low-pass filters them
+              causally (filter state carried across chunks), keeps the robust median/MAD threshold over a
+              ring buffer and pushes every detected blink as a marker on its own LSL outlet.
+"""
+
+import argparse
+import collections
+import time
+
+import numpy as np
+import pylsl
+from scipy.signal import bessel, sosfilt, sosfilt_zi
+
+from blink_detection import robust_threshold
+
+
+# Notebook selected_channel (blink_detection.ipynb), also the default of parameter_sweep
+DEFAULT_CHANNEL = 3
+
+_LSL_DTYPES = {
+    pylsl.cf_float32: np.float32,
+    pylsl.cf_double64: np.float64,
+    pylsl.cf_int32: np.int32,
+    pylsl.cf_int16: np.int16,
+}
+
+
+class StreamingBlinkDetector:
+    """
+    Causal, chunk-by-chunk version of load_xdf_data -> bessel_lowpass -> detect_blinks_adaptive.
+
+    Args:
+        fs         : float
+                     Sampling frequency (Hz).
+        channel    : int
+                     EEG channel used for detection.
+        lowpass    : float
+                     Bessel low-pass cutoff (Hz).
+        order      : int
+                     Bessel filter order.
+        win_size   : float
+                     Length (s) of the ring buffer the threshold is estimated on.
+        th_mult    : float
+                     Threshold multiplier (median + th_mult * MAD).
+        refractory : float
+                     Minimum time (s) between detected blinks.
+        use_abs    : bool
+                     Whether to use absolute amplitude.
+        confirm    : float
+                     Time (s) a local maximum has to stay the largest one before it is reported.
+                     Bounds the detection delay while keeping the peak of the blink rather than the
+                     first bump on its rising edge.
+    """
+
+    def __init__(self, fs: float, channel: int = DEFAULT_CHANNEL, lowpass: float = 10, order: int = 4,
+                 win_size: float = 1.0, th_mult: float = 2.0, refractory: float = 0.3,
+                 use_abs: bool = False, confirm: float = 0.05):
+        wn = lowpass / (0.5 * fs)
+        if not (0 < wn < 1):
+            raise ValueError(f"cutoff must be between 0 and Nyquist: got {lowpass} Hz for fs={fs} Hz")
+
+        self.fs = fs
+        self.channel = channel
+        self.th_mult = th_mult
+        self.use_abs = use_abs
+        self.refractory_samples = int(refractory * fs)
+        self.confirm_samples = max(int(confirm * fs), 1)
+
+        # Causal filter, state is carried from one chunk to the next
+        self.sos = bessel(N=order, Wn=wn, btype='low', analog=False, output='sos', norm='phase')
+        self.zi = None
+
+        # Ring buffer holding the last win_size seconds of the filtered signal
+        self.ring = np.zeros(max(int(win_size * fs), 1))
+        self.ring_pos = 0
+        self.ring_full = False
+
+        # Last two filtered samples of the previous chunk, so that the final sample of a chunk can be
+        # tested for a local maximum once its right neighbour arrives
+        self.prev_values = np.array([])
+        self.prev_times = np.array([])
+        self.n_seen = 0
+        self.last_blink_idx = -np.inf
+        self.pending = None  # (sample_index, timestamp, amplitude) waiting for confirmation
+
+    def _push_ring(self, values: np.ndarray):
+        n = len(values)
+        size = len(self.ring)
+        if n >= size:
+            self.ring[:] = values[-size:]
+            self.ring_pos = 0
+            self.ring_full = True
+            return
+        end = self.ring_pos + n
+        if end <= size:
+            self.ring[self.ring_pos:end] = values
+        else:
+            split = size - self.ring_pos
+            self.ring[self.ring_pos:] = values[:split]
+            self.ring[:end - size] = values[split:]
+        self.ring_full = self.ring_full or end >= size
+        self.ring_pos = end % size
+
+    def process_chunk(self, chunk: np.ndarray, timestamps: np.ndarray):
+        """
+        Filter one chunk and return the blinks it completes.
+
+        Args:
+            chunk      : np.ndarray, shape (n_samples, n_channels) or (n_samples,)
+            timestamps : np.ndarray, shape (n_samples,)
+
+        Returns:
+            blinks : list of (sample_index, timestamp, amplitude) tuples. sample_index counts samples
+                     since the detector was created.
+        """
+        x = chunk[:, self.channel] if chunk.ndim == 2 else chunk
+        if len(x) == 0:
+            return []
+
+        if self.zi is None:
+            # Start the filter in steady state on the first sample to avoid a start-up transient
+            self.zi = sosfilt_zi(self.sos) * x[0]
+        filtered, self.zi = sosfilt(self.sos, x, zi=self.zi)
+
+        signal = np.abs(filtered) if self.use_abs else filtered
+        self._push_ring(signal)
+        buffered = self.ring if self.ring_full else self.ring[:self.ring_pos]
+        threshold = robust_threshold(buffered, self.th_mult)
+
+        # Prepend the tail of the previous chunk so peaks on the chunk edge are not missed
+        values = np.concatenate((self.prev_values, signal))
+        times = np.concatenate((self.prev_times, timestamps))
+        offset = self.n_seen - len(self.prev_values)
+
+        # Local maxima above the threshold (the newest sample waits for the next chunk)
+        peaks = np.where((values[1:-1] > threshold)
+                         & (values[1:-1] >= values[:-2])
+                         & (values[1:-1] > values[2:]))[0] + 1
+
+        blinks = []
+        for p in peaks:
+            idx = offset + p
+            if self.pending is not None:
+                if idx - self.pending[0] < self.confirm_samples:
+                    # Still inside the confirmation window: keep the larger of the two maxima
+                    if values[p] > self.pending[2]:
+                        self.pending = (int(idx), float(times[p]), float(values[p]))
+                    continue
+                blinks.append(self._confirm_pending())
+            if idx - self.last_blink_idx > self.refractory_samples:
+                self.pending = (int(idx), float(times[p]), float(values[p]))
+
+        self.prev_values = values[-2:]
+        self.prev_times = times[-2:]
+        self.n_seen += len(signal)
+
+        if self.pending is not None and (self.n_seen - 1) - self.pending[0] >= self.confirm_samples:
+            blinks.append(self._confirm_pending())
+        return blinks
+
+    def _confirm_pending(self):
+        blink = self.pending
+        self.last_blink_idx = blink[0]
+        self.pending = None
+        return blink
+
+
+def setup_blink_marker_outlet(stream_name='BlinkDetector', stream_type='Markers'):
+    info = pylsl.StreamInfo(name=stream_name, type=stream_type, channel_count=1,
+                            nominal_srate=0, channel_format='string',
+                            source_id='blink_detector_001')
+    outlet = pylsl.StreamOutlet(info)
+    print("LSL blink marker stream created.", flush=True)
+    return outlet
+
+
+def run_detector(stream_type='EEG', channel=DEFAULT_CHANNEL, lowpass=10, win_size=1.0, th_mult=2.0, refractory=0.3,
+                 use_abs=False, report_every=10.0, duration=None):
+    """
+    Resolve the EEG stream, run the detector on every pulled chunk and push blinks to LSL.
+
+    The per-chunk processing time and the sample-to-marker latency (LSL time of the push minus the
+    timestamp of the blink peak sample) are printed every `report_every` seconds.
+    """
+    print(f"Looking for an LSL stream of type '{stream_type}'...", flush=True)
+    streams = pylsl.resolve_byprop('type', stream_type, timeout=30)
+    if not streams:
+        print(f"[ERROR] No stream of type '{stream_type}' found", flush=True)
+        return
+
+    inlet = pylsl.StreamInlet(streams[0], max_buflen=10,
+                              processing_flags=pylsl.proc_clocksync | pylsl.proc_dejitter)
+    info = inlet.info()
+    fs = info.nominal_srate()
+    n_channels = info.channel_count()
+    print(f"Connected to '{info.name()}' ({n_channels} channels @ {fs} Hz)", flush=True)
+
+    detector = StreamingBlinkDetector(fs, channel=channel, lowpass=lowpass, win_size=win_size,
+                                      th_mult=th_mult, refractory=refractory, use_abs=use_abs)
+    outlet = setup_blink_marker_outlet()
+
+    # Preallocated pull buffer (one second of data is far more than one chunk); liblsl copies raw
+    # samples into it, so its dtype has to match the channel format of the stream
+    dtype = _LSL_DTYPES.get(info.channel_format(), np.float32)
+    buffer = np.zeros((max(int(fs), 1), n_channels), dtype=dtype)
+    processing_ms = collections.deque(maxlen=1000)
+    latency_ms = collections.deque(maxlen=1000)
+    n_blinks = 0
+
+    start_time = time.time()
+    last_report = start_time
+    while True:
+        _, timestamps = inlet.pull_chunk(timeout=0.05, max_samples=buffer.shape[0], dest_obj=buffer)
+        if timestamps:
+            t0 = time.perf_counter()
+            blinks = detector.process_chunk(buffer[:len(timestamps)], np.asarray(timestamps))
+            for idx, ts, amp in blinks:
+                outlet.push_sample([f"DetectedBlink:{idx}"], ts)
+                latency_ms.append((pylsl.local_clock() - ts) * 1000)
+                n_blinks += 1
+            processing_ms.append((time.perf_counter() - t0) * 1000)
+
+        now = time.time()
+        if now - last_report >= report_every and processing_ms:
+            msg = (f"[INFO] blinks={n_blinks} chunk processing p50={np.percentile(processing_ms, 50):.2f} ms "
+                   f"max={np.max(processing_ms):.2f} ms")
+            if latency_ms:
+                msg += (f" | sample->marker p50={np.percentile(latency_ms, 50):.1f} ms "
+                        f"p95={np.percentile(latency_ms, 95):.1f} ms")
+            print(msg, flush=True)
+            last_report = now
+
+        if duration and (now - start_time) >= duration:
+            break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--type", default="EEG", help="Type of the EEG stream to consume.")
+    parser.add_argument("--channel", default=DEFAULT_CHANNEL, type=int, help="EEG channel used for detection.")
+    parser.add_argument("--lowpass", default=10.0, type=float, help="Low-pass cutoff (Hz).")
+    parser.add_argument("--window", default=1.0, type=float, help="Threshold window (s).")
+    parser.add_argument("--th-mult", default=2.0, type=float, help="Threshold multiplier.")
+    parser.add_argument("--refractory", default=0.3, type=float, help="Refractory period (s).")
+    parser.add_argument("--use-abs", action="store_true", help="Detect on absolute amplitude.")
+    parser.add_argument("--duration", default=None, type=float, help="Stop after this many seconds.")
+    arg = parser.parse_args()
+
+    run_detector(stream_type=arg.type, channel=arg.channel, lowpass=arg.lowpass, win_size=arg.window,
+                 th_mult=arg.th_mult, refractory=arg.refractory, use_abs=arg.use_abs, duration=arg.duration)
@@ -0,0 +1,302 @@
+"""
+Project : Vigilens
+Description : Extraction of the video clips around detected blinks.
+
+extract_video_segments (OpenCV): all requested windows are merged and the video is decoded once, in order;
+every decoded frame is routed to the writers of all clips that contain it.
+export_segments_ffmpeg (FFmpeg): nearby clips are grouped into one ffmpeg invocation that seeks on the input
+(-ss before -i) and writes one output per clip; the groups run in a bounded pool of ffmpeg processes.
+
+In both cases EEG-clock times are mapped to video frames with a binary search on the Video LSL timestamps.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from marker_matching import nearest
+
+
+def times_to_frames(video_timestamps: np.ndarray, times) -> np.ndarray:
+    """Position of the video frame nearest to each time (same result as np.argmin(np.abs(video_timestamps - t)))."""
+    idx, _ = nearest(np.asarray(video_timestamps, dtype=np.float64), np.atleast_1d(times))
+    return idx
+
+
+def plan_segments(boundary_times, video_timestamps, pre_time=1.0, post_time=2.0, video_frame_idx=None):
+    """
+    Frame range of every blink clip.
+
+    Args:
+        boundary_times   : list of (left_time, right_time) tuples (EEG timestamps, seconds).
+        video_timestamps : numpy array of video timestamps (from LSL).
+        pre_time         : seconds before left boundary.
+        post_time        : seconds after right boundary.
+        video_frame_idx  : numpy array of frame indices of the Video stream, or None if the n-th timestamp is
+                           the n-th frame of the file.
+
+    Returns:
+        segments : list of (segment_number, start_frame, end_frame), end_frame included.
+    """
+    video_timestamps = np.asarray(video_timestamps, dtype=np.float64)
+    if len(boundary_times) == 0 or len(video_timestamps) == 0:
+        return []
+
+    bounds = np.asarray(boundary_times, dtype=np.float64).reshape(-1, 2)
+    start_times = np.maximum(video_timestamps[0], bounds[:, 0] - pre_time)
+    end_times = np.minimum(video_timestamps[-1], bounds[:, 1] + post_time)
+    start_idx = times_to_frames(video_timestamps, start_times)
+    end_idx = times_to_frames(video_timestamps, end_times)
+
+    if video_frame_idx is not None and len(video_frame_idx) == len(video_timestamps):
+        start_idx = np.asarray(video_frame_idx)[start_idx]
+        end_idx = np.asarray(video_frame_idx)[end_idx]
+
+    segments = []
+    for i, (s, e) in enumerate(zip(start_idx, end_idx)):
+        if e <= s:
+            print(f"[WARN] Segment {i}: invalid frame range ({s}, {e}), skipping.")
+            continue
+        segments.append((i, int(s), int(e)))
+    return segments
+
+
+def _merge_ranges(segments):
+    """Union of the clip frame ranges as sorted, non-overlapping (start, end) intervals."""
+    merged = []
+    for _, s, e in sorted(segments, key=lambda seg: seg[1]):
+        if merged and s <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return merged
+
+
+def extract_video_segments(boundary_times, video_timestamps, video_file,
+                           pre_time=1.0, post_time=2.0, video_frame_idx=None,
+                           output_dir=None, fourcc="avc1", max_skip_frames=300):
+    """
+    Extract video segments around EEG blink boundaries in a single decoding pass.
+
+    Args:
+        boundary_times   : list of (left_time, right_time) tuples (EEG timestamps, seconds).
+        video_timestamps : numpy array of video timestamps (from LSL).
+        video_file       : path to video file (e.g., MP4 or AVI).
+        pre_time         : seconds before left boundary.
+        post_time        : seconds after right boundary.
+        video_frame_idx  : numpy array of frame indices of the Video stream (optional).
+        output_dir       : folder for the clips; temporary files if None.
+        fourcc           : codec of the clips (try "mp4v" if avc1 is not available).
+        max_skip_frames  : gaps between clips shorter than this are skipped with grab(), longer ones with a seek.
+
+    Returns:
+        segment_files : list of file paths, in the order of boundary_times (failed clips are left out).
+    """
+    if not isinstance(video_file, (str, os.PathLike)):
+        raise ValueError(f"video_file must be a path string, got {type(video_file)}")
+    video_file = str(video_file)  # make sure OpenCV gets a string
+
+    segments = plan_segments(boundary_times, video_timestamps, pre_time, post_time, video_frame_idx)
+    if not segments:
+        return []
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    cap = cv2.VideoCapture(video_file, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video {video_file}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    codec = cv2.VideoWriter_fourcc(*fourcc)
+
+    pending = sorted(segments, key=lambda seg: seg[1])  # clips not opened yet, by start frame
+    active = {}                                         # segment number -> [writer, path, end_frame, n_frames]
+    written = {}                                        # segment number -> (path, n_frames)
+    next_pending = 0
+
+    def _close(seg_no):
+        writer, path, _, n_frames = active.pop(seg_no)
+        writer.release()
+        written[seg_no] = (path, n_frames)
+
+    position = 0  # index of the next frame cap.read() returns
+    for start, end in _merge_ranges(segments):
+        # Move to the start of the interval: skip short gaps, seek over long ones
+        if start - position > max_skip_frames or start < position:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            position = start
+        while position < start and cap.grab():
+            position += 1
+
+        for frame_idx in range(start, end + 1):
+            ret, frame = cap.read()
+            if not ret:
+                print(f"[WARN] Failed to read frame {frame_idx}")
+                break
+            position = frame_idx + 1
+
+            # Open the writers of the clips starting at this frame
+            while next_pending < len(pending) and pending[next_pending][1] <= frame_idx:
+                seg_no, _, seg_end = pending[next_pending]
+                if output_dir:
+                    out_path = os.path.join(output_dir, f"blink_{seg_no}.mp4")
+                else:
+                    tmpfile = tempfile.NamedTemporaryFile(delete=False, suffix=f"_blink{seg_no}.mp4")
+                    out_path = tmpfile.name
+                    tmpfile.close()
+                active[seg_no] = [cv2.VideoWriter(out_path, codec, fps, (width, height)), out_path, seg_end, 0]
+                next_pending += 1
+
+            for seg_no in list(active):
+                entry = active[seg_no]
+                entry[0].write(frame)
+                entry[3] += 1
+                if frame_idx >= entry[2]:
+                    _close(seg_no)
+        else:
+            continue
+        break  # end of the video reached
+
+    for seg_no in list(active):
+        _close(seg_no)
+    cap.release()
+
+    segment_files = []
+    for seg_no, _, _ in segments:
+        if seg_no not in written:
+            continue
+        out_path, n_frames = written[seg_no]
+        if n_frames == 0:
+            print(f"[ERROR] Segment {seg_no} has no frames → removing file")
+            os.remove(out_path)
+        else:
+            print(f"[OK] Segment {seg_no}: {n_frames} frames written ({out_path})")
+            segment_files.append(out_path)
+    return segment_files
+
+
+def _group_clips(clips, group_gap, max_group):
+    """Consecutive clips (sorted by start) whose gap to the previous clip is below group_gap seconds."""
+    groups = []
+    for clip in sorted(clips, key=lambda c: c["start"]):
+        if groups and len(groups[-1]) < max_group and clip["start"] - groups[-1][-1]["end"] <= group_gap:
+            groups[-1].append(clip)
+        else:
+            groups.append([clip])
+    return groups
+
+
+def _ffmpeg_group_command(group, video_file, video_codec, ffmpeg):
+    seek = group[0]["start"]
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+           "-ss", f"{seek:.6f}", "-i", video_file]
+    for clip in group:
+        cmd += ["-map", "0:v:0", "-ss", f"{clip['start'] - seek:.6f}", "-frames:v", str(clip["n_frames"])]
+        if video_codec == "copy":
+            cmd += ["-c:v", "copy"]
+        else:
+            cmd += ["-c:v", video_codec, "-preset", "ultrafast"]
+        cmd.append(clip["path"])
+    return cmd
+
+
+def _run_ffmpeg_group(group, video_file, video_codec, ffmpeg, timeout):
+    """Run one group and return {segment_number: error message} for the clips that failed."""
+    cmd = _ffmpeg_group_command(group, video_file, video_codec, ffmpeg)
+    error = None
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+        if proc.returncode != 0:
+            stderr = proc.stderr.decode(errors="replace").strip().splitlines()
+            error = stderr[-1] if stderr else f"ffmpeg exited with code {proc.returncode}"
+    except subprocess.TimeoutExpired:
+        error = f"ffmpeg timed out after {timeout} s"
+
+    failures = {}
+    for clip in group:
+        if not os.path.exists(clip["path"]) or os.path.getsize(clip["path"]) == 0:
+            failures[clip["segment"]] = error or "no output written"
+        elif error:
+            failures[clip["segment"]] = error
+    return failures
+
+
+def export_segments_ffmpeg(boundary_times, video_timestamps, video_file, pre_time=1.0, post_time=2.0,
+                           video_frame_idx=None, output_dir="blinks", fps=None, video_codec="libx264",
+                           workers=4, group_gap=5.0, max_group=16, timeout=600, ffmpeg="ffmpeg"):
+    """
+    Export the clips around EEG blink boundaries with FFmpeg, in batches.
+
+    Args:
+        boundary_times   : list of (left_time, right_time) tuples (EEG timestamps, seconds).
+        video_timestamps : numpy array of video timestamps (from LSL).
+        video_file       : path to video file (e.g., MP4 or AVI).
+        pre_time         : seconds before left boundary.
+        post_time        : seconds after right boundary.
+        video_frame_idx  : numpy array of frame indices of the Video stream (optional).
+        output_dir       : folder to save clips.
+        fps              : frame rate of the video file; read with OpenCV if None.
+        video_codec      : encoder of the clips. "copy" avoids re-encoding but every clip then starts on the
+                           keyframe before its window, which is only frame-exact for intra-only codecs (MJPG).
+        workers          : number of ffmpeg processes running at the same time.
+        group_gap        : clips less than this many seconds apart share one ffmpeg invocation.
+        max_group        : maximum number of clips per invocation.
+        timeout          : seconds allowed per invocation.
+        ffmpeg           : ffmpeg executable.
+
+    Returns:
+        segment_files : list of file paths of the exported clips, in the order of boundary_times.
+        failures      : dict {segment number: error message} of the clips that could not be exported.
+    """
+    if shutil.which(ffmpeg) is None:
+        raise FileNotFoundError(f"ffmpeg executable not found: {ffmpeg}")
+    video_file = str(video_file)
+    if fps is None:
+        cap = cv2.VideoCapture(video_file, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Could not open video {video_file}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Frame numbers in the file -> media time. The start is moved a quarter frame earlier so that ffmpeg,
+    # which rounds to its time base, never lands on the previous frame.
+    clips = [{"segment": seg_no,
+              "start": max(0.0, (start - 0.25) / fps),
+              "end": (end + 1) / fps,
+              "n_frames": end - start + 1,
+              "path": os.path.join(output_dir, f"blink_{seg_no}.mp4")}
+             for seg_no, start, end in plan_segments(boundary_times, video_timestamps, pre_time, post_time,
+                                                     video_frame_idx)]
+    groups = _group_clips(clips, group_gap, max_group)
+    print(f"[INFO] Exporting {len(clips)} clips in {len(groups)} ffmpeg invocations")
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for group_failures in pool.map(lambda g: _run_ffmpeg_group(g, video_file, video_codec, ffmpeg, timeout),
+                                       groups):
+            failures.update(group_failures)
+
+    for seg_no, error in sorted(failures.items()):
+        print(f"[ERROR] Segment {seg_no}: {error}")
+    segment_files = [c["path"] for c in sorted(clips, key=lambda c: c["segment"]) if c["segment"] not in failures]
+    return segment_files, failures
+
+
+def extract_video_segments_ffmpeg(boundary_times, video_timestamps, video_file, pre_time=1.0, post_time=2.0,
+                                  output_dir="blinks"):
+    """
+    Extract video segments around blink boundaries using FFmpeg (see export_segments_ffmpeg).
+
+    Returns:
+        list of segment file paths
+    """
+    segment_files, _ = export_segments_ffmpeg(boundary_times, video_timestamps, video_file,
+                                              pre_time=pre_time, post_time=post_time, output_dir=output_dir)
+    return segment_files
@@ -0,0 +1,225 @@
+"""
+Project : Vigilens
+Description : Persistent on-disk cache of decoded and filtered XDF sessions.
+
+Every entry is stored as plain .npy files that are memory-mapped on load, so reopening a session skips
+pyxdf.load_xdf and bessel_lowpass entirely. Entries are keyed by the content hash of the XDF file (plus the
+filter parameters for the filtered signal) and the cache is kept under a size budget by evicting the
+least recently used entries.
+
+Layout of the cache directory:
+    index.json                                  file hashes and per-entry size / last access time
+    <hash>/                                     decoded streams (eeg_data.npy, marker_data.npy, ..., meta.json)
+    <hash>_lp<cutoff>_o<order>_<zp|causal>.npy  filtered EEG
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from xdf_loader import read_xdf_streams, filter_eeg
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vigilens", "xdf")
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+
+_ARRAY_KEYS = ("eeg_data", "eeg_timestamps", "marker_data", "marker_timestamps",
+               "video_frame_idx", "video_timestamps", "video_lsl_timestamps", "video_capture_ms",
+               "video_latency", "video_dropped")
+
+
+def file_content_hash(filepath: str, block_size: int = 1 << 20) -> str:
+    """BLAKE2 hash of the file content."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _entry_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class XdfSessionCache:
+    """
+    Size-bounded LRU cache of decoded and filtered XDF sessions.
+
+    Args:
+        cache_dir : str
+                    Directory holding the cache.
+        max_bytes : int
+                    Size budget; least recently used entries are evicted above it.
+        mmap_mode : str or None
+                    Passed to np.load. 'r' returns read-only memory maps, None loads copies into memory.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, mmap_mode="r"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.mmap_mode = mmap_mode
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, "index.json")
+
+    # ------------------------------------------------------------------ index
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self._index_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"files": {}, "entries": {}}
+
+    def _write_index(self, index: dict):
+        tmp = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self._index_path)
+
+    def _touch(self, index: dict, name: str):
+        index["entries"][name] = {"bytes": _entry_size(os.path.join(self.cache_dir, name)),
+                                  "last_access": time.time()}
+
+    def _evict(self, index: dict, keep: str):
+        entries = index["entries"]
+        # Forget entries whose files were removed by hand
+        for name in [n for n in entries if not os.path.exists(os.path.join(self.cache_dir, n))]:
+            del entries[name]
+
+        total = sum(e["bytes"] for e in entries.values())
+        for name in sorted(entries, key=lambda n: entries[n]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            _remove(os.path.join(self.cache_dir, name))
+            total -= entries.pop(name)["bytes"]
+
+    def file_hash(self, filepath: str, index: dict = None) -> str:
+        """
+        Content hash of an XDF file.
+
+        The hash is remembered together with the file size and modification time, so an unchanged file is
+        not read again.
+        """
+        index = self._read_index() if index is None else index
+        path = os.path.abspath(filepath)
+        st = os.stat(path)
+        known = index["files"].get(path)
+        if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+            return known["hash"]
+
+        digest = file_content_hash(path)
+        index["files"][path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+        return digest
+
+    # ---------------------------------------------------------------- entries
+
+    def load_streams(self, filepath: str) -> dict:
+        """
+        Decoded (unfiltered) streams of an XDF file, see xdf_loader.read_xdf_streams.
+
+        marker_data is returned as a list of labels, every other array as a (memory-mapped) np.ndarray.
+        """
+        index = self._read_index()
+        digest = self.file_hash(filepath, index)
+        entry = os.path.join(self.cache_dir, digest)
+
+        if os.path.isdir(entry) and not all(os.path.exists(os.path.join(entry, f"{key}.npy")) for key in _ARRAY_KEYS):
+            _remove(entry)  # stored by an older version with fewer streams
+        if not os.path.isdir(entry):
+            streams = read_xdf_streams(filepath)
+            tmp = f"{entry}.{os.getpid()}.tmp"
+            os.makedirs(tmp, exist_ok=True)
+            for key in _ARRAY_KEYS:
+                value = streams[key]
+                if key == "marker_data":
+                    value = np.array(value, dtype=str)
+                np.save(os.path.join(tmp, f"{key}.npy"), np.asarray(value))
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump({"sfreq": streams["sfreq"], "source": os.path.abspath(filepath)}, f)
+            try:
+                os.replace(tmp, entry)
+            except OSError:
+                # Another process stored the same session in the meantime
+                _remove(tmp)
+
+        streams = {key: np.load(os.path.join(entry, f"{key}.npy"), mmap_mode=self.mmap_mode)
+                   for key in _ARRAY_KEYS}
+        streams["marker_data"] = streams["marker_data"].tolist()
+        with open(os.path.join(entry, "meta.json"), "r") as f:
+            streams["sfreq"] = json.load(f)["sfreq"]
+
+        self._touch(index, digest)
+        self._evict(index, keep=digest)
+        self._write_index(index)
+        return streams
+
+    def load_filtered(self, filepath: str, lowpass: float = 30, order: int = 4, zero_phase: bool = True,
+                      streams: dict = None) -> np.ndarray:
+        """Low-passed EEG of an XDF file, filtered as in load_xdf_data (see xdf_loader.filter_eeg)."""
+        index = self._read_index()
+        digest = self.file_hash(filepath, index)
+        name = f"{digest}_lp{lowpass:g}_o{order}_{'zp' if zero_phase else 'causal'}.npy"
+        path = os.path.join(self.cache_dir, name)
+
+        if not os.path.exists(path):
+            if streams is None:
+                streams = self.load_streams(filepath)
+                index = self._read_index()
+            filtered = filter_eeg(np.asarray(streams["eeg_data"]), streams["sfreq"], lowpass,
+                                  order=order, zero_phase=zero_phase)
+            tmp = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(tmp, filtered)
+            os.replace(tmp, path)
+
+        filtered = np.load(path, mmap_mode=self.mmap_mode)
+        self._touch(index, name)
+        self._evict(index, keep=name)
+        self._write_index(index)
+        return filtered
+
+    def load_xdf_data(self, filepath: str, lowpass: float = 30, order: int = 4, zero_phase: bool = True):
+        """Cached equivalent of xdf_loader.load_xdf_data, returning the same tuple."""
+        s = self.load_streams(filepath)
+        eeg_filtered = self.load_filtered(filepath, lowpass, order=order, zero_phase=zero_phase, streams=s)
+        return (eeg_filtered, s["eeg_timestamps"], s["sfreq"], s["marker_data"], s["marker_timestamps"],
+                s["video_frame_idx"], s["video_timestamps"])
+
+    def clear(self):
+        """Remove every cached entry."""
+        index = self._read_index()
+        for name in index["entries"]:
+            _remove(os.path.join(self.cache_dir, name))
+        self._write_index({"files": {}, "entries": {}})
+
+
+_default_cache = None
+
+
+def load_xdf_data_cached(filepath: str, lowpass: float = 30, order: int = 4, zero_phase: bool = True,
+                         cache: XdfSessionCache = None):
+    """
+    Drop-in replacement for load_xdf_data backed by an XdfSessionCache (the default one if none is given).
+
+    Returns:
+        eeg_data, eeg_timestamps, sfreq, marker_data, marker_timestamps, video_frame_idx, video_timestamps
+    """
+    global _default_cache
+    if cache is None:
+        if _default_cache is None:
+            _default_cache = XdfSessionCache()
+        cache = _default_cache
+    return cache.load_xdf_data(filepath, lowpass=lowpass, order=order, zero_phase=zero_phase)
@@ -0,0 +1,280 @@
+"""
+Project : Vigilens
+Description : Header-only inventory of XDF recordings.
+
+Only the FileHeader, StreamHeader and StreamFooter chunks are parsed; sample chunks are skipped with a seek
+(after reading their sample count, which is stored right after the stream id). Listing a study is therefore
+bound by the number of chunks, not by the amount of data, and never calls pyxdf.load_xdf.
+
+Usage: python xdf_inventory.py D:/.../EEG_Blink/data --index inventory.json --type EEG
+"""
+
+import argparse
+import glob
+import json
+import os
+import struct
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+# Chunk tags of the XDF specification
+TAG_FILE_HEADER = 1
+TAG_STREAM_HEADER = 2
+TAG_SAMPLES = 3
+TAG_CLOCK_OFFSET = 4
+TAG_BOUNDARY = 5
+TAG_STREAM_FOOTER = 6
+
+DEFAULT_PATTERN = os.path.join("sub-*", "ses-*", "eeg", "*.xdf")
+
+
+def _read_varlen(f):
+    """Variable-length integer: one byte giving the width (1, 4 or 8), then the little-endian value."""
+    width = f.read(1)
+    if not width:
+        raise EOFError
+    n = width[0]
+    if n == 1:
+        return f.read(1)[0]
+    if n == 4:
+        return struct.unpack("<I", f.read(4))[0]
+    if n == 8:
+        return struct.unpack("<Q", f.read(8))[0]
+    raise ValueError(f"Invalid variable-length integer width {n}")
+
+
+def _xml_text(root, tag, default=None):
+    node = root.find(tag)
+    return node.text if node is not None and node.text is not None else default
+
+
+def _parse_stream_header(xml: bytes) -> dict:
+    root = ET.fromstring(xml)
+    labels = [ch.findtext("label", default="") for ch in root.findall("./desc/channels/channel")]
+    return {
+        "name": _xml_text(root, "name", ""),
+        "type": _xml_text(root, "type", ""),
+        "channel_count": int(_xml_text(root, "channel_count", 0)),
+        "nominal_srate": float(_xml_text(root, "nominal_srate", 0)),
+        "channel_format": _xml_text(root, "channel_format", ""),
+        "source_id": _xml_text(root, "source_id", ""),
+        "hostname": _xml_text(root, "hostname", ""),
+        "channel_labels": labels,
+    }
+
+
+def scan_xdf_file(filepath: str) -> dict:
+    """
+    Read the stream headers and footers of one XDF file.
+
+    Returns:
+        dict with the file path, size, mtime and a list of streams. Each stream holds the header fields
+        (name, type, channel_count, nominal_srate, channel_format, source_id, hostname, channel_labels)
+        plus sample_count, first_timestamp, last_timestamp and duration. Without a footer (recording
+        not closed cleanly) the sample count is summed from the sample chunk headers and the duration is
+        estimated from the nominal rate.
+    """
+    st = os.stat(filepath)
+    streams = {}
+    chunk_samples = {}
+    first_sample_ts = {}
+
+    with open(filepath, "rb", buffering=1 << 16) as f:
+        if f.read(4) != b"XDF:":
+            raise ValueError(f"Not an XDF file: {filepath}")
+
+        while True:
+            try:
+                length = _read_varlen(f)
+            except (EOFError, IndexError, struct.error):
+                break  # end of file, possibly truncated
+            start = f.tell()
+            tag_bytes = f.read(2)
+            if len(tag_bytes) < 2:
+                break
+            tag = struct.unpack("<H", tag_bytes)[0]
+
+            if tag == TAG_STREAM_HEADER:
+                stream_id = struct.unpack("<I", f.read(4))[0]
+                header = _parse_stream_header(f.read(length - 6))
+                streams[stream_id] = dict(stream_id=stream_id, sample_count=None, first_timestamp=None,
+                                          last_timestamp=None, **header)
+            elif tag == TAG_STREAM_FOOTER:
+                stream_id = struct.unpack("<I", f.read(4))[0]
+                footer = ET.fromstring(f.read(length - 6))
+                if stream_id in streams:
+                    s = streams[stream_id]
+                    s["sample_count"] = int(_xml_text(footer, "sample_count", 0))
+                    s["first_timestamp"] = float(_xml_text(footer, "first_timestamp", "nan"))
+                    s["last_timestamp"] = float(_xml_text(footer, "last_timestamp", "nan"))
+            elif tag == TAG_SAMPLES:
+                try:
+                    stream_id = struct.unpack("<I", f.read(4))[0]
+                    n_samples = _read_varlen(f)
+                    chunk_samples[stream_id] = chunk_samples.get(stream_id, 0) + n_samples
+                    if stream_id not in first_sample_ts and n_samples > 0:
+                        # First sample of the stream: [timestamp width][timestamp] before the values
+                        if f.read(1) == b"\x08":
+                            first_sample_ts[stream_id] = struct.unpack("<d", f.read(8))[0]
+                except (EOFError, IndexError, struct.error):
+                    break
+
+            f.seek(start + length)
+
+    for stream_id, s in streams.items():
+        if s["sample_count"] is None:
+            s["sample_count"] = chunk_samples.get(stream_id, 0)
+            s["first_timestamp"] = first_sample_ts.get(stream_id)
+            if s["first_timestamp"] is not None and s["nominal_srate"] > 0 and s["sample_count"] > 0:
+                s["last_timestamp"] = s["first_timestamp"] + (s["sample_count"] - 1) / s["nominal_srate"]
+        if s["first_timestamp"] is not None and s["last_timestamp"] is not None:
+            s["duration"] = s["last_timestamp"] - s["first_timestamp"]
+        else:
+            s["duration"] = None
+
+    return {
+        "path": os.path.abspath(filepath),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "streams": [streams[k] for k in sorted(streams)],
+    }
+
+
+class XdfInventory:
+    """
+    Queryable index of the XDF files of a study.
+
+    The index can be saved to JSON; when it is rebuilt, files whose size and modification time did not
+    change are taken from the saved index instead of being scanned again.
+    """
+
+    def __init__(self, files: dict = None):
+        self.files = files or {}
+
+    @classmethod
+    def build(cls, root: str, pattern: str = DEFAULT_PATTERN, index_path: str = None, workers: int = 8):
+        """
+        Scan every file matching `pattern` under `root`.
+
+        Args:
+            root       : str
+                         Study directory (e.g. the EEG_Blink data folder).
+            pattern    : str
+                         Glob relative to root, default sub-*/ses-*/eeg/*.xdf.
+            index_path : str or None
+                         JSON index to reuse and update.
+            workers    : int
+                         Number of files scanned concurrently.
+        """
+        previous = cls.load(index_path).files if index_path and os.path.exists(index_path) else {}
+        paths = [os.path.abspath(p) for p in sorted(glob.glob(os.path.join(root, pattern)))]
+
+        files = {}
+        to_scan = []
+        for path in paths:
+            known = previous.get(path)
+            st = os.stat(path)
+            if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+                files[path] = known
+            else:
+                to_scan.append(path)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, record in zip(to_scan, pool.map(_scan_or_error, to_scan)):
+                files[path] = record
+
+        inventory = cls(files)
+        if index_path:
+            inventory.save(index_path)
+        return inventory
+
+    @classmethod
+    def load(cls, index_path: str):
+        with open(index_path, "r") as f:
+            return cls(json.load(f))
+
+    def save(self, index_path: str):
+        tmp = f"{index_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.files, f, indent=1)
+        os.replace(tmp, index_path)
+
+    def rows(self):
+        """One flat dict per (file, stream)."""
+        for path, record in self.files.items():
+            for s in record.get("streams", []):
+                yield dict(path=path, **s)
+
+    def query(self, stream_type: str = None, name: str = None, min_duration: float = None, path_contains: str = None):
+        """
+        Streams matching every given criterion.
+
+        Args:
+            stream_type   : exact stream type (e.g. 'EEG', 'Markers', 'Video')
+            name          : exact stream name
+            min_duration  : minimum duration in seconds
+            path_contains : substring of the file path (e.g. 'sub-P001')
+        """
+        result = []
+        for row in self.rows():
+            if stream_type is not None and row["type"] != stream_type:
+                continue
+            if name is not None and row["name"] != name:
+                continue
+            if min_duration is not None and (row["duration"] is None or row["duration"] < min_duration):
+                continue
+            if path_contains is not None and path_contains not in row["path"]:
+                continue
+            result.append(row)
+        return result
+
+    def marker_counts(self):
+        """Number of marker samples per file."""
+        counts = {}
+        for row in self.rows():
+            if row["type"] == "Markers" or row["name"] == "Markers":
+                counts[row["path"]] = counts.get(row["path"], 0) + row["sample_count"]
+        return counts
+
+    def errors(self):
+        """Files that could not be scanned, with the reason."""
+        return {path: rec["error"] for path, rec in self.files.items() if "error" in rec}
+
+
+def _scan_or_error(path):
+    try:
+        return scan_xdf_file(path)
+    except Exception as e:
+        st = os.stat(path)
+        return {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "streams": [], "error": str(e)}
+
+
+def print_stream_details(filepath: str):
+    """Same report as provideChannelDetails in the notebook, from the headers only."""
+    for i, s in enumerate(scan_xdf_file(filepath)["streams"]):
+        print(f"\nStream {i+1}: {s['name']}")
+        print(f"  Type: {s['type']}")
+        print(f"  Channel count: {s['channel_count']}")
+        print(f"  Sampling rate: {s['nominal_srate']}")
+        print(f"  Samples: {s['sample_count']}")
+        if s["channel_labels"]:
+            print("  Channels:", s["channel_labels"])
+        else:
+            print("  Channels: (not provided in file)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("root", help="Study directory.")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="Glob relative to root.")
+    parser.add_argument("--index", default=None, help="JSON index to reuse and update.")
+    parser.add_argument("--type", default=None, help="Only list streams of this type.")
+    arg = parser.parse_args()
+
+    inventory = XdfInventory.build(arg.root, pattern=arg.pattern, index_path=arg.index)
+    for row in inventory.query(stream_type=arg.type):
+        duration = f"{row['duration']:.1f} s" if row["duration"] is not None else "?"
+        print(f"{os.path.relpath(row['path'], arg.root)} | {row['name']} ({row['type']}) | "
+              f"{row['channel_count']} ch @ {row['nominal_srate']:g} Hz | {row['sample_count']} samples | {duration}")
+    for path, error in inventory.errors().items():
+        print(f"[ERROR] {path}: {error}")
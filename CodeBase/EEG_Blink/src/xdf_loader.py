@@ -0,0 +1,203 @@
+"""
+Project : Vigilens
+Description : XDF loading and filtering functions of blink_detection.ipynb as an importable module.
+"""
+
+import numpy as np
+from pyxdf import load_xdf
+from scipy.signal import bessel, sosfiltfilt, sosfilt
+
+
+def bessel_lowpass(data: np.ndarray,
+                   fs: float,
+                   cutoff: float,
+                   order: int = 4,
+                   axis: int = 0,
+                   zero_phase: bool = True,
+                   norm: str = "phase"):
+    """
+    Bessel low-pass filter for EEG.
+
+    Args:
+        data       : np.ndarray
+                     1D (n_samples,) or 2D (n_samples, n_channels). Filter runs along `axis`.
+        fs         : float
+                     Sampling frequency (Hz).
+        cutoff     : float
+                     Low-pass cutoff (Hz).
+        order      : int
+                     Filter order (Bessel has gentle roll-off; you may need 4–8).
+        axis       : int
+                     Axis to filter along (0 if shape is [samples, channels]).
+        zero_phase : bool
+                     If True, use forward-backward (zero-phase) filtering via sosfiltfilt.
+                     If False, use causal sosfilt (introduces group delay).
+        norm       : str
+                     'phase' (maximally flat group delay) or 'mag'. Keep 'phase' for EEG.
+
+    Returns:
+        filtered : np.ndarray
+                   Same shape as input.
+    """
+    # Normalize digital cutoff (0..1) at Nyquist
+    wn = cutoff / (0.5 * fs)
+    if not (0 < wn < 1):
+        raise ValueError(f"cutoff must be between 0 and Nyquist: got {cutoff} Hz for fs={fs} Hz")
+
+    # Bessel in SOS form for numerical stability
+    sos = bessel(N=order, Wn=wn, btype='low', analog=False, output='sos', norm=norm)
+
+    if zero_phase:
+        try:
+            return sosfiltfilt(sos, data, axis=axis)
+        except ValueError:
+            # Fallback if still too short: do causal filter (adds delay)
+            return sosfilt(sos, data, axis=axis)
+    else:
+        return sosfilt(sos, data, axis=axis)
+
+
+def _channel_labels(stream) -> list:
+    try:
+        return [ch['label'][0] for ch in stream['info']['desc'][0]['channels'][0]['channel']]
+    except (KeyError, IndexError, TypeError):
+        return []
+
+
+def align_video_timestamps(lsl_timestamps: np.ndarray, capture_ms: np.ndarray) -> np.ndarray:
+    """
+    Frame timestamps on the LSL clock derived from the driver capture times.
+
+    LSL timestamps of the frames are taken when the grab returns, so they carry the scheduling jitter of the
+    recorder. The driver times (CAP_PROP_POS_MSEC) do not, but run on the camera clock. A robust linear fit
+    lsl = a + b * capture maps them onto the LSL clock, which also absorbs the drift between both clocks over
+    long recordings; the offset is then moved to the lower envelope since the grab can only be late. The LSL timestamps are returned unchanged when the driver times are unusable (some
+    webcam backends report 0 or non-increasing values).
+
+    Returns:
+        video_timestamps : np.ndarray, same length as lsl_timestamps
+    """
+    lsl_timestamps = np.asarray(lsl_timestamps, dtype=np.float64)
+    capture_s = np.asarray(capture_ms, dtype=np.float64) / 1000.0
+    if len(capture_s) < 10 or not np.all(np.isfinite(capture_s)) or np.any(np.diff(capture_s) <= 0):
+        return lsl_timestamps
+
+    keep = np.ones(len(capture_s), dtype=bool)
+    for _ in range(2):
+        slope, intercept = np.polyfit(capture_s[keep], lsl_timestamps[keep], 1)
+        residual = lsl_timestamps - (intercept + slope * capture_s)
+        mad = np.median(np.abs(residual - np.median(residual)))
+        keep = np.abs(residual) <= max(3 * 1.4826 * mad, 1e-4)
+    if not 0.99 < slope < 1.01:
+        return lsl_timestamps  # not the same time unit, do not trust the driver clock
+    # Grab delays are never negative: follow the lower envelope of the LSL timestamps, not their mean
+    intercept += np.percentile(residual[keep], 5)
+    return intercept + slope * capture_s
+
+
+def read_video_stream(video_stream) -> dict:
+    """
+    Frame metadata of the Video stream.
+
+    Recordings made with the single-channel stream (frame index only) give empty capture_ms, latency and
+    dropped arrays, and video_timestamps equal to the LSL timestamps.
+
+    Returns:
+        dict with video_frame_idx, video_timestamps (aligned, see align_video_timestamps),
+        video_lsl_timestamps, video_capture_ms, video_latency and video_dropped.
+    """
+    empty = np.array([])
+    video = {"video_frame_idx": empty, "video_timestamps": empty, "video_lsl_timestamps": empty,
+             "video_capture_ms": empty, "video_latency": empty, "video_dropped": empty}
+    if not video_stream:
+        return video
+
+    series = np.asarray(video_stream['time_series'], dtype=np.float64)
+    lsl_timestamps = np.array(video_stream['time_stamps'])
+    if series.ndim == 1:
+        series = series.reshape(-1, 1)
+    labels = _channel_labels(video_stream)
+    columns = {label: series[:, i] for i, label in enumerate(labels) if i < series.shape[1]}
+
+    # Without channel labels the first column is the frame index
+    video["video_frame_idx"] = columns.get("frame_index", series[:, 0]).astype(int)
+    video["video_lsl_timestamps"] = lsl_timestamps
+    video["video_timestamps"] = lsl_timestamps
+    if "capture_time_ms" in columns:
+        video["video_capture_ms"] = columns["capture_time_ms"]
+        video["video_timestamps"] = align_video_timestamps(lsl_timestamps, columns["capture_time_ms"])
+    if "latency" in columns:
+        video["video_latency"] = columns["latency"]
+    if "dropped_frames" in columns:
+        video["video_dropped"] = columns["dropped_frames"].astype(int)
+    return video
+
+
+def read_xdf_streams(filepath: str) -> dict:
+    """
+    Decode the EEG, marker and video streams of an XDF file, without filtering.
+
+    Returns:
+        dict with keys eeg_data (n_samples, n_channels), eeg_timestamps, sfreq, marker_data (list of labels),
+        marker_timestamps and the video keys of read_video_stream.
+    """
+    streams, _ = load_xdf(filepath)
+
+    eeg_stream = next((s for s in streams if s['info']['type'][0] == 'EEG'), None)
+    if eeg_stream is None:
+        raise ValueError("No EEG stream found.")
+
+    marker_stream = next(
+        (s for s in streams if s['info']['type'][0] == 'Markers' or s['info']['name'][0] == 'Markers'),
+        None
+    )
+
+    marker_data = []
+    marker_timestamps = np.array([])
+
+    if marker_stream:
+        marker_data = [m[0] for m in marker_stream['time_series']]
+        marker_timestamps = np.array(marker_stream['time_stamps'])
+
+    # --- Video (frame index + timestamps) ---
+    # Multi-camera recordings have one Video stream per camera: take the first one (video_stream_001)
+    video_streams = sorted(
+        (s for s in streams if s['info']['type'][0] == 'Video' or s['info']['name'][0] == 'VideoFrames'),
+        key=lambda s: (s['info'].get('source_id') or [''])[0]
+    )
+    video_stream = video_streams[0] if video_streams else None
+
+    return {
+        "eeg_data": np.array(eeg_stream['time_series']),
+        "eeg_timestamps": np.array(eeg_stream['time_stamps']),
+        "sfreq": float(eeg_stream['info']['nominal_srate'][0]),
+        "marker_data": marker_data,
+        "marker_timestamps": marker_timestamps,
+        **read_video_stream(video_stream),
+    }
+
+
+def filter_eeg(eeg_data: np.ndarray, sfreq: float, lowpass: float, order: int = 4, zero_phase: bool = True):
+    """Low-pass the EEG the way load_xdf_data does (recordings of 15 samples or less are left as they are)."""
+    if eeg_data.shape[0] > 15:
+        return bessel_lowpass(eeg_data, fs=sfreq, cutoff=lowpass, order=order, axis=0, zero_phase=zero_phase)
+    return eeg_data
+
+
+def load_xdf_data(filepath: str, lowpass: float = 30):
+    """
+    Load EEG, marker and video timestamps streams from an XDF file.
+
+    Returns:
+        eeg_data: np.ndarray, shape (n_samples, n_channels)
+        eeg_timestamps: np.ndarray
+        marker_data: list of labels
+        marker_timestamps: np.ndarray
+        video_frame_idx  : np.ndarray (frame indices)
+        video_timestamps : np.ndarray (timestamps for each frame)
+    """
+    s = read_xdf_streams(filepath)
+    eeg_filtered = filter_eeg(s["eeg_data"], s["sfreq"], lowpass, order=4, zero_phase=True)
+
+    return (eeg_filtered, s["eeg_timestamps"], s["sfreq"], s["marker_data"], s["marker_timestamps"],
+            s["video_frame_idx"], s["video_timestamps"])
@@ -0,0 +1,144 @@
+"""
+Project : Vigilens
+Description : Cached camera capability probe for videoRecorder.py.
+
+The probe measures what camera.py prints (resolution, reported FPS, backend) plus the frame rate the camera
+really delivers, on the capture the recorder has already opened. The result is stored in a small JSON cache
+keyed by device identity and requested mode, so the measurement only runs the first time a camera is used
+in a given mode; later recordings start as soon as the camera is open.
+"""
+
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".vigilens", "camera_probe.json")
+
+
+def device_identity(cap, camera_id) -> str:
+    """
+    Stable name of a capture device: backend plus, for a local camera, the device name when the OS exposes
+    it (Linux V4L2), so that a different camera plugged on the same index does not reuse the cached entry.
+    Files and URLs are identified by their path.
+    """
+    backend = cap.getBackendName()
+    if not isinstance(camera_id, int):
+        return f"{backend}:{os.path.abspath(camera_id) if os.path.exists(camera_id) else camera_id}"
+    name = ""
+    if sys.platform.startswith("linux"):
+        try:
+            with open(f"/sys/class/video4linux/video{camera_id}/name") as f:
+                name = f.read().strip()
+        except OSError:
+            pass
+    return f"{backend}:{camera_id}:{name}" if name else f"{backend}:{camera_id}"
+
+
+def measure_camera(cap, num_frames=60, warmup_frames=5):
+    """
+    Capabilities of an open capture; reads num_frames frames (after warmup_frames) to time the real rate.
+
+    Returns:
+        dict with width, height, reported_fps, measured_fps, backend and fourcc
+    """
+    for _ in range(warmup_frames):
+        cap.read()
+    times = []
+    for _ in range(num_frames):
+        ret, _ = cap.read()
+        if not ret:
+            break
+        times.append(time.perf_counter())
+    # Median frame interval: robust to the odd slow read at startup
+    measured = 1.0 / float(np.median(np.diff(times))) if len(times) > 2 else 0.0
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    return {
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "reported_fps": float(cap.get(cv2.CAP_PROP_FPS)),
+        "measured_fps": measured,
+        "backend": cap.getBackendName(),
+        "fourcc": "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)) if fourcc > 0 else "",
+        "probed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def load_probe_cache(cache_path=DEFAULT_CACHE_PATH) -> dict:
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_probe_cache(cache, cache_path=DEFAULT_CACHE_PATH):
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp = f"{cache_path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, cache_path)
+
+
+def probe_camera(cap, camera_id, fps=None, frame_size=None, cache_path=DEFAULT_CACHE_PATH, refresh=False,
+                 num_frames=60):
+    """
+    Capabilities of an open camera, from the cache or measured (and cached) on a miss.
+
+    The capture must already be configured with the requested fps / frame_size, the cache key includes them
+    since a camera can deliver another rate in another mode. Files and URLs are never timed (reading them
+    would consume frames of the recording), their measured_fps is the reported one.
+
+    Args:
+        cap        : open cv2.VideoCapture
+        camera_id  : index or path it was opened with
+        fps        : requested frame rate (None = camera default)
+        frame_size : requested (width, height) (None = camera default)
+        cache_path : JSON cache file, None to disable the cache
+        refresh    : measure again even if the device is cached
+        num_frames : frames timed on a cache miss
+
+    Returns:
+        capabilities : dict (see measure_camera)
+        cached       : bool, True if the result came from the cache
+    """
+    mode = f"{frame_size[0]}x{frame_size[1]}" if frame_size else "default"
+    key = f"{device_identity(cap, camera_id)}|{mode}@{fps or 'default'}"
+    cache = load_probe_cache(cache_path) if cache_path else {}
+    if not refresh and key in cache:
+        return cache[key], True
+
+    if isinstance(camera_id, int):
+        capabilities = measure_camera(cap, num_frames=num_frames)
+    else:
+        capabilities = measure_camera(cap, num_frames=0, warmup_frames=0)
+        capabilities["measured_fps"] = capabilities["reported_fps"]
+    if cache_path:
+        cache[key] = capabilities
+        save_probe_cache(cache, cache_path)
+    return capabilities, False
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Probe (and cache) the capabilities of a camera.")
+    parser.add_argument("camera_id", nargs="?", default="0")
+    parser.add_argument("--fps", type=float, default=None)
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cached entry.")
+    arg = parser.parse_args()
+    camera_id = int(arg.camera_id) if arg.camera_id.isdigit() else arg.camera_id
+
+    cap = cv2.VideoCapture(camera_id)
+    if not cap.isOpened():
+        print("[ERROR] Could not open camera")
+    else:
+        if arg.fps:
+            cap.set(cv2.CAP_PROP_FPS, arg.fps)
+        capabilities, cached = probe_camera(cap, camera_id, fps=arg.fps, refresh=arg.refresh)
+        print(f"=== Camera {camera_id} ({'cached' if cached else 'measured'}) ===")
+        for name, value in capabilities.items():
+            print(f"{name}: {value}")
+    cap.release()
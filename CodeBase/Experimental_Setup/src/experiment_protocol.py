@@ -1,5 +1,6 @@
 from psychopy import visual, core, event, sound
 from pylsl import StreamOutlet, local_clock
+import itertools
 import time
 import random
 
@@ -12,11 +13,104 @@ def setup_lsl():
     outlet = StreamOutlet(info)
     return outlet
 
+# -------------------------------
+# Stimulus and sound registry
+# -------------------------------
+class StimulusRegistry:
+    """
+    Text stimuli, dots, fixation crosses and tones of a session, built once and reused by key.
+
+    Creating a TextStim (glyph rendering) or a Sound (audio buffer) takes milliseconds, so everything is
+    built before the timed parts of the protocol: preload_session at session start, and the task functions
+    before they run their cue timeline. While `frozen` (set by FrameScheduler.run) a stimulus that is not in
+    the registry yet is still built, but reported and counted in late_allocations.
+
+    A stimulus is shared by every caller asking for the same key, so it must be treated as read-only: to show
+    another text, position or color, ask the registry for that key instead of changing the returned stimulus.
+    """
+
+    def __init__(self, win):
+        self.win = win
+        self.frozen = False
+        self.late_allocations = []
+        self._items = {}
+
+    def _get(self, key, build):
+        item = self._items.get(key)
+        if item is None:
+            if self.frozen:
+                print(f"[WARN] {key} created inside a timed loop")
+                self.late_allocations.append(key)
+            item = self._items[key] = build()
+        return item
+
+    def text(self, text, color='white', height=0.08, pos=(0, 0)):
+        return self._get(("text", text, color, height, pos),
+                         lambda: visual.TextStim(self.win, text=text, color=color, height=height, pos=pos,
+                                                 alignText="center"))
+
+    def fixation(self, color='white', height=0.1):
+        return self.text("+", color=color, height=height)
+
+    def dot(self, pos, radius=0.05):
+        return self._get(("dot", pos, radius),
+                         lambda: visual.Circle(self.win, radius=radius, fillColor='white', lineColor='white',
+                                               units='norm', pos=pos))
+
+    def tone(self, secs=0.5, note='A'):
+        # 'A' = 440 Hz musical note
+        return self._get(("tone", note, secs), lambda: sound.Sound(note, secs=secs))
+
+    def __len__(self):
+        return len(self._items)
+
+
+_REGISTRIES = {}
+
+SACCADE_POSITIONS = [(-0.8, 0), (0.8, 0), (0, 0.8), (0, -0.8)]  # L, R, Up, Down
+
+# Instructions shown by the task functions (preloaded by preload_session)
+TASK_TEXTS = {
+    "horizontal_saccades": "Follow the dot left and right until you hear the beep sound.",
+    "vertical_saccades": "Follow the dot up and down until you hear the beep sound.",
+    "eye_roll_fixation": "Fixate your sight on the center of the screen",
+    "eye_roll": "Roll eyes in circles till you hear the beep sound",
+    "jaw_clench": "Clench and release jaw repeatedly till you hear the beep sound.",
+    "eyebrow_movements": "Raise eyebrows and frown repeatedly till you hear the beep sound.",
+    "head_movements": "Nod your head till you hear the beep sound.",
+    "breathing_exercise": "Breathe in and out slowly through your mouth till you hear the beep sound.",
+    "microsleep_fixation": "Keep your eyes on the cross.\n\nOccasionally, follow the dot briefly,\n"
+                           "then return to the cross until you hear the beep.",
+    "random_blink": "Blink Now!",
+}
+
+
+def get_resources(win) -> StimulusRegistry:
+    """Registry of the window (created on first use)."""
+    if win not in _REGISTRIES:
+        _REGISTRIES[win] = StimulusRegistry(win)
+    return _REGISTRIES[win]
+
+
+def preload_session(win, texts=()):
+    """Build the shared stimuli and tones, plus the given texts, at session start."""
+    resources = get_resources(win)
+    for secs in (0.2, 0.5):
+        resources.tone(secs)
+    for pos in SACCADE_POSITIONS:
+        resources.dot(pos)
+    resources.fixation()
+    resources.fixation(color='grey', height=0.05)
+    for text in list(TASK_TEXTS.values()) + list(texts):
+        resources.text(text)
+    return resources
+
+
 # -------------------------------
 # Utility function to show message
 # -------------------------------
 def show_message(win, text, wait_key=True, duration=None):
-    msg = visual.TextStim(win, text=text, color='white', height=0.08, alignText="center")
+    msg = get_resources(win).text(text)
     msg.draw()
     win.flip()
     if wait_key:
@@ -24,95 +118,152 @@ def show_message(win, text, wait_key=True, duration=None):
     if duration:
         core.wait(duration)
 
+# -------------------------------
+# Frame-locked cue scheduler
+# -------------------------------
+class Cue:
+    """Screen content shown from `onset` (seconds after the start of the task) until the next cue."""
+
+    def __init__(self, onset, stimuli=(), marker=None, sound=None):
+        self.onset = onset
+        self.stimuli = list(stimuli)
+        self.marker = marker
+        self.sound = sound
+
+
+class FrameScheduler:
+    """
+    Runs a precomputed cue timeline, one screen flip per cue.
+
+    Every cue is drawn to the back buffer ahead of time; the scheduler then sleeps (no busy wait) until half
+    a frame before the cue onset and flips. The LSL marker and the sound of the cue are triggered with
+    win.callOnFlip, i.e. right after the flip that shows the cue, so the marker timestamp is the flip time.
+    Onsets are relative to the flip of the first cue and are kept within one frame period. Cues with the
+    same onset share one flip (e.g. a task start marker and the first stimulus).
+    """
+
+    def __init__(self, win, outlet=None):
+        self.win = win
+        self.outlet = outlet
+        self.resources = get_resources(win)
+        self.frame_period = win.monitorFramePeriod or 1 / 60
+        self.markers = []    # (marker, LSL time of the flip)
+        self.late_cues = 0   # cues shown more than one frame after their onset
+
+    def _push_marker(self, marker):
+        timestamp = local_clock()
+        if self.outlet:
+            self.outlet.push_sample([marker], timestamp)
+        self.markers.append((marker, timestamp))
+
+    def run(self, cues):
+        """Show the cues in onset order; returns when the last cue is on screen."""
+        self.resources.frozen = True
+        try:
+            self._run(cues)
+        finally:
+            self.resources.frozen = False
+        if self.late_cues:
+            print(f"[WARN] {self.late_cues} cues shown more than one frame late")
+
+    def _run(self, cues):
+        start = None
+        ordered = sorted(cues, key=lambda c: c.onset)
+        for onset, group in itertools.groupby(ordered, key=lambda c: c.onset):
+            for cue in group:
+                for stim in cue.stimuli:
+                    stim.draw()
+                if cue.marker:
+                    self.win.callOnFlip(self._push_marker, cue.marker)
+                if cue.sound is not None:
+                    self.win.callOnFlip(cue.sound.play)
+
+            if start is not None:
+                remaining = start + onset - core.getTime() - 0.5 * self.frame_period
+                if remaining > 0:
+                    core.wait(remaining, hogCPUperiod=0.002)
+            flip_time = self.win.flip() or core.getTime()
+            if start is None:
+                start = flip_time - onset
+            elif flip_time - (start + onset) > self.frame_period:
+                self.late_cues += 1
+
+
+def _message(win, text):
+    return get_resources(win).text(text)
+
+
+def _cue_onsets(duration, interval_range, hold=2.0):
+    """Onsets of cues separated by a random interval plus the time the cue is held, within duration."""
+    onsets = []
+    t = random.uniform(*interval_range)
+    while t < duration:
+        onsets.append(t)
+        t += hold + random.uniform(*interval_range)
+    return onsets
+
+
 # -------------------------------
 # Task functions
 # -------------------------------
 
 # Eyes open/closed baseline
 def eyes_baseline(win, duration=120, eyes='open', outlet=None):
-    if outlet:
-        outlet.push_sample([f"{eyes}_baseline_start"], local_clock())
-    show_message(win, f"{eyes.capitalize()} baseline. Relax for {duration} seconds.", wait_key=False)
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        core.wait(0.1)  # just wait in small increments
+    msg = _message(win, f"{eyes.capitalize()} baseline. Relax for {duration} seconds.")
     # Make a 440 Hz tone lasting 0.5 seconds
-    beep = sound.Sound('A', secs=0.5)   # 'A' = 440 Hz musical note
-    beep.play()
-    core.wait(1)  # wait while sound plays
-    if outlet:
-        outlet.push_sample([f"{eyes}_baseline_done"], local_clock())
+    beep = get_resources(win).tone(0.5)   # 'A' = 440 Hz musical note
+    FrameScheduler(win, outlet).run([
+        Cue(0, [msg], marker=f"{eyes}_baseline_start"),
+        Cue(duration, [msg], sound=beep),
+        Cue(duration + 1, [msg], marker=f"{eyes}_baseline_done"),  # after the beep
+    ])
 
 # Blink on cue
-def blink_on_cue(win, duration=60, interval=4, outlet=None):
-    if outlet:
-        outlet.push_sample(["Blink_start"], local_clock())
+# The Blink_Index marker is pushed on the flip that shows the cue (it used to follow the cue by ~2 s)
+def blink_on_cue(win, duration=60, interval=4, outlet=None, cue_time=1.0):
     n_blinks = duration // interval
-    start_time = time.time()
-    next_blink = start_time + interval
-    idx = 0
-    while idx < n_blinks:
-        if time.time() >= next_blink:
-            idx += 1
-            show_message(win, f"Blink Now ({idx}/{n_blinks})", wait_key=False, duration=1)
-            beep = sound.Sound('A', secs=0.2)   # 'A' = 440 Hz musical note
-            beep.play()
-            core.wait(1)  # wait while sound plays
-            
-            if outlet:
-                outlet.push_sample([f"Blink_Index:{idx}"], local_clock())
-            next_blink += interval
-    if outlet:
-        outlet.push_sample(["Blink_done"], local_clock())
+    beep = get_resources(win).tone(0.2)   # 'A' = 440 Hz musical note
+    cues = [Cue(0, marker="Blink_start")]
+    for idx in range(1, n_blinks + 1):
+        onset = idx * interval
+        cues.append(Cue(onset, [_message(win, f"Blink Now ({idx}/{n_blinks})")], marker=f"Blink_Index:{idx}",
+                        sound=beep))
+        cues.append(Cue(onset + cue_time))
+    cues.append(Cue(n_blinks * interval + 2, marker="Blink_done"))
+    FrameScheduler(win, outlet).run(cues)
 
 # Double blink on cue
-def double_blink_on_cue(win, duration=30, interval_range=(2,5), outlet=None):
-    if outlet:
-        outlet.push_sample(["DoubleBlink_start"], local_clock())
-    start_time = time.time()
-    idx = 0
-    while time.time() - start_time < duration:
-        interval = random.uniform(*interval_range)
-        core.wait(interval)
-        idx += 1
-        show_message(win, f"Double Blink Now ({idx})", wait_key=False, duration=1)
-        beep = sound.Sound('A', secs=0.2)   # 'A' = 440 Hz musical note
-        beep.play()
-        core.wait(1)  # wait while sound plays
-        if outlet:
-            outlet.push_sample([f"DoubleBlink_Index:{idx}"], local_clock())
-    if outlet:
-        outlet.push_sample(["DoubleBlink_done"], local_clock())
+def double_blink_on_cue(win, duration=30, interval_range=(2,5), outlet=None, cue_time=1.0):
+    beep = get_resources(win).tone(0.2)   # 'A' = 440 Hz musical note
+    onsets = _cue_onsets(duration, interval_range)
+    cues = [Cue(0, marker="DoubleBlink_start")]
+    for idx, onset in enumerate(onsets, start=1):
+        cues.append(Cue(onset, [_message(win, f"Double Blink Now ({idx})")], marker=f"DoubleBlink_Index:{idx}",
+                        sound=beep))
+        cues.append(Cue(onset + cue_time))
+    cues.append(Cue((onsets[-1] if onsets else 0) + 2, marker="DoubleBlink_done"))
+    FrameScheduler(win, outlet).run(cues)
 
 # Random voluntary blinks
-def random_voluntary_blinks(win, duration=60, outlet=None):
-    if outlet:
-        outlet.push_sample(["RandomBlink_start"], local_clock())    
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        # randomly show blink prompt every 2-7 sec
-        interval = random.uniform(2,7)
-        core.wait(interval)
-        show_message(win, "Blink Now!", wait_key=False, duration=1)
-        beep = sound.Sound('A', secs=0.5).play()  # short beep
-        beep.play()
-        core.wait(1)  # wait while sound plays
-
-        if outlet:
-            outlet.push_sample([f"RandomBlink"], local_clock())
-    if outlet:
-        outlet.push_sample(["RandomBlink_done"], local_clock())
+def random_voluntary_blinks(win, duration=60, outlet=None, cue_time=1.0):
+    beep = get_resources(win).tone(0.5)  # short beep
+    msg = _message(win, TASK_TEXTS["random_blink"])
+    # randomly show blink prompt every 2-7 sec
+    onsets = _cue_onsets(duration, (2, 7))
+    cues = [Cue(0, marker="RandomBlink_start")]
+    for onset in onsets:
+        cues.append(Cue(onset, [msg], marker="RandomBlink", sound=beep))
+        cues.append(Cue(onset + cue_time))
+    cues.append(Cue((onsets[-1] if onsets else 0) + 2, marker="RandomBlink_done"))
+    FrameScheduler(win, outlet).run(cues)
 
 # Horizontal saccades with moving dot
 def horizontal_saccades(win, duration=60, outlet=None):
-    msg = visual.TextStim(win, text="Follow the dot left and right until you hear the beep sound.", color='white',  height=0.08, alignText="center")
+    msg = _message(win, TASK_TEXTS["horizontal_saccades"])
     msg.draw()
     win.flip()
     core.wait(5)  # instruction display
     
-    if outlet:
-        outlet.push_sample(["HorizontalSaccades_start"], local_clock())
-    
     # # Define moving dot
     # dot = visual.Circle(win, radius=0.05, fillColor='white', lineColor='white')
     # screen_width = win.size[0] / win.size[1]  # normalized units aspect ratio
@@ -132,92 +283,56 @@ def horizontal_saccades(win, duration=60, outlet=None):
     #     pos_index = 1 - pos_index
 
         # Dot stimulus (in 'norm' units, range -1..1)
-    dot = visual.Circle(win, radius=0.05, fillColor='white', lineColor='white', units='norm')
-    
-    # Left and right positions (x, y)
-    positions = [(-0.8, 0), (0.8, 0)]  
-    
-    start_time = time.time()
-    pos_index = 0
-    
+    # Left and right dots (x, y), switching side every second
+    dots = [get_resources(win).dot(pos) for pos in SACCADE_POSITIONS[:2]]
+    cues = [Cue(0, marker="HorizontalSaccades_start")]
+    cues += [Cue(t, [dots[t % 2]]) for t in range(int(duration))]
 
-    while time.time() - start_time < duration:
-        # Update dot position
-        dot.pos = positions[pos_index]
-        dot.draw()
-        win.flip()
-        core.wait(1)  # hold for 1 sec
-
-        # Switch side
-        pos_index = 1 - pos_index
-    
     # Beep sound at the end
-    beep = sound.Sound('A', secs=0.5)   # 'A' = 440 Hz musical note
-    beep.play()
-    core.wait(1)  # wait while sound plays
-    if outlet:
-        outlet.push_sample(["HorizontalSaccades_done"], local_clock())
+    beep = get_resources(win).tone(0.5)   # 'A' = 440 Hz musical note
+    cues.append(Cue(duration, sound=beep))
+    cues.append(Cue(duration + 1, marker="HorizontalSaccades_done"))  # after the beep
+    FrameScheduler(win, outlet).run(cues)
 
 
 def vertical_saccades(win, duration=10, outlet=None):
     # Instruction
-    msg = visual.TextStim(win, text="Follow the dot up and down until you hear the beep sound.", color='white',  height=0.08, alignText="center")
+    msg = _message(win, TASK_TEXTS["vertical_saccades"])
     msg.draw()
     win.flip()
     core.wait(3)
 
-    if outlet:
-        outlet.push_sample(["VerticalSaccades_start"], local_clock())
+    # Up and down dots (in normalized units: -1..+1)
+    dots = [get_resources(win).dot(pos) for pos in SACCADE_POSITIONS[2:]]
 
-    # Dot stimulus (in normalized units: -1..+1)
-    dot = visual.Circle(win, radius=0.05, fillColor='white', lineColor='white', units='norm')
+    # Optional: central fixation cross
+    fixation = get_resources(win).fixation(color='grey', height=0.05)
 
-    # Up and down positions (x, y)
-    positions = [(0, 0.8), (0, -0.8)]
-
-    start_time = time.time()
-    pos_index = 0
-
-    # Blink-like timing: 200 ms per position
-    blink_interval = 0.5  # 0.2 seconds = 200 ms
-
-    while time.time() - start_time < duration:
-        # Draw dot
-        dot.pos = positions[pos_index]
-        dot.draw()
-
-        # Optional: central fixation cross
-        fixation = visual.TextStim(win, text="+", color='grey', height=0.05, pos=(0, 0))
-        fixation.draw()
-
-        # Flip once per frame
-        win.flip()
-        core.wait(blink_interval)  # very fast for blink-like rhythm
-
-        # Switch up <-> down
-        pos_index = 1 - pos_index
+    # Blink-like timing: 500 ms per position, switching up <-> down
+    blink_interval = 0.5
+    n_switches = int(round(duration / blink_interval))
+    cues = [Cue(0, marker="VerticalSaccades_start")]
+    cues += [Cue(i * blink_interval, [dots[i % 2], fixation]) for i in range(n_switches)]
 
     # Beep at end
-    beep = sound.Sound('A', secs=0.5)
-    beep.play()
-    core.wait(1)
-
-    if outlet:
-        outlet.push_sample(["VerticalSaccades_done"], local_clock())
+    beep = get_resources(win).tone(0.5)
+    cues.append(Cue(duration, sound=beep))
+    cues.append(Cue(duration + 1, marker="VerticalSaccades_done"))
+    FrameScheduler(win, outlet).run(cues)
 
 # Eye roll & fixation
 def eye_roll_fixation(win, duration=60, outlet=None):
     if outlet:
         outlet.push_sample(["EyeRoll_start"], local_clock())
-    msg = visual.TextStim(win, text="Fixate your sight on the center of the screen", color='white',  height=0.08, alignText="center")
+    msg = _message(win, TASK_TEXTS["eye_roll_fixation"])
     msg.draw()
     win.flip()
     core.wait(5)  # initial fixation
-    msg = visual.TextStim(win, text="Roll eyes in circles till you hear the beep sound", color='white',  height=0.08, alignText="center")
+    msg = _message(win, TASK_TEXTS["eye_roll"])
     msg.draw()
     win.flip()
     core.wait(duration)
-    beep = sound.Sound('A', secs=0.5)   # 'A' = 440 Hz musical note
+    beep = get_resources(win).tone(0.5)   # 'A' = 440 Hz musical note
     beep.play()
     core.wait(1)
     if outlet:
@@ -227,8 +342,8 @@ def eye_roll_fixation(win, duration=60, outlet=None):
 def jaw_clench(win, duration=60, outlet=None):
     if outlet:
         outlet.push_sample(["JawClench_start"], local_clock())
-    show_message(win, "Clench and release jaw repeatedly till you hear the beep sound.", wait_key=False, duration=duration)
-    beep = sound.Sound('A', secs=0.2)   # 'A' = 440 Hz musical note
+    show_message(win, TASK_TEXTS["jaw_clench"], wait_key=False, duration=duration)
+    beep = get_resources(win).tone(0.2)   # 'A' = 440 Hz musical note
     beep.play()
     core.wait(1)  # wait while sound plays
     if outlet:
@@ -238,8 +353,8 @@ def jaw_clench(win, duration=60, outlet=None):
 def eyebrow_movements(win, duration=60, outlet=None):
     if outlet:
         outlet.push_sample(["EyebrowMovements_start"], local_clock())
-    show_message(win, "Raise eyebrows and frown repeatedly till you hear the beep sound.", wait_key=False, duration=duration)
-    beep = sound.Sound('A', secs=0.5)   # 'A' = 440 Hz musical note
+    show_message(win, TASK_TEXTS["eyebrow_movements"], wait_key=False, duration=duration)
+    beep = get_resources(win).tone(0.5)   # 'A' = 440 Hz musical note
     beep.play()
     core.wait(1)  # wait while sound plays      
     if outlet:
@@ -249,8 +364,8 @@ def eyebrow_movements(win, duration=60, outlet=None):
 def head_movements(win, duration=60, outlet=None):
     if outlet:
         outlet.push_sample(["HeadMovements_start"], local_clock())
-    show_message(win, "Nod your head till you hear the beep sound.", wait_key=False, duration=duration)
-    beep = sound.Sound('A', secs=0.5)   # 'A' = 440 Hz musical note
+    show_message(win, TASK_TEXTS["head_movements"], wait_key=False, duration=duration)
+    beep = get_resources(win).tone(0.5)   # 'A' = 440 Hz musical note
     beep.play()
     core.wait(1)  # wait while sound plays
     if outlet:
@@ -260,8 +375,8 @@ def head_movements(win, duration=60, outlet=None):
 def breathing_exercise(win, duration=60, outlet=None):
     if outlet:
         outlet.push_sample(["BreathingExercise_start"], local_clock())
-    show_message(win, "Breathe in and out slowly through your mouth till you hear the beep sound.", wait_key=False, duration=duration)
-    beep = sound.Sound('A', secs=0.5)   # 'A' = 440 Hz musical note
+    show_message(win, TASK_TEXTS["breathing_exercise"], wait_key=False, duration=duration)
+    beep = get_resources(win).tone(0.5)   # 'A' = 440 Hz musical note
     beep.play()
     core.wait(1)  # wait while sound plays
     if outlet:
@@ -269,63 +384,37 @@ def breathing_exercise(win, duration=60, outlet=None):
 
 def microsleep_fixation(win, duration=60, outlet=None):
     # Instruction
-    msg = visual.TextStim(win, 
-                          text="Keep your eyes on the cross.\n\nOccasionally, follow the dot briefly,\nthen return to the cross until you hear the beep.", 
-                          color='white', height=0.08, alignText="center")
+    msg = _message(win, TASK_TEXTS["microsleep_fixation"])
     msg.draw()
     win.flip()
     core.wait(5)
 
-    if outlet:
-        outlet.push_sample(["MicrosleepFixation_start"], local_clock())
-
     # Fixation cross
-    fixation = visual.TextStim(win, text="+", color='white', height=0.1, pos=(0, 0))
-
-    # Dot for saccades
-    dot = visual.Circle(win, radius=0.05, fillColor='white', lineColor='white', units='norm')
-    saccade_positions = [(-0.8, 0), (0.8, 0), (0, 0.8), (0, -0.8)]  # L, R, Up, Down
-
-    start_time = time.time()
-    next_saccade_time = start_time + random.uniform(5, 10)  # first cue after 5–10s
-
-    while time.time() - start_time < duration:
-        now = time.time()
-
-        if now >= next_saccade_time:
-            # Show a random saccade target for 1 sec
-            pos = random.choice(saccade_positions)
-            dot.pos = pos
-            dot.draw()
-            win.flip()
-            core.wait(1)
-
-            # Back to fixation
-            fixation.draw()
-            win.flip()
-
-            # Schedule next saccade in 5–10s
-            next_saccade_time = now + random.uniform(5, 10)
-        else:
-            # Just fixation
-            fixation.draw()
-            win.flip()
-            core.wait(0.05)
+    fixation = get_resources(win).fixation()
 
-    # Beep at end
-    beep = sound.Sound('A', secs=0.5)
-    beep.play()
-    core.wait(1)
+    # Dots for saccades
+    dots = [get_resources(win).dot(pos) for pos in SACCADE_POSITIONS]
 
-    if outlet:
-        outlet.push_sample(["MicrosleepFixation_done"], local_clock())
+    # A random saccade target for 1 sec every 5-10 s (first cue after 5-10 s), fixation in between
+    cues = [Cue(0, [fixation], marker="MicrosleepFixation_start")]
+    onset = random.uniform(5, 10)
+    while onset < duration:
+        cues.append(Cue(onset, [random.choice(dots)]))
+        cues.append(Cue(onset + 1, [fixation]))
+        onset += random.uniform(5, 10)
+
+    # Beep at end
+    beep = get_resources(win).tone(0.5)
+    cues.append(Cue(duration, [fixation], sound=beep))
+    cues.append(Cue(duration + 1, [fixation], marker="MicrosleepFixation_done"))
+    FrameScheduler(win, outlet).run(cues)
 
 
 def pyscho_experiment(win, outlet):
     # ---------------------
     # Psychopy Window
     # ---------------------
-    msg = visual.TextStim(win, text="Welcome!\n\nPart 1: Blink once every 5 seconds for 1 minute.\n\nPress any key to begin.", color="white", height=0.08, alignText="center")
+    msg = _message(win, "Welcome!\n\nPart 1: Blink once every 5 seconds for 1 minute.\n\nPress any key to begin.")
     msg.draw()
     win.flip()
     event.waitKeys()
@@ -335,31 +424,22 @@ def pyscho_experiment(win, outlet):
     duration = 15  # seconds
     blink_interval = 5
     n_blinks = duration // blink_interval
-    start_time = time.time()
-    next_blink = start_time + blink_interval
+
+    # Blink cue for 1 s every blink_interval, the LSL marker is pushed on the flip that shows it
+    cues = [Cue(0)]
+    for idx in range(1, n_blinks + 1):
+        cues.append(Cue(idx * blink_interval, [_message(win, f"Blink Now ({idx}/{n_blinks})")],
+                        marker=f"Blink_Index:{idx}"))
+        cues.append(Cue(idx * blink_interval + 1))
 
     print("Starting experiment loop...")
-    idx = 0
-    while idx < n_blinks:
-            current_time = time.time()
-            if current_time >= next_blink:
-                idx += 1
-                msg.text = f"Blink Now ({idx}/{n_blinks})"
-                msg.draw()
-                win.flip()
-                core.wait(1)
-                win.flip()
-
-                # Push LSL marker
-                timestamp = local_clock()
-                outlet.push_sample([f"Blink_Index:{idx}"], timestamp)
-                print(f"[BLINK MARKER INDEX]: {idx} @ {timestamp}")
-
-                next_blink += blink_interval
-                core.wait(1)  # short pause after blink cue
-
-    msg.text = "Experiment complete!\nThank you!"
-    msg.draw()
+    scheduler = FrameScheduler(win, outlet)
+    scheduler.run(cues)
+    for marker, timestamp in scheduler.markers:
+        print(f"[BLINK MARKER INDEX]: {marker.split(':')[1]} @ {timestamp}")
+    core.wait(1)  # short pause after the last blink cue
+
+    _message(win, "Experiment complete!\nThank you!").draw()
     win.flip()
     core.wait(3)
 
@@ -370,94 +450,92 @@ def main_experiment(win, outlet):
 
     def section_intro(text):
         """Helper: show intro message and wait for keypress."""
-        msg = visual.TextStim(win, text=text, color="white", height=0.08, alignText="center")
+        msg = _message(win, text)
         msg.draw()
         win.flip()
         event.waitKeys()  # Wait for participant to press a key
 
     def section_outro(text="Section complete."):
         """Helper: show outro message briefly."""
-        msg = visual.TextStim(win, text=text, color="white", height=0.08, alignText="center")
+        msg = _message(win, text)
         msg.draw()
         win.flip()
         core.wait(2)
 
     # -------------------------
-    # Sequence of tasks
+    # Sequence of tasks: (intro, task, task arguments, outro)
     # -------------------------
-
-    #1. Eyes open baseline
-    section_intro("Part 1: Eyes Close Baseline\n\nRelax with eyes closed for 30 seconds.\n\nPress any key to begin.")
-    eyes_baseline(win, duration=30, eyes='Close', outlet=outlet)
-    section_outro("Eyes Close Baseline complete.")
-
-    # 2. Blink on cue
-    section_intro("Part 2: Blink on cue\n\nBlink every 3 seconds for 90 seconds.\n\nPress any key to begin.")
-    blink_on_cue(win, duration=30, interval=3, outlet=outlet)
-    section_outro("Blink on cue complete.")
-
-    # 3. Double blink on cue
-    section_intro("Part 3: Double Blink\n\nDouble blink whenever prompted for 30 seconds.\n\nPress any key to begin.")
-    double_blink_on_cue(win, duration=30, interval_range=(2,5), outlet=outlet)
-    section_outro("Double blink section complete.")
-
-    # 4. Random voluntary blinks
-    # section_intro("Part 4: Random Blinks\n\nBlink when instructed at unpredictable times for 1 minute.\n\nPress any key to begin.")
-    # random_voluntary_blinks(win, duration=60, outlet=outlet)
-    # section_outro("Random blink section complete.")
-
-    # 5. Horizontal saccades
-    section_intro("Part 5: Horizontal Saccades\n\nShift gaze left and right continuously.\n\nPress any key to begin.")
-    horizontal_saccades(win, duration=30, outlet=outlet)
-    section_outro("Horizontal saccades complete.")
-
-    # 6. Vertical saccades
-    section_intro("Part 6: Vertical Saccades\n\nShift gaze up and down continuously.\n\nPress any key to begin.")
-    vertical_saccades(win, duration=30, outlet=outlet)
-    section_outro("Vertical saccades complete.")
-
-    section_intro("Rest Baseline\n\nRelax and keep your eyes open for 20 seconds.\n\nPress any key to begin.")
-    eyes_baseline(win, duration=20, eyes='open', outlet=outlet)
-    section_outro("Rest baseline complete.")
-    
-    # 7. Eye roll & fixation
-    section_intro("Part 7: Eye Roll\n\nRoll your eyes in circles for 30 seconds.\n\nPress any key to begin.")
-    eye_roll_fixation(win, duration=30, outlet=outlet)
-    section_outro("Eye roll section complete.")
-
-    # 8. Jaw clench cycles
-    section_intro("Part 8: Jaw Clench\n\nClench and release your jaw repeatedly for 30 seconds.\n\nPress any key to begin.")
-    jaw_clench(win, duration=30, outlet=outlet)
-    section_outro("Jaw clench section complete.")
-
-    # 9. Eyebrow raise/frown
-    section_intro("Part 9: Eyebrow Movements\n\nRaise and frown your eyebrows repeatedly for 30 seconds.\n\nPress any key to begin.")
-    eyebrow_movements(win, duration=30, outlet=outlet)
-    section_outro("Eyebrow movements section complete.")
-
-    section_intro("Rest Baseline\n\nRelax and keep your eyes open for 20 seconds.\n\nPress any key to begin.")
-    eyes_baseline(win, duration=20, eyes='open', outlet=outlet)
-    section_outro("Rest baseline complete.")
-
-    # 10. Head motion
-    section_intro("Part 10: Scuba diving simulation Part 1 \n\nNod your head up and down for 30 seconds with continuous feet movement.\n\nPress any key to begin.")
-    head_movements(win, duration=30, outlet=outlet)
-    section_outro("Simukation of scuba diving section complete.")
-
-    # 11. Simulated breathing exercise
-    section_intro("Part 11: Scuba diving simulation Part 2 \n\nBreathing Exercise\n\nBreathe in and out slowly through your mouth for 30 seconds.\n\nPress any key to begin.")
-    breathing_exercise(win, duration=30, outlet=outlet)
-    section_outro("Breathing exercise section complete.")
-
-    # 12. Microsleep fixation
-    section_intro("Part 12: Pilot Simulation : Microsleep Fixation\n\nKeep your eyes on the center cross for 3 minute.\n\nPress any key to begin.")
-    microsleep_fixation(win, duration=180, outlet=outlet)
-    section_outro("Microsleep fixation section complete.")
+    sections = [
+        #1. Eyes open baseline
+        ("Part 1: Eyes Close Baseline\n\nRelax with eyes closed for 30 seconds.\n\nPress any key to begin.",
+         eyes_baseline, dict(duration=30, eyes='Close'),
+         "Eyes Close Baseline complete."),
+        # 2. Blink on cue
+        ("Part 2: Blink on cue\n\nBlink every 3 seconds for 90 seconds.\n\nPress any key to begin.",
+         blink_on_cue, dict(duration=30, interval=3),
+         "Blink on cue complete."),
+        # 3. Double blink on cue
+        ("Part 3: Double Blink\n\nDouble blink whenever prompted for 30 seconds.\n\nPress any key to begin.",
+         double_blink_on_cue, dict(duration=30, interval_range=(2,5)),
+         "Double blink section complete."),
+        # 4. Random voluntary blinks
+        # ("Part 4: Random Blinks\n\nBlink when instructed at unpredictable times for 1 minute.\n\nPress any key to begin.",
+        #  random_voluntary_blinks, dict(duration=60),
+        #  "Random blink section complete."),
+        # 5. Horizontal saccades
+        ("Part 5: Horizontal Saccades\n\nShift gaze left and right continuously.\n\nPress any key to begin.",
+         horizontal_saccades, dict(duration=30),
+         "Horizontal saccades complete."),
+        # 6. Vertical saccades
+        ("Part 6: Vertical Saccades\n\nShift gaze up and down continuously.\n\nPress any key to begin.",
+         vertical_saccades, dict(duration=30),
+         "Vertical saccades complete."),
+        ("Rest Baseline\n\nRelax and keep your eyes open for 20 seconds.\n\nPress any key to begin.",
+         eyes_baseline, dict(duration=20, eyes='open'),
+         "Rest baseline complete."),
+        # 7. Eye roll & fixation
+        ("Part 7: Eye Roll\n\nRoll your eyes in circles for 30 seconds.\n\nPress any key to begin.",
+         eye_roll_fixation, dict(duration=30),
+         "Eye roll section complete."),
+        # 8. Jaw clench cycles
+        ("Part 8: Jaw Clench\n\nClench and release your jaw repeatedly for 30 seconds.\n\nPress any key to begin.",
+         jaw_clench, dict(duration=30),
+         "Jaw clench section complete."),
+        # 9. Eyebrow raise/frown
+        ("Part 9: Eyebrow Movements\n\nRaise and frown your eyebrows repeatedly for 30 seconds.\n\nPress any key to begin.",
+         eyebrow_movements, dict(duration=30),
+         "Eyebrow movements section complete."),
+        ("Rest Baseline\n\nRelax and keep your eyes open for 20 seconds.\n\nPress any key to begin.",
+         eyes_baseline, dict(duration=20, eyes='open'),
+         "Rest baseline complete."),
+        # 10. Head motion
+        ("Part 10: Scuba diving simulation Part 1 \n\nNod your head up and down for 30 seconds with continuous feet movement.\n\nPress any key to begin.",
+         head_movements, dict(duration=30),
+         "Simukation of scuba diving section complete."),
+        # 11. Simulated breathing exercise
+        ("Part 11: Scuba diving simulation Part 2 \n\nBreathing Exercise\n\nBreathe in and out slowly through your mouth for 30 seconds.\n\nPress any key to begin.",
+         breathing_exercise, dict(duration=30),
+         "Breathing exercise section complete."),
+        # 12. Microsleep fixation
+        ("Part 12: Pilot Simulation : Microsleep Fixation\n\nKeep your eyes on the center cross for 3 minute.\n\nPress any key to begin.",
+         microsleep_fixation, dict(duration=180),
+         "Microsleep fixation section complete."),
+    ]
+
+    end_text = "Experiment complete!\n\nThank you for participating."
+
+    # Build every stimulus of the session before the first task
+    preload_session(win, texts=[text for intro, _, _, outro in sections for text in (intro, outro)] + [end_text])
+
+    for intro, task, kwargs, outro in sections:
+        section_intro(intro)
+        task(win, outlet=outlet, **kwargs)
+        section_outro(outro)
 
     # -------------------------
     # End of experiment
     # -------------------------
-    msg = visual.TextStim(win, text="Experiment complete!\n\nThank you for participating.", color="white", height=0.08, alignText="center")
+    msg = _message(win, end_text)
     msg.draw()
     win.flip()
     core.wait(3)
\ No newline at end of file
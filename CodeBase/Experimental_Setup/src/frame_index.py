@@ -0,0 +1,274 @@
+"""
+Project : Vigilens
+Description : Binary frame index written next to every recorded video.
+
+The sidecar (<video>.frames.npy) is a plain .npy structured array with one record per frame of the file:
+frame index, LSL timestamp of the grab, byte offset of the compressed frame in the container and keyframe
+flag. It is memory-mapped by FrameIndex, so a tool can find the frame of any LSL time with a binary search
+and seek to it (or to the keyframe before it) without decoding the video from the start.
+
+Byte offsets and keyframe flags are read from the container after the writer is closed: the idx1 / OpenDML
+ix## indexes of AVI files, the stbl boxes of MP4/MOV files. Other containers get offset -1 and every frame
+marked as keyframe.
+"""
+
+import os
+import struct
+
+import numpy as np
+
+FRAME_INDEX_DTYPE = np.dtype([
+    ("frame", "<i8"),       # position of the frame in the video file
+    ("lsl_time", "<f8"),    # LSL timestamp of the grab
+    ("offset", "<i8"),      # byte offset of the frame data in the container, -1 if unknown
+    ("keyframe", "?"),
+])
+
+
+def frame_index_path(video_path: str) -> str:
+    """Sidecar path of a video, e.g. rec.avi -> rec.avi.frames.npy"""
+    return f"{video_path}.frames.npy"
+
+
+# ---------------------------------------------------------------------- AVI
+
+def _avi_frames(f, file_size):
+    """(data offset, keyframe or None) of every chunk of the first video stream, in file order."""
+    offsets = []
+    key_by_offset = {}
+    idx1 = []
+    movi_start = None
+
+    def walk(start, end):
+        nonlocal movi_start
+        pos = start
+        while pos + 8 <= end:
+            f.seek(pos)
+            header = f.read(8)
+            if len(header) < 8:
+                return
+            ckid, size = header[:4], struct.unpack("<I", header[4:])[0]
+            if ckid in (b"RIFF", b"LIST"):
+                list_type = f.read(4)
+                if list_type == b"movi" and movi_start is None:
+                    movi_start = pos + 8  # idx1 offsets are relative to the 'movi' fourcc
+                if list_type in (b"AVI ", b"AVIX", b"movi"):
+                    walk(pos + 12, min(pos + 8 + size, end))
+            elif ckid[2:] in (b"dc", b"db") and ckid[:2] == b"00":
+                offsets.append(pos + 8)
+            elif ckid[:2] == b"ix" and ckid[2:] == b"00":
+                _read_avi_std_index(f, size, key_by_offset)
+            elif ckid == b"idx1":
+                data = f.read(size)
+                for i in range(0, len(data) - 15, 16):
+                    entry_id, flags, offset, _ = struct.unpack("<4sIII", data[i:i + 16])
+                    if entry_id[:2] == b"00" and entry_id[2:] in (b"dc", b"db"):
+                        idx1.append((offset, bool(flags & 0x10)))
+            pos += 8 + size + (size & 1)
+
+    walk(0, file_size)
+
+    if idx1 and offsets:
+        # idx1 offsets point to the chunk header, relative to 'movi' or (some writers) absolute
+        absolute = idx1[0][0] + 8 == offsets[0]
+        for offset, key in idx1:
+            key_by_offset.setdefault(offset + 8 + (0 if absolute else movi_start), key)
+    return [(offset, key_by_offset.get(offset)) for offset in offsets]
+
+
+def _read_avi_std_index(f, size, key_by_offset):
+    """OpenDML standard index chunk (ix##): absolute data offsets, bit 31 of the size = not a keyframe."""
+    data = f.read(size)
+    if len(data) < 24:
+        return
+    longs_per_entry, _, index_type, n_entries = struct.unpack("<HBBI", data[:8])
+    base_offset = struct.unpack("<Q", data[12:20])[0]
+    if index_type != 1 or longs_per_entry != 2:
+        return
+    entries = np.frombuffer(data, dtype="<u4", count=2 * n_entries, offset=24).reshape(-1, 2)
+    for offset, entry_size in entries:
+        key_by_offset[base_offset + int(offset)] = not bool(entry_size & 0x80000000)
+
+
+# ---------------------------------------------------------------------- MP4
+
+def _mp4_boxes(f, start, end):
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, box = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield box, pos + header, pos + size
+        pos += size
+
+
+def _mp4_find(f, start, end, path):
+    for box, body, box_end in _mp4_boxes(f, start, end):
+        if box == path[0]:
+            if len(path) == 1:
+                return body, box_end
+            found = _mp4_find(f, body, box_end, path[1:])
+            if found:
+                return found
+    return None
+
+
+def _mp4_frames(f, file_size):
+    """(data offset, keyframe) of every sample of the first video track."""
+    moov = _mp4_find(f, 0, file_size, [b"moov"])
+    if moov is None:
+        return []
+    for box, body, box_end in _mp4_boxes(f, *moov):
+        if box != b"trak":
+            continue
+        hdlr = _mp4_find(f, body, box_end, [b"mdia", b"hdlr"])
+        f.seek(hdlr[0] + 8)
+        if f.read(4) != b"vide":
+            continue
+        stbl = _mp4_find(f, body, box_end, [b"mdia", b"minf", b"stbl"])
+        tables = {}
+        for name, t_body, t_end in _mp4_boxes(f, *stbl):
+            f.seek(t_body)
+            tables[name] = f.read(t_end - t_body)
+
+        sample_size, n_samples = struct.unpack(">II", tables[b"stsz"][4:12])
+        sizes = (np.full(n_samples, sample_size, dtype=np.int64) if sample_size else
+                 np.frombuffer(tables[b"stsz"], dtype=">u4", count=n_samples, offset=12).astype(np.int64))
+        if b"co64" in tables:
+            n = struct.unpack(">I", tables[b"co64"][4:8])[0]
+            chunk_offsets = np.frombuffer(tables[b"co64"], dtype=">u8", count=n, offset=8).astype(np.int64)
+        else:
+            n = struct.unpack(">I", tables[b"stco"][4:8])[0]
+            chunk_offsets = np.frombuffer(tables[b"stco"], dtype=">u4", count=n, offset=8).astype(np.int64)
+        n = struct.unpack(">I", tables[b"stsc"][4:8])[0]
+        stsc = np.frombuffer(tables[b"stsc"], dtype=">u4", count=3 * n, offset=8).reshape(-1, 3)
+
+        # Samples per chunk, expanded from the run-length stsc table (first_chunk is 1-based)
+        per_chunk = np.zeros(len(chunk_offsets), dtype=np.int64)
+        for i, (first_chunk, samples, _) in enumerate(stsc):
+            last = stsc[i + 1][0] - 1 if i + 1 < len(stsc) else len(chunk_offsets)
+            per_chunk[first_chunk - 1:last] = samples
+        chunk_of_sample = np.repeat(np.arange(len(chunk_offsets)), per_chunk)[:n_samples]
+        first_sample = np.concatenate(([0], np.cumsum(per_chunk)[:-1]))[chunk_of_sample]
+        cum_sizes = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        offsets = chunk_offsets[chunk_of_sample] + cum_sizes - cum_sizes[first_sample]
+
+        keyframes = np.ones(n_samples, dtype=bool)
+        if b"stss" in tables:
+            n = struct.unpack(">I", tables[b"stss"][4:8])[0]
+            keyframes[:] = False
+            keyframes[np.frombuffer(tables[b"stss"], dtype=">u4", count=n, offset=8).astype(np.int64) - 1] = True
+        return list(zip(offsets.tolist(), keyframes.tolist()))
+    return []
+
+
+def read_container_frames(video_path: str):
+    """
+    Byte offset and keyframe flag of every frame of a video file, in file order.
+
+    Returns:
+        offsets   : np.ndarray of int64 (-1 if unknown)
+        keyframes : np.ndarray of bool
+    """
+    size = os.path.getsize(video_path)
+    with open(video_path, "rb") as f:
+        magic = f.read(12)
+        if magic[:4] == b"RIFF" and magic[8:12] == b"AVI ":
+            frames = _avi_frames(f, size)
+        elif magic[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide"):
+            frames = _mp4_frames(f, size)
+        else:
+            frames = []
+    offsets = np.array([o for o, _ in frames], dtype=np.int64)
+    # Frames without index information are treated as keyframes (safe seek target for intra codecs only)
+    keyframes = np.array([True if k is None else k for _, k in frames], dtype=bool)
+    return offsets, keyframes
+
+
+def write_frame_index(video_path: str, lsl_timestamps, index_path: str = None) -> str:
+    """
+    Write the sidecar of a closed video file.
+
+    Args:
+        video_path     : recorded video (the writer must be released)
+        lsl_timestamps : LSL timestamp of every written frame, in file order
+        index_path     : sidecar path, frame_index_path(video_path) if None
+
+    Returns:
+        index_path
+    """
+    index_path = index_path or frame_index_path(video_path)
+    lsl_timestamps = np.asarray(lsl_timestamps, dtype=np.float64)
+    offsets, keyframes = read_container_frames(video_path)
+
+    n = len(lsl_timestamps)
+    if len(offsets) and len(offsets) != n:
+        print(f"[WARN] {video_path}: {len(offsets)} frames in the container, {n} timestamps", flush=True)
+        n = min(n, len(offsets))
+
+    index = np.zeros(n, dtype=FRAME_INDEX_DTYPE)
+    index["frame"] = np.arange(n)
+    index["lsl_time"] = lsl_timestamps[:n]
+    index["offset"] = offsets[:n] if len(offsets) else -1
+    index["keyframe"] = keyframes[:n] if len(offsets) else True
+
+    tmp = f"{index_path}.tmp.npy"
+    np.save(tmp, index)
+    os.replace(tmp, index_path)
+    return index_path
+
+
+class FrameIndex:
+    """
+    Memory-mapped frame index of a recorded video.
+
+    Example:
+        index = FrameIndex.open("rec.avi")
+        frame = index.nearest_frame(blink_time)
+        start = index.keyframe_before(frame)     # seek target, then decode up to `frame`
+    """
+
+    def __init__(self, index_path: str):
+        self.path = index_path
+        self.records = np.load(index_path, mmap_mode="r")
+        self.lsl_time = self.records["lsl_time"]
+        self._keyframes = None
+
+    @classmethod
+    def open(cls, video_path: str):
+        return cls(frame_index_path(video_path))
+
+    def __len__(self):
+        return len(self.records)
+
+    def nearest_frame(self, lsl_time):
+        """Frame(s) whose LSL timestamp is nearest to lsl_time (scalar or array)."""
+        t = np.asarray(lsl_time, dtype=np.float64)
+        right = np.clip(np.searchsorted(self.lsl_time, t), 0, len(self.lsl_time) - 1)
+        left = np.clip(right - 1, 0, len(self.lsl_time) - 1)
+        use_left = np.abs(self.lsl_time[left] - t) <= np.abs(self.lsl_time[right] - t)
+        frames = np.where(use_left, left, right)
+        return int(frames) if frames.ndim == 0 else frames
+
+    def frames_between(self, start_time: float, end_time: float):
+        """Records of the frames grabbed in [start_time, end_time]."""
+        lo = np.searchsorted(self.lsl_time, start_time, side="left")
+        hi = np.searchsorted(self.lsl_time, end_time, side="right")
+        return self.records[lo:hi]
+
+    def keyframe_before(self, frame: int) -> int:
+        """Last keyframe at or before `frame` (where a decoder must start to reach it)."""
+        if self._keyframes is None:
+            self._keyframes = np.flatnonzero(self.records["keyframe"])
+        i = np.searchsorted(self._keyframes, frame, side="right") - 1
+        return int(self._keyframes[i]) if i >= 0 else 0
+
+    def byte_offset(self, frame: int) -> int:
+        return int(self.records["offset"][frame])
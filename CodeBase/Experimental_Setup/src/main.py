@@ -1,9 +1,13 @@
+import os
 import sys
 import time
+import signal
 import subprocess
-from pylsl import StreamInfo, StreamOutlet, local_clock
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pylsl import StreamInfo, StreamOutlet, local_clock, resolve_byprop
 from psychopy import event, visual, core
-from videoRecorder import obtain_fps_opencv, validate_fps
+from xdf_recorder import XdfRecorder
 from experiment_protocol import pyscho_experiment,  main_experiment
 
 '''def setup_labrecorder(recorder_path, output_filename, stream_filter=""):
@@ -35,31 +39,40 @@ def setup_labrecorder(recorder_path, output_filename, stream_filter=""):
         ]
         print("Launching:", " ".join(cmd))
         recorder = subprocess.Popen(cmd)
-        time.sleep(2)  # give it a moment to start
         print(f"LabRecorder started, saving to {output_filename}")
         return recorder
     except Exception as e:
         print(f"[ERROR] Could not start LabRecorder: {e}")
         return None
     
-def start_video_subprocess(camera_id=0, output_video="output.avi"):
+def start_video_subprocess(camera_id=0, output_video="output.avi", segment_minutes=None):
     """
     Start the video recording subprocess.
 
     This launches the same Python script in 'record' mode as a separate process,
     which handles video capture + LSL timestamps independently.
+    With segment_minutes the video is split into rolling segments (see SegmentedWriter).
+    camera_id can also be a list of cameras: they are recorded by the same process, each to
+    <output>_cam<id><ext> with its own LSL Video stream (video_stream_001, video_stream_002, ...).
     """
     try: 
         cmd = [
             sys.executable,  # use same Python interpreter
             "D:\France\ISAE\Internship\CodeBase\Experimental_Setup\src/videoRecorder.py", # script to run
-            str(camera_id),
+            ",".join(str(c) for c in camera_id) if isinstance(camera_id, (list, tuple)) else str(camera_id),
             output_video
         ]
+        if segment_minutes:
+            cmd += ["--segment-minutes", str(segment_minutes)]
         print("Starting Video Recording Subprocess:", " ".join(cmd))
-        proc = subprocess.Popen(cmd)
+        # Own process group on Windows so that stop_video_subprocess can send CTRL_BREAK instead of killing it
+        creationflags = subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+        proc = subprocess.Popen(cmd, creationflags=creationflags, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, bufsize=1)
 
-        time.sleep(5)  # give it a moment to start
+        # The recorder prints [READY] once the first frame is written; its output is forwarded to ours
+        proc.ready = threading.Event()
+        threading.Thread(target=_forward_video_output, args=(proc,), daemon=True).start()
         print(f"Video subprocess started, recording to {output_video}")
         return proc
     except Exception as e:
@@ -67,20 +80,118 @@ def start_video_subprocess(camera_id=0, output_video="output.avi"):
         return None
 
 
-def stop_video_subprocess(proc):
+def _forward_video_output(proc):
+    for line in proc.stdout:
+        print(f"[video] {line}", end="", flush=True)
+        if line.startswith("[READY]"):
+            proc.ready.set()
+
+
+def wait_video_ready(proc, timeout=60):
+    """Wait until the recorder has written its first frame; False if it exits or times out first."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.ready.wait(timeout=0.2):
+            return True
+        if proc.poll() is not None:
+            print("[ERROR] Video subprocess exited before recording")
+            return False
+    print(f"[ERROR] Video subprocess not ready after {timeout} s")
+    return False
+
+
+def stop_video_subprocess(proc, timeout=30):
     """
     Stop the video recording subprocess cleanly.
+
+    The recorder closes its current video segment on SIGTERM (CTRL_BREAK on Windows, where terminate()
+    kills the process without running any handler); it is only killed if it does not exit within timeout.
     """
-    proc.terminate()  # send SIGTERM / terminate signal
-    proc.wait()       # wait for it to finish
+    if os.name == "nt":
+        proc.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        proc.terminate()  # send SIGTERM / terminate signal
+    try:
+        proc.wait(timeout=timeout)  # wait for it to finish
+    except subprocess.TimeoutExpired:
+        print("[WARN] Video subprocess did not stop in time, killing it.")
+        proc.kill()
+        proc.wait()
     print("[INFO] Video subprocess stopped.")
 
 
+def wait_for_streams(required, timeout=20):
+    """
+    Resolve every required LSL stream concurrently.
+
+    Args:
+        required : dict label -> (property, value) passed to pylsl.resolve_byprop,
+                   e.g. {"video": ("source_id", "video_stream_001"), "eeg": ("type", "EEG")}
+        timeout  : seconds allowed for each stream
+
+    Returns:
+        missing : list of the labels that were not found (empty when every stream is live)
+    """
+    def resolve(item):
+        label, (prop, value) = item
+        t0 = time.time()
+        found = resolve_byprop(prop, value, minimum=1, timeout=timeout)
+        if found:
+            print(f"[OK] {label} stream found ({prop}={value}) after {time.time() - t0:.1f} s")
+        else:
+            print(f"[ERROR] {label} stream not found ({prop}={value}) within {timeout} s")
+        return label, bool(found)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(required))) as pool:
+        return [label for label, found in pool.map(resolve, required.items()) if not found]
+
+
+def wait_for_recording(recorder, output_filename, timeout=20, poll=0.2):
+    """
+    Wait until LabRecorder is actually writing: the XDF file exists and grows (stream data after the
+    headers). False if LabRecorder exits or the file does not grow within timeout.
+    """
+    deadline = time.time() + timeout
+    first_size = None
+    while time.time() < deadline:
+        if recorder.poll() is not None:
+            print(f"[ERROR] LabRecorder exited with code {recorder.returncode}")
+            return False
+        if os.path.exists(output_filename):
+            size = os.path.getsize(output_filename)
+            if first_size is None:
+                first_size = size
+            elif size > first_size:
+                print(f"[OK] LabRecorder is writing {output_filename}")
+                return True
+        time.sleep(poll)
+    print(f"[ERROR] {output_filename} is not being written after {timeout} s")
+    return False
+
+
 def release_labrecorder(recorder):
     recorder.terminate()
     recorder.wait()
     print("LabRecorder stopped.")
 
+
+def setup_xdf_recorder(output_filename, stream_filter=""):
+    """In-process XDF recorder (xdf_recorder.py), the cross-platform replacement of LabRecorderCLI."""
+    try:
+        recorder = XdfRecorder(output_filename, stream_filter)
+        recorder.start()
+        return recorder
+    except Exception as e:
+        print(f"[ERROR] Could not start XDF recorder: {e}")
+        return None
+
+
+def release_xdf_recorder(recorder):
+    try:
+        recorder.stop()
+    except Exception as e:
+        print(f"[ERROR] XDF recording incomplete: {e}")
+
 def setup_lsl_marker_stream(stream_name='Collection', stream_type='Markers'):
     info = StreamInfo(name=stream_name, type=stream_type, channel_count=1,
                       nominal_srate=0, channel_format='string',
@@ -137,6 +248,8 @@ def main():
     print(">>> main() Experimental Program started", flush=True, file=sys.stderr)
     # File paths and parameters
     output_video_file = r"D:\France\ISAE\Internship\CodeBase\EEG_Blink\data\videoRecordingTest_video_18_pt11.avi"
+    # XDF recording: in-process recorder by default, LabRecorderCLI.exe (Windows only) if use_labrecorder
+    use_labrecorder = False
     recorder_path = r"D:\France\ISAE\Internship\Tools\LabRecorder-1.16.4-Win_amd64\LabRecorder\LabRecorderCLI.exe"
     #output_xfd_filename = r"D:\France\ISAE\Internship\CodeBase\Experimental_Setup\data\session_fp05_09_001.xdf"
     output_xfd_filename = r"D:\France\ISAE\Internship\CodeBase\EEG_Blink\data\lslRecordingTest_video_18_pt11.xdf"
@@ -150,19 +263,50 @@ def main():
     ## if you have an external USB webcam connected
     #camera_id = 0 # for external USB webcam
     #camera_id = 1 # for built-in laptop webcam
+    ## several cameras (e.g. face + scene) are recorded by one subprocess
+    #camera_id = [0, 1]
 
-    video_proc = start_video_subprocess(camera_id=camera_id, output_video=output_video_file)
-    time.sleep(5)  # Give some time for the webcam to initialize
+    # Streams that must be live before the XDF recording starts (only the streams found at startup are recorded)
+    required_streams = {
+        "Video": ("source_id", "video_stream_001"),
+        "Markers": ("source_id", "marker_stream_001"),
+        "EEG": ("type", "EEG"),
+    }
+    startup_timeout = 30  # seconds
 
-    # Setup LSL Marker Stream
+    # Start the video recorder and the marker outlet, resolve the streams while the window opens
+    video_proc = start_video_subprocess(camera_id=camera_id, output_video=output_video_file)
+    if video_proc is None:
+        return
     outlet = setup_lsl_marker_stream()
-    time.sleep(10) # Give some time for stream discovery
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        video_ready = pool.submit(wait_video_ready, video_proc, startup_timeout)
+        missing = pool.submit(wait_for_streams, required_streams, startup_timeout)
 
-    # Setup Psychopy window
-    win = visual.Window(fullscr = True, color='black')
+        # Setup Psychopy window (must stay on the main thread)
+        win = visual.Window(fullscr = True, color='black')
+        video_ready, missing = video_ready.result(), missing.result()
+    if not video_ready or missing:
+        print(f"[ERROR] Session not started, missing: {', '.join(missing) or 'video recording'}")
+        stop_video_subprocess(video_proc)
+        win.close()
+        return
 
-    # Start LabRecorder via subprocess
-    recorder = setup_labrecorder(recorder_path, output_xfd_filename, stream_filter)
+    # Start the XDF recording, the protocol starts as soon as data is being written
+    if use_labrecorder:
+        recorder = setup_labrecorder(recorder_path, output_xfd_filename, stream_filter)
+        recording = recorder is not None and wait_for_recording(recorder, output_xfd_filename, timeout=startup_timeout)
+        release_recorder = release_labrecorder
+    else:
+        recorder = setup_xdf_recorder(output_xfd_filename, stream_filter)
+        recording = recorder is not None and recorder.wait_for_data(timeout=startup_timeout)
+        release_recorder = release_xdf_recorder
+    if not recording:
+        if recorder is not None:
+            release_recorder(recorder)
+        stop_video_subprocess(video_proc)
+        win.close()
+        return
 
     # Run the psychopy experiment
     #pyscho_experiment(win, outlet) # Small protoype experiment
@@ -171,11 +315,9 @@ def main():
     #time.sleep(10)
     print("Experiment finished, cleaning up...")
  
-    # Cleanup
+    # Cleanup: video first so that its last frames are in the XDF file (both calls wait for the end)
     stop_video_subprocess(video_proc)
-    time.sleep(5)  # ensure subprocess has ended
-    release_labrecorder(recorder)
-    time.sleep(2) 
+    release_recorder(recorder)
     win.close()
 
 
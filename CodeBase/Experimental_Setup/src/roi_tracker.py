@@ -0,0 +1,131 @@
+"""
+Project : Vigilens
+Description : Face / eye region tracking for the ROI recording mode of videoRecorder.py.
+
+The region is located with the Haar cascades bundled with OpenCV (cv2.data.haarcascades) at startup. It is
+then tracked cheaply: the cascade runs again only every few frames, on a downscaled search window around
+the last position, and the crop center follows the detections with exponential smoothing. The crop size is
+fixed at startup so that the recorded video keeps one frame size.
+"""
+
+import cv2
+import numpy as np
+
+FACE_CASCADE = "haarcascade_frontalface_default.xml"
+
+
+class FaceRoiTracker:
+    """
+    Fixed-size crop that follows the face (or the eye band of the face).
+
+    Args:
+        frame_size     : (width, height) of the camera frames
+        region         : 'face' or 'eyes' (band from 15 % to 60 % of the face height)
+        margin         : extra border around the region, as a fraction of its size
+        output_scale   : scale of the recorded crop (0.5 = half resolution)
+        min_output_width: the crop is never scaled below this width (eyelids must stay visible)
+        detect_width   : width the frames are downscaled to before running the cascade
+        redetect_every : frames between two detections
+        smoothing      : weight of a new detection in the crop center (0..1)
+    """
+
+    def __init__(self, frame_size, region="eyes", margin=0.25, output_scale=0.5, min_output_width=160,
+                 detect_width=480, redetect_every=5, smoothing=0.6):
+        if region not in ("face", "eyes"):
+            raise ValueError(f"region must be 'face' or 'eyes', got {region}")
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + FACE_CASCADE)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Could not load {FACE_CASCADE} from {cv2.data.haarcascades}")
+        self.frame_w, self.frame_h = frame_size
+        self.region = region
+        self.margin = margin
+        self.output_scale = output_scale
+        self.min_output_width = min_output_width
+        self.detect_scale = min(1.0, detect_width / self.frame_w)
+        self.redetect_every = redetect_every
+        self.smoothing = smoothing
+
+        # Until a face is found: centered crop of half the frame
+        self.crop_w, self.crop_h = _even(self.frame_w // 2), _even(self.frame_h // 2)
+        self.center = np.array([self.frame_w / 2, self.frame_h / 2])
+        self.found = False
+        self.detections = 0
+        self._frame_count = 0
+
+    @property
+    def output_size(self):
+        """(width, height) of the recorded crop."""
+        scale = min(1.0, max(self.output_scale, self.min_output_width / self.crop_w))
+        return _even(self.crop_w * scale), _even(self.crop_h * scale)
+
+    def _region_box(self, face):
+        """Region (x, y, w, h) in full-frame pixels for a face box, margin included."""
+        x, y, w, h = face
+        if self.region == "eyes":
+            y, h = y + 0.15 * h, 0.45 * h
+        return (x - self.margin * w, y - self.margin * h, w * (1 + 2 * self.margin), h * (1 + 2 * self.margin))
+
+    def _detect(self, frame, window=None):
+        """Largest face in the frame (or in window = (x0, y0, x1, y1)), in full-frame pixels, or None."""
+        x0, y0 = 0, 0
+        if window is not None:
+            x0, y0, x1, y1 = window
+            frame = frame[y0:y1, x0:x1]
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, None, fx=self.detect_scale, fy=self.detect_scale, interpolation=cv2.INTER_AREA)
+        faces = self.cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3]) / self.detect_scale
+        return x + x0, y + y0, w, h
+
+    def initialize(self, frames) -> bool:
+        """Locate the region on the first frames where a face is found and fix the crop size."""
+        for frame in frames:
+            face = self._detect(frame)
+            if face is None:
+                continue
+            x, y, w, h = self._region_box(face)
+            self.crop_w = _even(min(w, self.frame_w))
+            self.crop_h = _even(min(h, self.frame_h))
+            self.center = np.array([x + w / 2, y + h / 2])
+            self.found = True
+            self.detections += 1
+            return True
+        return False
+
+    def update(self, frame):
+        """Track the region; the cascade only runs every redetect_every frames."""
+        self._frame_count += 1
+        if self._frame_count % self.redetect_every:
+            return
+        window = None
+        if self.found:
+            # Search window: twice the crop around the current center
+            cx, cy = self.center
+            window = (int(max(0, cx - self.crop_w)), int(max(0, cy - self.crop_h)),
+                      int(min(self.frame_w, cx + self.crop_w)), int(min(self.frame_h, cy + self.crop_h)))
+        face = self._detect(frame, window)
+        if face is None:
+            return
+        x, y, w, h = self._region_box(face)
+        new_center = np.array([x + w / 2, y + h / 2])
+        self.center = new_center if not self.found else (1 - self.smoothing) * self.center + self.smoothing * new_center
+        self.found = True
+        self.detections += 1
+
+    def box(self):
+        """Current crop (x, y, w, h) in full-frame pixels, kept inside the frame."""
+        x = int(np.clip(self.center[0] - self.crop_w / 2, 0, self.frame_w - self.crop_w))
+        y = int(np.clip(self.center[1] - self.crop_h / 2, 0, self.frame_h - self.crop_h))
+        return x, y, self.crop_w, self.crop_h
+
+    def crop(self, frame):
+        """Downscaled crop of the current region."""
+        x, y, w, h = self.box()
+        return cv2.resize(frame[y:y + h, x:x + w], self.output_size, interpolation=cv2.INTER_AREA)
+
+
+def _even(value):
+    # Most encoders need even frame dimensions
+    return max(2, int(value) // 2 * 2)
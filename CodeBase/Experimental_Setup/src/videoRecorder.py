@@ -2,7 +2,15 @@ import cv2
 import time
 import csv
 import sys
+import os
+import json
+import queue
+import signal
+import threading
 from pylsl import StreamInfo, StreamOutlet, local_clock  
+from frame_index import write_frame_index
+from roi_tracker import FaceRoiTracker
+from camera_probe import DEFAULT_CACHE_PATH, probe_camera
 
 
 def record_video_with_timestamps(
@@ -72,128 +80,619 @@ def record_video_with_timestamps(
     print(f"Video saved to {output_video}")
     print(f"Timestamps saved to {output_timestamps}")
 
-def video_recording_lsl(camera_id=0, output_video="output.avi", fps=30, frame_size=None, duration=None):
-    """Record video and push frame timestamps to LSL."""
-    
-    print(f"Starting video recording on camera {camera_id} at {fps} FPS", flush=True)
-    # Open camera
-    cap = cv2.VideoCapture(camera_id)
-    print("Camera opened", flush=True)
-    if not cap.isOpened():
-        print("[ERROR] Could not open camera", flush=True)
-        #sys.exit(1)
-    else:
-        print("Camera opened successfully", flush=True)
 
-    cap.set(cv2.CAP_PROP_FPS, fps)
+# Channels of the Video LSL stream (one sample per frame written to the file)
+VIDEO_CHANNELS = [
+    ("frame_index", "index"),          # position of the frame in the recording (across segments)
+    ("capture_time_ms", "ms"),         # driver timestamp of the frame (CAP_PROP_POS_MSEC)
+    ("latency", "seconds"),            # grab -> push_chunk delay
+    ("dropped_frames", "count"),       # frames dropped so far (queue full)
+]
 
-    if frame_size is None:
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        frame_size = (width, height)
 
-    # Video writer
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")  # H.264 codec
-    writer = cv2.VideoWriter(output_video, fourcc, fps, frame_size)
-    #nadim
-    if not writer.isOpened():
-        print(f"[ERROR] Could not open VideoWriter for {output_video}")
-        cap.release()
-
-    # Create LSL outlet for video timestamps
+def create_video_outlet(source_id="video_stream_001", chunk_size=4, camera=None):
+    """LSL outlet of the video frame metadata (see VIDEO_CHANNELS); the sample timestamp is the grab time."""
     info = StreamInfo(name="Collection",
                       type="Video",
-                      channel_count=1,
+                      channel_count=len(VIDEO_CHANNELS),
                       nominal_srate=0,  # irregular sampling
-                      channel_format='int32',
-                      source_id='video_stream_001')
-    outlet = StreamOutlet(info)
-
-    start_time = time.time()
-    frame_index = 0
-
-    while True:
+                      channel_format='double64',
+                      source_id=source_id)
+    channels = info.desc().append_child("channels")
+    for label, unit in VIDEO_CHANNELS:
+        ch = channels.append_child("channel")
+        ch.append_child_value("label", label)
+        ch.append_child_value("unit", unit)
+    if camera is not None:
+        info.desc().append_child_value("camera", camera)
+    return StreamOutlet(info, chunk_size=chunk_size)
+
+
+# Frames waiting for the encoder, per camera. Every queued frame is a full BGR image (about 6 MB at 1080p,
+# 2.7 MB at 720p), so 30 frames (one second at 30 fps) already hold up to ~190 MB per camera.
+DEFAULT_QUEUE_SIZE = 30
+
+
+class RecorderStats:
+    """
+    Live counters of the capture/encode pipeline.
+
+    captured        : frames grabbed from the camera
+    written         : frames encoded and pushed to LSL
+    dropped         : frames discarded because the queue was full (encoder too slow) or the writer failed
+    queue_depth     : frames currently waiting for the encoder (max_queue_depth: highest value seen)
+    encode_time     : seconds spent in writer.write for the last frame (mean/max since the last report)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.encode_time = 0.0
+        self._encode_sum = 0.0
+        self._encode_max = 0.0
+        self._encode_n = 0
+
+    def add_captured(self):
+        """Count one grabbed frame; returns the number of frames dropped so far."""
+        with self.lock:
+            self.captured += 1
+            return self.dropped
+
+    def add_dropped(self):
+        with self.lock:
+            self.dropped += 1
+
+    def add_encode_time(self, seconds):
+        with self.lock:
+            self.encode_time = seconds
+            self._encode_sum += seconds
+            self._encode_max = max(self._encode_max, seconds)
+            self._encode_n += 1
+
+    def report(self, prefix=""):
+        """One status line; resets the encode time statistics."""
+        with self.lock:
+            mean = self._encode_sum / self._encode_n if self._encode_n else 0.0
+            line = (f"[STATS] {prefix + ' ' if prefix else ''}"
+                    f"captured={self.captured} written={self.written} dropped={self.dropped} "
+                    f"queue={self.queue_depth} (max {self.max_queue_depth}) "
+                    f"encode={mean * 1000:.1f} ms (max {self._encode_max * 1000:.1f} ms)")
+            self._encode_sum, self._encode_max, self._encode_n = 0.0, 0.0, 0
+        return line
+
+
+class SegmentedWriter:
+    """
+    cv2.VideoWriter that rotates to a new file every segment_minutes of video or segment_mb megabytes.
+
+    Without limits it writes output_video as it is. With limits the segments are named
+    <output>_000.avi, <output>_001.avi, ... and <output>.manifest.json maps every segment to its global frame
+    range and LSL time range; the manifest is rewritten each time a segment is opened or closed, so after a
+    crash only the segment in progress (status "recording") is lost. Each closed segment also gets its frame
+    index sidecar (see frame_index.py). A segment whose file cannot be opened is listed with status "failed"
+    and write raises RuntimeError from then on.
+    """
+
+    def __init__(self, output_video, fourcc, fps, frame_size, segment_minutes=None, segment_mb=None,
+                 frame_index=True):
+        self.output_video = output_video
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.fps = fps
+        self.frame_size = frame_size
+        self.segment_frames = int(segment_minutes * 60 * fps) if segment_minutes else None
+        self.segment_bytes = int(segment_mb * 1024 ** 2) if segment_mb else None
+        self.segmented = bool(segment_minutes or segment_mb)
+        self.frame_index = frame_index
+        self.manifest_path = f"{os.path.splitext(output_video)[0]}.manifest.json"
+        self.segments = []
+        self.frames_written = 0
+        self._writer = None
+        self._times = []
+
+    def _segment_path(self, number):
+        if not self.segmented:
+            return self.output_video
+        root, ext = os.path.splitext(self.output_video)
+        return f"{root}_{number:03d}{ext}"
+
+    def open(self):
+        """Open the next segment; returns False if the VideoWriter could not be opened."""
+        path = self._segment_path(len(self.segments))
+        self._writer = cv2.VideoWriter(path, self.fourcc, self.fps, self.frame_size)
+        self._times = []
+        opened = self._writer.isOpened()
+        if not opened:
+            print(f"[ERROR] Could not open VideoWriter for {path}", flush=True)
+            self._writer.release()
+            self._writer = None
+        self.segments.append({"file": os.path.basename(path), "first_frame": self.frames_written,
+                              "last_frame": None, "n_frames": 0, "first_lsl_time": None,
+                              "last_lsl_time": None, "status": "recording" if opened else "failed"})
+        self._write_manifest()
+        return opened
+
+    def _close_segment(self):
+        self._writer.release()
+        self._writer = None
+        segment = self.segments[-1]
+        path = self._segment_path(len(self.segments) - 1)
+        segment.update(n_frames=len(self._times), status="complete",
+                       last_frame=self.frames_written - 1 if self._times else None,
+                       first_lsl_time=self._times[0] if self._times else None,
+                       last_lsl_time=self._times[-1] if self._times else None)
+        if self.frame_index:
+            write_frame_index(path, self._times)
+        self._write_manifest()
+        if self.segmented:
+            print(f"[INFO] Segment saved to {path} ({segment['n_frames']} frames)", flush=True)
+
+    def _write_manifest(self):
+        if not self.segmented:
+            return
+        manifest = {"video": os.path.basename(self.output_video), "fps": self.fps,
+                    "frame_size": list(self.frame_size), "segments": self.segments}
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    def _segment_full(self):
+        n = len(self._times)
+        if self.segment_frames and n >= self.segment_frames:
+            return True
+        # File size is only checked once per second of video
+        if self.segment_bytes and n % max(1, int(self.fps)) == 0:
+            path = self._segment_path(len(self.segments) - 1)
+            return os.path.getsize(path) >= self.segment_bytes
+        return False
+
+    def write(self, frame, ts):
+        """Write one frame grabbed at LSL time ts; returns its global frame index."""
+        if self._writer is None:
+            raise RuntimeError(f"No open VideoWriter for {self.output_video}")
+        if self.segmented and self._times and self._segment_full():
+            self._close_segment()
+            if not self.open():
+                raise RuntimeError(f"Could not open segment {self.segments[-1]['file']}")
+        self._writer.write(frame)
+        self._times.append(ts)
+        self.frames_written += 1
+        return self.frames_written - 1
+
+    def release(self):
+        if self._writer is not None:
+            self._close_segment()
+
+
+def _startup_frames(cap, n):
+    for _ in range(n):
         ret, frame = cap.read()
-        if not ret:
-            print("[ERROR] Failed to grab frame", flush=True)
-            break
-
-        writer.write(frame)
-        #cv2.imshow('Camera', frame)
-
-        # Push frame index to LSL with high-resolution timestamp
-        ts = local_clock()
-        outlet.push_sample([frame_index], ts)
-
-        frame_index += 1
-
-        # Stop after duration if specified
-        if duration and (time.time() - start_time) >= duration:
-            print("[INFO] Reached specified duration, stopping recording.", flush=True)
-            break
-
-    cap.release()
-    writer.release()
-    cv2.destroyAllWindows()
-    print(f"[INFO] Video saved to {output_video}", flush=True)
-
-
-def validate_fps(obtained_fps, camera_id=0, num_frames=120):
-    cap = cv2.VideoCapture(camera_id)
-    if not cap.isOpened():
-        print("[ERROR] Could not open camera")
-        return 0
-
-    start = time.time()
-    for _ in range(num_frames):
-        ret, _ = cap.read()
-        if not ret:
-            break
-    end = time.time()
+        if ret:
+            yield frame
+
+
+class CameraRecorder:
+    """
+    One camera of a recording: capture thread, frame queue, video writer(s) and LSL Video outlet.
+
+    The capture thread grabs frames as fast as the camera delivers them and takes the LSL timestamp right
+    after the grab. Frames are encoded by the shared encoder threads of record_cameras (encode_next), always
+    one at a time per camera so that the file keeps the capture order. `ready` is set once the first frame
+    is written.
+    """
+
+    def __init__(self, camera_id, output_video, fps=30, frame_size=None, fourcc="mp4v", queue_size=DEFAULT_QUEUE_SIZE,
+                 chunk_size=4, frame_index=True, segment_minutes=None, segment_mb=None, roi=None, roi_scale=0.5,
+                 context_interval=2.0, source_id="video_stream_001", name=None, probe_cache=DEFAULT_CACHE_PATH,
+                 probe_refresh=False):
+        self.camera_id = camera_id
+        self.output_video = output_video
+        self.fps = fps
+        self.frame_size = frame_size
+        self.fourcc = fourcc
+        self.chunk_size = chunk_size
+        self.frame_index = frame_index
+        self.segment_minutes = segment_minutes
+        self.segment_mb = segment_mb
+        self.roi = roi
+        self.roi_scale = roi_scale
+        self.context_interval = context_interval
+        self.source_id = source_id
+        self.name = name or f"cam{camera_id}"
+        self.probe_cache = probe_cache
+        self.probe_refresh = probe_refresh
+        self.capabilities = None
+
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.stats = RecorderStats()
+        self.capture_done = False
+        self.failed = False         # set when the writer fails: capture stops, queued frames are discarded
+        self.ready = threading.Event()
+        self.cap = self.writer = self.context = self.tracker = self.outlet = None
+        self._rows, self._stamps = [], []
+        self._last_context = -float("inf")
+
+    def open(self) -> bool:
+        """Open the camera (once: the capability probe runs on this capture), the writer(s) and the LSL outlet."""
+        print(f"Starting video recording on camera {self.camera_id} at {self.fps or 'measured'} FPS", flush=True)
+        self.cap = cv2.VideoCapture(self.camera_id)
+        if not self.cap.isOpened():
+            print(f"[ERROR] Could not open camera {self.camera_id}", flush=True)
+            return False
+        print("Camera opened successfully", flush=True)
 
-    cap.release()
+        if self.fps:
+            self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.frame_size is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_size[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_size[1])
+
+        # Real frame rate of the camera in this mode, timed only the first time the device is used
+        caps, cached = probe_camera(self.cap, self.camera_id, fps=self.fps, frame_size=self.frame_size,
+                                    cache_path=self.probe_cache, refresh=self.probe_refresh)
+        self.capabilities = caps
+        print(f"[INFO] {self.name}: {caps['width']}x{caps['height']} {caps['backend']}, "
+              f"{caps['measured_fps']:.2f} FPS measured ({'cached' if cached else 'probed'})", flush=True)
+        if not self.fps:
+            self.fps = caps["measured_fps"] or caps["reported_fps"] or 30
+            print(f"[INFO] {self.name}: using {self.fps:.3f} FPS", flush=True)
+        elif caps["measured_fps"] and abs(caps["measured_fps"] - self.fps) > 0.2:
+            print(f"[WARNING] {self.name}: camera delivers {caps['measured_fps']:.3f} FPS, "
+                  f"{self.fps:.3f} requested", flush=True)
+        # Use the size the camera actually delivers, VideoWriter silently drops frames of another size
+        self.frame_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        # ROI mode: locate the face on the first frames, the crop size is fixed from there
+        if self.roi:
+            self.tracker = FaceRoiTracker(self.frame_size, region=self.roi, output_scale=self.roi_scale)
+            if self.tracker.initialize(_startup_frames(self.cap, int(self.fps))):
+                print(f"[INFO] {self.name}: {self.roi} region found at {self.tracker.box()}, "
+                      f"recording {self.tracker.output_size}", flush=True)
+            else:
+                print(f"[WARN] {self.name}: no face found at startup, recording the frame center until one is found",
+                      flush=True)
+            if self.context_interval:
+                root, ext = os.path.splitext(self.output_video)
+                # Nominal 1 fps, the frame index sidecar holds the real timestamps
+                self.context = SegmentedWriter(f"{root}_context{ext}", self.fourcc, 1, self.frame_size,
+                                               segment_minutes=self.segment_minutes, segment_mb=self.segment_mb,
+                                               frame_index=self.frame_index)
+                if not self.context.open():
+                    self.context = None
+
+        # Video writer
+        self.writer = SegmentedWriter(self.output_video, self.fourcc, self.fps,
+                                      self.tracker.output_size if self.tracker else self.frame_size,
+                                      segment_minutes=self.segment_minutes, segment_mb=self.segment_mb,
+                                      frame_index=self.frame_index)
+        if not self.writer.open():
+            self.cap.release()
+            return False
+
+        # LSL outlet for the frame metadata
+        self.outlet = create_video_outlet(source_id=self.source_id, chunk_size=self.chunk_size,
+                                          camera=str(self.camera_id))
+        return True
+
+    def capture_loop(self, stop_event, duration, work):
+        """Grab frames until stop_event, the duration or the end of the capture; releases `work` per frame."""
+        stats = self.stats
+        start_time = time.time()
+        while not stop_event.is_set() and not self.failed:
+            if not self.cap.grab():
+                print(f"[ERROR] {self.name}: failed to grab frame", flush=True)
+                break
+            ts = local_clock()
+            pos_msec = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                print(f"[ERROR] {self.name}: failed to retrieve frame", flush=True)
+                break
+            dropped = stats.add_captured()
+
+            try:
+                self.frames.put_nowait((frame, ts, pos_msec, dropped))
+                work.release()
+            except queue.Full:
+                stats.add_dropped()
+            depth = self.frames.qsize()
+            stats.queue_depth = depth
+            stats.max_queue_depth = max(stats.max_queue_depth, depth)
+
+            # Stop after duration if specified
+            if duration and (time.time() - start_time) >= duration:
+                print(f"[INFO] {self.name}: reached specified duration, stopping recording.", flush=True)
+                break
+        self.capture_done = True
+        work.release()  # wakes an encoder thread so it can notice the end of the capture
+
+    def _flush(self):
+        now = local_clock()
+        for row, ts in zip(self._rows, self._stamps):
+            row[2] = now - ts
+        self.outlet.push_chunk(self._rows, self._stamps)
+        self._rows.clear()
+        self._stamps.clear()
+
+    def encode_next(self, blocking=True) -> bool:
+        """
+        Encode the oldest queued frame and push its metadata (in chunks) to LSL; False if no frame was queued
+        (or, with blocking=False, if another encoder thread is busy with this camera).
+
+        With a tracker (ROI mode) only the tracked crop goes to the main writer; one full frame every
+        context_interval seconds goes to the context writer.
+        """
+        if not self.lock.acquire(blocking=blocking):
+            return False
+        try:
+            try:
+                frame, ts, pos_msec, dropped = self.frames.get_nowait()
+            except queue.Empty:
+                return False
+            if self.failed:
+                self.stats.add_dropped()
+                return True
+
+            t0 = time.perf_counter()
+            if self.tracker is not None:
+                self.tracker.update(frame)
+                if self.context is not None and ts - self._last_context >= self.context_interval:
+                    try:
+                        self.context.write(frame, ts)
+                    except RuntimeError as error:
+                        # The context frames are auxiliary: keep recording the ROI without them
+                        print(f"[ERROR] {self.name}: {error}, context frames disabled", flush=True)
+                        self.context.release()
+                        self.context = None
+                    self._last_context = ts
+                frame = self.tracker.crop(frame)
+            try:
+                frame_index = self.writer.write(frame, ts)
+            except RuntimeError as error:
+                print(f"[ERROR] {self.name}: {error}, stopping this camera", flush=True)
+                self.failed = True
+                self.stats.add_dropped()
+                return True
+            self.stats.add_encode_time(time.perf_counter() - t0)
+
+            self._rows.append([frame_index, pos_msec, 0.0, dropped])
+            self._stamps.append(ts)
+            self.stats.written = frame_index + 1
+            self.stats.queue_depth = self.frames.qsize()
+            self.ready.set()
+            if len(self._rows) >= self.chunk_size:
+                self._flush()
+            return True
+        finally:
+            self.lock.release()
+
+    @property
+    def finished(self):
+        return self.capture_done and self.frames.empty()
+
+    def close(self):
+        with self.lock:
+            if self._rows:
+                self._flush()
+            self.cap.release()
+            self.writer.release()
+            if self.context is not None:
+                self.context.release()
+        print(self.stats.report(prefix=self.name), flush=True)
+        if self.writer.segmented:
+            print(f"[INFO] {len(self.writer.segments)} video segments listed in {self.writer.manifest_path}",
+                  flush=True)
+        else:
+            print(f"[INFO] Video saved to {self.output_video}", flush=True)
+
+
+def _encoder_worker(recorders, work, first=0):
+    """
+    Shared encoder thread: every `work` token is one queued frame (or the end of one capture). The token
+    holder encodes the oldest frame of the first camera that has one and is not being encoded by another
+    thread, starting from a different camera for every token (round robin from `first`) so that no camera
+    is always served last. Only when every camera is empty or busy does it wait for the busy ones. The
+    thread exits once every capture is done and every queue is empty.
+    """
+    start = first
+    while True:
+        work.acquire()
+        order = recorders[start:] + recorders[:start]
+        start = (start + 1) % len(recorders)
+        if any(r.encode_next(blocking=False) for r in order) or any(r.encode_next() for r in order):
+            continue
+        if all(r.finished for r in recorders):
+            work.release()  # let the other encoder threads see the end too
+            return
+
+
+def record_cameras(camera_ids, output_videos, fps=30, frame_size=None, duration=None, encoder_threads=None,
+                   stats_interval=5.0, stop_event=None, ready_event=None, **options):
+    """
+    Record several cameras in one process, each with its own output file and LSL Video stream.
+
+    Every camera has its own capture thread; the frames of all cameras are encoded by one pool of
+    encoder_threads threads (default: one per camera). All timestamps come from the same LSL clock.
+    The first camera publishes source_id video_stream_001 (as a single-camera recording), the next ones
+    video_stream_002, ... Once every camera has written its first frame, a "[READY]" line is printed (read
+    by main.py) and ready_event is set.
+
+    Args:
+        camera_ids      : list of camera indices (or video files / URLs accepted by cv2.VideoCapture)
+        output_videos   : list of output paths, one per camera
+        fps             : requested frame rate of every camera, None to use the measured rate (camera_probe.py)
+        frame_size      : (width, height) requested from every camera, camera default if None
+        duration        : seconds to record, until the captures fail or stop_event is set if None
+        encoder_threads : size of the shared encoder pool
+        stats_interval  : seconds between two [STATS] reports, 0 to disable
+        stop_event      : threading.Event that stops the recording when set
+        ready_event     : threading.Event set once every camera has written its first frame
+        options         : CameraRecorder options (fourcc, queue_size, chunk_size, frame_index, segment_minutes,
+                          segment_mb, roi, roi_scale, context_interval, probe_cache, probe_refresh)
+
+    Returns:
+        stats : list of RecorderStats, one per camera (None for a camera that could not be opened)
+    """
+    if len(camera_ids) != len(output_videos):
+        raise ValueError("One output video per camera is required")
+
+    recorders = []
+    for i, (camera_id, output_video) in enumerate(zip(camera_ids, output_videos)):
+        recorder = CameraRecorder(camera_id, output_video, fps=fps, frame_size=frame_size,
+                                  source_id=f"video_stream_{i + 1:03d}", **options)
+        recorders.append(recorder if recorder.open() else None)
+    active = [r for r in recorders if r is not None]
+    if not active:
+        return [None] * len(recorders)
+
+    stop_event = stop_event or threading.Event()
+    work = threading.Semaphore(0)
+    capture_threads = [threading.Thread(target=r.capture_loop, args=(stop_event, duration, work),
+                                        name=f"video-capture-{r.name}", daemon=True) for r in active]
+    encode_threads = [threading.Thread(target=_encoder_worker, args=(active, work, i % len(active)),
+                                       name=f"video-encode-{i}", daemon=True)
+                      for i in range(encoder_threads or len(active))]
+    for thread in capture_threads + encode_threads:
+        thread.start()
+
+    # Short joins keep the main thread responsive to signals (SIGTERM / CTRL_BREAK set stop_event)
+    next_report = time.time() + stats_interval
+    ready = False
+    try:
+        while any(t.is_alive() for t in encode_threads):
+            if not ready:
+                ready = all(r.ready.wait(timeout=0.05) for r in active)
+                if ready:
+                    print(f"[READY] Recording {', '.join(r.output_video for r in active)}", flush=True)
+                    if ready_event is not None:
+                        ready_event.set()
+            else:
+                encode_threads[0].join(timeout=0.5)
+            if stats_interval and time.time() >= next_report:
+                for r in active:
+                    print(r.stats.report(prefix=r.name), flush=True)
+                next_report += stats_interval
+    except KeyboardInterrupt:
+        print("[INFO] Interrupted, stopping recording.", flush=True)
+        stop_event.set()
+        for thread in capture_threads + encode_threads:
+            thread.join()
+
+    for r in active:
+        r.close()
     cv2.destroyAllWindows()
-    elapsed = end - start
-    fps = num_frames / elapsed if elapsed > 0 else 0
-    if abs(fps - obtained_fps) > 0.2:
-        print(f"[WARNING] Obtained FPS ({obtained_fps:.3f}) differs from camera FPS setting ({fps:.3f})")
-        return False, fps
-    return True, fps
-
-def obtain_fps_opencv(camera_id=0):
-    cap = cv2.VideoCapture(camera_id)
-    if not cap.isOpened():
-        print("[ERROR] Could not open camera")
-        return 0
+    return [r.stats if r is not None else None for r in recorders]
+
+
+def video_recording_lsl(camera_id=0, output_video="output.avi", fps=30, frame_size=None, duration=None,
+                        fourcc="mp4v", queue_size=DEFAULT_QUEUE_SIZE, chunk_size=4, stats_interval=5.0, stop_event=None,
+                        frame_index=True, segment_minutes=None, segment_mb=None, roi=None, roi_scale=0.5,
+                        context_interval=2.0):
+    """
+    Record video and push frame metadata to LSL.
+
+    Capture and encoding run in two threads connected by a bounded frame queue, so a slow encode never
+    delays the next grab. When the queue is full the newest frame is dropped (and counted) instead of
+    blocking the camera. Every written frame gives one sample of the Video stream (VIDEO_CHANNELS),
+    stamped with its grab time and pushed in chunks of chunk_size frames.
+
+    Args:
+        camera_id      : camera index (or video file / URL accepted by cv2.VideoCapture)
+        output_video   : path of the recorded video
+        fps            : requested frame rate, also the frame rate of the file
+        frame_size     : (width, height) requested from the camera, camera default if None
+        duration       : seconds to record, until the capture fails or stop_event is set if None
+        fourcc         : codec of the video file
+        queue_size     : maximum number of frames waiting for the encoder (each one is a full BGR frame: about
+                         6 MB at 1080p, see DEFAULT_QUEUE_SIZE)
+        chunk_size     : frames per LSL push_chunk
+        stats_interval : seconds between two [STATS] lines, 0 to disable
+        stop_event     : threading.Event that stops the recording when set
+        frame_index    : also write the binary frame index sidecar (see frame_index.py)
+        segment_minutes: rotate to a new file after this many minutes of video (see SegmentedWriter)
+        segment_mb     : rotate to a new file once the current one reaches this size
+        roi            : None (full frames), 'face' or 'eyes': record only the tracked region (see roi_tracker.py)
+        roi_scale      : scale of the recorded region
+        context_interval: ROI mode only, seconds between two full frames written to <output>_context.avi
+                         (0 to disable)
+
+    Returns:
+        stats : RecorderStats of the recording
+    """
+    return record_cameras([camera_id], [output_video], fps=fps, frame_size=frame_size, duration=duration,
+                          encoder_threads=1, stats_interval=stats_interval, stop_event=stop_event, fourcc=fourcc,
+                          queue_size=queue_size, chunk_size=chunk_size, frame_index=frame_index,
+                          segment_minutes=segment_minutes, segment_mb=segment_mb, roi=roi, roi_scale=roi_scale,
+                          context_interval=context_interval)[0]
+
+
+def install_stop_handlers(stop_event):
+    """
+    Stop the recording cleanly on SIGTERM / SIGINT (and CTRL_BREAK on Windows, where terminate() cannot be
+    caught; see stop_video_subprocess in main.py), so the open segment is closed instead of truncated.
+    """
+    def handler(signum, frame):
+        print(f"[INFO] Signal {signum} received, stopping recording.", flush=True)
+        stop_event.set()
+
+    for name in ("SIGTERM", "SIGINT", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handler)
 
-    # Try to get FPS from camera properties
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    cap.release()
-    cv2.destroyAllWindows()
-    return fps
 
 if __name__ == "__main__":
-    import sys
-    camera_id = int(sys.argv[1])
-    output_video = sys.argv[2]
-    if len(sys.argv) > 3:
-        provided_fps = float(sys.argv[3])
-    else:
-        provided_fps = 30.0  # default FPS
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("camera_ids", help="Camera index, or comma-separated indices (e.g. 0,1).")
+    parser.add_argument("output_video", help="Output file; with several cameras <name>_cam<id><ext> per camera.")
+    parser.add_argument("fps", type=float, nargs="?", default=30.0,
+                        help="Requested FPS, 0 to use the measured camera rate.")
+    parser.add_argument("--segment-minutes", type=float, default=None, help="Rotate the file every N minutes.")
+    parser.add_argument("--segment-mb", type=float, default=None, help="Rotate the file every N megabytes.")
+    parser.add_argument("--roi", choices=["face", "eyes"], default=None, help="Record only the tracked region.")
+    parser.add_argument("--roi-scale", type=float, default=0.5, help="Scale of the recorded region.")
+    parser.add_argument("--context-interval", type=float, default=2.0,
+                        help="ROI mode: seconds between two full frames in <output>_context.avi (0 = off).")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Frames waiting for the encoder per camera; each one is a full frame "
+                             "(about 6 MB at 1080p), so the queue can hold queue-size x 6 MB per camera.")
+    parser.add_argument("--encoder-threads", type=int, default=None,
+                        help="Shared encoder threads (default: one per camera).")
+    parser.add_argument("--probe-refresh", action="store_true",
+                        help="Measure the camera again instead of using the cached capabilities.")
+    arg = parser.parse_args()
+    camera_ids = [int(c) if c.strip().isdigit() else c.strip() for c in arg.camera_ids.split(",")]
+    camera_id = camera_ids[0]
+    output_video = arg.output_video
+    provided_fps = arg.fps
     print(f"Camera ID: {camera_id}, Output Video: {output_video}, FPS: {provided_fps}", flush=True)
-    if provided_fps == None or provided_fps <= 0:
-        print("[INFO] No valid FPS provided, attempting to obtain from camera...", flush=True)
-        obtained_fps = obtain_fps_opencv(camera_id=0)
-        result, calculate_fps = validate_fps(obtained_fps, camera_id=0)
-        if result : fps = obtained_fps
-        else : fps = calculate_fps
-    else:
-        fps = provided_fps
-
-    print(f"Using FPS: {fps:.3f}")
+    # No valid FPS: the recorder uses the rate measured by the (cached) camera probe
+    fps = provided_fps if provided_fps and provided_fps > 0 else None
 
-    video_recording_lsl(
-        camera_id=camera_id,
-        output_video=output_video,
-        fps=fps
+    if len(camera_ids) > 1:
+        root, ext = os.path.splitext(output_video)
+        output_videos = [f"{root}_cam{c}{ext}" for c in camera_ids]
+    else:
+        output_videos = [output_video]
+
+    stop_event = threading.Event()
+    install_stop_handlers(stop_event)
+    record_cameras(
+        camera_ids,
+        output_videos,
+        fps=fps,
+        encoder_threads=arg.encoder_threads,
+        queue_size=arg.queue_size,
+        stop_event=stop_event,
+        segment_minutes=arg.segment_minutes,
+        segment_mb=arg.segment_mb,
+        roi=arg.roi,
+        roi_scale=arg.roi_scale,
+        context_interval=arg.context_interval,
+        probe_refresh=arg.probe_refresh
     )
@@ -0,0 +1,370 @@
+"""
+Project : Vigilens
+Description : In-process XDF recorder (replaces LabRecorderCLI.exe).
+
+Streams are resolved by predicate (same XPath syntax as LabRecorderCLI, e.g. "name='Collection'"). One thread
+per inlet pulls chunks, with a timeout so that it sleeps between chunks instead of polling, and encodes them
+as XDF Samples chunks (numeric streams with one numpy structured array per chunk). A single writer thread
+appends the chunks to a buffered file through a bounded queue, so memory stays bounded if the disk stalls.
+ClockOffset chunks are measured every few seconds for every stream and Boundary chunks are written
+periodically. stop() drains the inlets, writes the StreamFooter chunks and closes the file.
+
+The file follows the XDF 1.0 specification (https://github.com/sccn/xdf/wiki/Specifications) and loads
+with pyxdf.load_xdf like a LabRecorder file.
+
+Example:
+    recorder = XdfRecorder("session.xdf", "name='Collection'")
+    recorder.start()
+    ...
+    recorder.stop()
+"""
+
+import queue
+import struct
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from pylsl import StreamInlet, local_clock, resolve_bypred, resolve_streams as resolve_all
+from pylsl import cf_float32, cf_double64, cf_int32, cf_int16, cf_int8, cf_int64
+
+TAG_FILE_HEADER = 1
+TAG_STREAM_HEADER = 2
+TAG_SAMPLES = 3
+TAG_CLOCK_OFFSET = 4
+TAG_BOUNDARY = 5
+TAG_STREAM_FOOTER = 6
+BOUNDARY_UUID = bytes([0x43, 0xA5, 0x46, 0xDC, 0xCB, 0xF5, 0x41, 0x0F,
+                       0xB3, 0x0E, 0xD5, 0x46, 0x73, 0x83, 0xCB, 0xE4])
+
+# LSL channel format -> little-endian numpy type of the XDF sample values
+CHANNEL_DTYPES = {cf_float32: "<f4", cf_double64: "<f8", cf_int32: "<i4", cf_int16: "<i2", cf_int8: "i1",
+                  cf_int64: "<i8"}
+
+
+def _varlen(n: int) -> bytes:
+    """XDF variable-length integer: 1 byte giving the width (1, 4 or 8), then the value."""
+    if n < 256:
+        return struct.pack("<BB", 1, n)
+    if n < 2 ** 32:
+        return struct.pack("<BI", 4, n)
+    return struct.pack("<BQ", 8, n)
+
+
+def encode_chunk(tag: int, content: bytes) -> bytes:
+    return _varlen(len(content) + 2) + struct.pack("<H", tag) + content
+
+
+def encode_numeric_samples(stream_id: int, values: np.ndarray, timestamps: np.ndarray, dtype: str) -> bytes:
+    """Samples chunk of a numeric stream; every sample carries its 8-byte timestamp."""
+    n, n_channels = values.shape
+    records = np.empty(n, dtype=[("ts_bytes", "u1"), ("ts", "<f8"), ("values", dtype, (n_channels,))])
+    records["ts_bytes"] = 8
+    records["ts"] = timestamps
+    records["values"] = values
+    return encode_chunk(TAG_SAMPLES, struct.pack("<I", stream_id) + _varlen(n) + records.tobytes())
+
+
+def encode_string_samples(stream_id: int, samples, timestamps) -> bytes:
+    parts = [struct.pack("<I", stream_id), _varlen(len(samples))]
+    for sample, ts in zip(samples, timestamps):
+        parts.append(struct.pack("<Bd", 8, ts))
+        for value in sample:
+            data = value.encode("utf-8")
+            parts.append(_varlen(len(data)))
+            parts.append(data)
+    return encode_chunk(TAG_SAMPLES, b"".join(parts))
+
+
+def encode_clock_offset(stream_id: int, collection_time: float, offset: float) -> bytes:
+    return encode_chunk(TAG_CLOCK_OFFSET, struct.pack("<Idd", stream_id, collection_time, offset))
+
+
+def _xml(root: ET.Element) -> bytes:
+    return b'<?xml version="1.0"?>' + ET.tostring(root, encoding="utf-8")
+
+
+def resolve_streams(predicates, timeout=5.0):
+    """
+    StreamInfos matching any of the predicates (a str or a list of str), without duplicates.
+
+    Args:
+        predicates : XPath predicate(s), e.g. "name='Collection'" or ["type='EEG'", "type='Markers'"];
+                     an empty string matches every stream
+        timeout    : seconds to wait for the first stream of each predicate
+    """
+    if isinstance(predicates, str):
+        predicates = [predicates]
+    found = {}
+    for predicate in predicates:
+        if not predicate:
+            infos = resolve_all(wait_time=timeout)
+        elif resolve_bypred(predicate, minimum=1, timeout=timeout):
+            # Several streams can match: give the others one more second to answer
+            infos = resolve_bypred(predicate, minimum=1 << 16, timeout=1.0)
+        else:
+            infos = []
+        for info in infos:
+            found.setdefault(info.uid(), info)
+    return list(found.values())
+
+
+class _StreamRecorder:
+    """Inlet, encoding and footer bookkeeping of one recorded stream."""
+
+    def __init__(self, stream_id, info, max_chunk):
+        self.stream_id = stream_id
+        self.inlet = StreamInlet(info, max_buflen=360, max_chunklen=0, recover=True)
+        self.info = self.inlet.info()  # full info, with the desc element
+        self.name = self.info.name()
+        self.n_channels = self.info.channel_count()
+        self.dtype = CHANNEL_DTYPES.get(self.info.channel_format())
+        self.max_chunk = max_chunk
+        self.buffer = None if self.dtype is None else np.empty((max_chunk, self.n_channels),
+                                                               dtype=self.dtype.lstrip("<"))
+        self.sample_count = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.clock_offsets = []
+        self.has_data = threading.Event()
+
+    def header(self) -> bytes:
+        return encode_chunk(TAG_STREAM_HEADER, struct.pack("<I", self.stream_id) + self.info.as_xml().encode())
+
+    def pull(self, timeout):
+        """Encoded Samples chunk of everything available (waiting up to timeout), or None."""
+        if self.buffer is not None:
+            _, timestamps = self.inlet.pull_chunk(timeout=timeout, max_samples=self.max_chunk, dest_obj=self.buffer)
+            samples = self.buffer[:len(timestamps)]
+        else:
+            samples, timestamps = self.inlet.pull_chunk(timeout=timeout, max_samples=self.max_chunk)
+        if not timestamps:
+            return None
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamps[0]
+        self.last_timestamp = timestamps[-1]
+        self.sample_count += len(timestamps)
+        self.has_data.set()
+        if self.buffer is not None:
+            return encode_numeric_samples(self.stream_id, samples, np.asarray(timestamps), self.dtype)
+        return encode_string_samples(self.stream_id, samples, timestamps)
+
+    def clock_offset(self):
+        """Encoded ClockOffset chunk, or None if the time correction timed out."""
+        try:
+            offset = self.inlet.time_correction(timeout=2.0)
+        except Exception:
+            return None
+        collection_time = local_clock() - offset  # in the clock of the stream, as LabRecorder writes it
+        self.clock_offsets.append((collection_time, offset))
+        return encode_clock_offset(self.stream_id, collection_time, offset)
+
+    def footer(self) -> bytes:
+        root = ET.Element("info")
+        ET.SubElement(root, "first_timestamp").text = repr(self.first_timestamp or 0.0)
+        ET.SubElement(root, "last_timestamp").text = repr(self.last_timestamp or 0.0)
+        ET.SubElement(root, "sample_count").text = str(self.sample_count)
+        duration = (self.last_timestamp or 0.0) - (self.first_timestamp or 0.0)
+        srate = (self.sample_count - 1) / duration if duration > 0 else 0.0
+        ET.SubElement(root, "measured_srate").text = repr(srate)
+        offsets = ET.SubElement(root, "clock_offsets")
+        for collection_time, value in self.clock_offsets:
+            offset = ET.SubElement(offsets, "offset")
+            ET.SubElement(offset, "time").text = repr(collection_time)
+            ET.SubElement(offset, "value").text = repr(value)
+        return encode_chunk(TAG_STREAM_FOOTER, struct.pack("<I", self.stream_id) + _xml(root))
+
+
+class XdfRecorder:
+    """
+    Record LSL streams to an XDF file from the current process.
+
+    Args:
+        filename        : output .xdf file
+        predicates      : stream predicate(s) (see resolve_streams), or a list of pylsl.StreamInfo
+        resolve_timeout : seconds to wait for each predicate
+        pull_timeout    : seconds an inlet thread waits for data (chunk period of a regular stream)
+        max_chunk       : maximum samples per Samples chunk
+        offset_interval : seconds between two ClockOffset measurements of a stream
+        boundary_interval: seconds between two Boundary chunks
+        flush_interval  : seconds between two flushes of the file buffer (data lost on a crash at most)
+        queue_size      : encoded chunks waiting for the writer (bounds the memory used)
+        buffer_size     : size of the file write buffer in bytes
+    """
+
+    def __init__(self, filename, predicates="", resolve_timeout=5.0, pull_timeout=0.2, max_chunk=1024,
+                 offset_interval=5.0, boundary_interval=10.0, flush_interval=1.0, queue_size=256,
+                 buffer_size=1 << 20):
+        self.filename = filename
+        self.predicates = predicates
+        self.resolve_timeout = resolve_timeout
+        self.pull_timeout = pull_timeout
+        self.max_chunk = max_chunk
+        self.offset_interval = offset_interval
+        self.boundary_interval = boundary_interval
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.streams = []
+        self.bytes_written = 0
+        self._chunks = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._pullers = []
+        self._writer = None
+        self._file = None
+        self.error = None  # exception of the writer thread (disk full, share gone...), re-raised by stop()
+
+    def start(self):
+        """Resolve the streams, write the headers and start recording; returns the recorded stream names."""
+        infos = self.predicates if isinstance(self.predicates, list) and self.predicates \
+            and not isinstance(self.predicates[0], str) else resolve_streams(self.predicates, self.resolve_timeout)
+        if not infos:
+            raise ConnectionError(f"Predicate {self.predicates!r} matched no stream")
+        self.streams = [_StreamRecorder(i + 1, info, self.max_chunk) for i, info in enumerate(infos)]
+
+        self._file = open(self.filename, "wb", buffering=self.buffer_size)
+        header = ET.Element("info")
+        ET.SubElement(header, "version").text = "1.0"
+        ET.SubElement(header, "datetime").text = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        self._write(b"XDF:" + encode_chunk(TAG_FILE_HEADER, _xml(header)))
+        for stream in self.streams:
+            self._write(stream.header())
+            offset = stream.clock_offset()
+            if offset:
+                self._write(offset)
+        self._file.flush()
+
+        self._writer = threading.Thread(target=self._write_loop, name="xdf-writer", daemon=True)
+        self._writer.start()
+        for stream in self.streams:
+            thread = threading.Thread(target=self._pull_loop, args=(stream,), name=f"xdf-{stream.name}",
+                                      daemon=True)
+            thread.start()
+            self._pullers.append(thread)
+        names = [f"{s.name} ({s.info.type()})" for s in self.streams]
+        print(f"[INFO] Recording {len(names)} streams to {self.filename}: {', '.join(names)}", flush=True)
+        return names
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def _pull_loop(self, stream):
+        next_offset = time.time() + self.offset_interval
+        while not self._stop.is_set():
+            chunk = stream.pull(self.pull_timeout)
+            if chunk:
+                self._chunks.put(chunk)
+            if time.time() >= next_offset:
+                offset = stream.clock_offset()
+                if offset:
+                    self._chunks.put(offset)
+                next_offset += self.offset_interval
+        # Drain what arrived before stop() (pointless once the writer has failed)
+        while self.error is None:
+            chunk = stream.pull(0.0)
+            if not chunk:
+                break
+            self._chunks.put(chunk)
+        offset = stream.clock_offset()
+        if offset and self.error is None:
+            self._chunks.put(offset)
+
+    def _write_loop(self):
+        next_flush = time.time() + self.flush_interval
+        next_boundary = time.time() + self.boundary_interval
+        while True:
+            try:
+                chunk = self._chunks.get(timeout=self.flush_interval)
+            except queue.Empty:
+                chunk = b""
+            if chunk is None:
+                break
+            if self.error is not None:
+                continue  # keep emptying the queue so that the inlet threads never block on put
+            try:
+                if chunk:
+                    self._write(chunk)
+                now = time.time()
+                if now >= next_boundary:
+                    self._write(encode_chunk(TAG_BOUNDARY, BOUNDARY_UUID))
+                    next_boundary = now + self.boundary_interval
+                if now >= next_flush:
+                    self._file.flush()
+                    next_flush = now + self.flush_interval
+            except Exception as error:
+                self.error = error
+                self._stop.set()
+                print(f"[ERROR] Writing {self.filename} failed, recording stopped: {error}", flush=True)
+
+    def wait_for_data(self, timeout=10.0) -> bool:
+        """True once every regular-rate stream has delivered samples (marker streams are irregular)."""
+        deadline = time.time() + timeout
+        for stream in self.streams:
+            if stream.info.nominal_srate() > 0 and not stream.has_data.wait(max(0.0, deadline - time.time())):
+                print(f"[ERROR] No data from {stream.name} ({stream.info.type()}) within {timeout} s", flush=True)
+                return False
+        return True
+
+    def stop(self):
+        """
+        Drain the inlets, write the stream footers and close the file.
+
+        Raises the exception of the writer thread if writing failed during the recording (the file is closed,
+        its content stops at the failure).
+        """
+        if self._file is None:
+            return
+        self._stop.set()
+        for thread in self._pullers:
+            thread.join()
+        self._chunks.put(None)
+        self._writer.join()
+        for stream in self.streams:
+            stream.inlet.close_stream()
+        try:
+            if self.error is None:
+                for stream in self.streams:
+                    self._write(stream.footer())
+            self._file.close()
+        except Exception as error:
+            self.error = self.error or error
+        finally:
+            self._file = None
+        if self.error is not None:
+            raise self.error
+        for stream in self.streams:
+            print(f"[INFO] {stream.name} ({stream.info.type()}): {stream.sample_count} samples", flush=True)
+        print(f"[INFO] XDF saved to {self.filename} ({self.bytes_written / 1e6:.1f} MB)", flush=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import signal
+    parser = argparse.ArgumentParser(description="Record LSL streams to XDF (LabRecorderCLI replacement).")
+    parser.add_argument("filename")
+    parser.add_argument("predicates", nargs="*", default=[""],
+                        help="Stream predicates, e.g. \"name='Collection'\" (all streams if omitted).")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to record (default: until Enter).")
+    arg = parser.parse_args()
+
+    def wait_for_enter():
+        try:
+            input()
+            stop_event.set()
+        except EOFError:  # no console (e.g. started as a subprocess without stdin)
+            pass
+
+    recorder = XdfRecorder(arg.filename, arg.predicates)
+    recorder.start()
+    stop_event = threading.Event()
+    for name in ("SIGTERM", "SIGINT", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), lambda signum, frame: stop_event.set())
+    # Like LabRecorderCLI: a new line on stdin stops the recording
+    threading.Thread(target=wait_for_enter, daemon=True).start()
+    start = time.time()
+    while not stop_event.wait(0.5):  # short waits keep the signal handlers responsive on Windows
+        if arg.duration and time.time() - start >= arg.duration:
+            break
+    recorder.stop()
@@ -1,29 +1,110 @@
 import keyboard
 from pylsl import StreamInfo, StreamOutlet, local_clock
+import queue
+import threading
 import time
 
 class LSLMarkerPusher:
-    def __init__(self, stream_name='Markers', stream_type='Collection'):
+    """
+    LSL marker outlet, with an event-driven keyboard mode.
+
+    push_marker sends one marker right away. start_listening installs a keyboard hook instead of polling:
+    the hook callback only converts the key-down time of the event to the LSL clock and queues the marker,
+    a sender thread blocks on the queue and pushes whatever is queued (a burst of presses goes out as one
+    chunk). Key auto-repeat is ignored (one marker per press) and presses closer than `debounce` seconds
+    to the previous one of the same key are dropped.
+
+    Example:
+        pusher = LSLMarkerPusher(key_map={'b': 'blink', 'd': 'double_blink'})
+        pusher.start_listening()
+        keyboard.wait('esc')
+        pusher.stop_listening()
+    """
+    def __init__(self, stream_name='Markers', stream_type='Collection', key_map=None, debounce=0.05):
         self.info = StreamInfo(name=stream_name, type=stream_type, channel_count=1,
                                nominal_srate=0, channel_format='string',
                                source_id='marker_stream_001')
         self.outlet = StreamOutlet(self.info)
+        self.key_map = dict(key_map or {'b': 'blink'})
+        self.debounce = debounce
+        self._queue = queue.Queue()
+        self._held = set()
+        self._last_press = {}
+        self._hook = None
+        self._sender = None
 
-    def push_marker(self, marker):
-        timestamp = local_clock()
+    def push_marker(self, marker, timestamp=None):
+        timestamp = local_clock() if timestamp is None else timestamp
         self.outlet.push_sample([marker], timestamp)
         print(f"[MARKER] {marker} @ {timestamp}")
 
+    def _on_key(self, event):
+        # Runs in the keyboard hook thread: no I/O here, only queue the marker
+        name = event.name
+        if event.event_type == keyboard.KEY_UP:
+            self._held.discard(name)
+            return
+        if name not in self.key_map or name in self._held:
+            return  # not mapped, or auto-repeat of a held key
+        self._held.add(name)
+        # event.time is the wall-clock time of the key press, the hook runs a little later
+        timestamp = local_clock() - max(0.0, time.time() - event.time)
+        if timestamp - self._last_press.get(name, -float("inf")) < self.debounce:
+            return
+        self._last_press[name] = timestamp
+        self._queue.put((self.key_map[name], timestamp))
+
+    def _send_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            items = [item]
+            while True:  # drain the burst
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                items.append(item)
+            self.outlet.push_chunk([[marker] for marker, _ in items], [ts for _, ts in items])
+            for marker, ts in items:
+                print(f"[MARKER] {marker} @ {ts}")
+
+    def start_listening(self, key_map=None):
+        """Push a marker on every press of a mapped key (key name -> marker), until stop_listening."""
+        if key_map is not None:
+            self.key_map = dict(key_map)
+        self._sender = threading.Thread(target=self._send_loop, name="marker-sender", daemon=True)
+        self._sender.start()
+        self._hook = keyboard.hook(self._on_key)
+
+    def stop_listening(self):
+        if self._hook is not None:
+            keyboard.unhook(self._hook)
+            self._hook = None
+        if self._sender is not None:
+            self._queue.put(None)
+            self._sender.join()
+            self._sender = None
+
 
 if __name__ == "__main__":
-    marker_pusher = LSLMarkerPusher()
+    import argparse
+    parser = argparse.ArgumentParser(description="Push LSL markers from the keyboard.")
+    parser.add_argument("--map", default="b=blink",
+                        help="Comma-separated key=marker pairs, e.g. b=blink,d=double_blink")
+    parser.add_argument("--debounce", type=float, default=0.05, help="Minimum seconds between two presses of a key.")
+    arg = parser.parse_args()
+    key_map = dict(pair.split("=", 1) for pair in arg.map.split(","))
 
-    print("Press 'b' to send a blink marker. Press 'esc' to quit.")
+    marker_pusher = LSLMarkerPusher(key_map=key_map, debounce=arg.debounce)
+    marker_pusher.start_listening()
 
-    while True:
-        if keyboard.is_pressed('b'):
-            marker_pusher.push_marker("blink")
-            time.sleep(0.3)  # prevent multiple triggers for one press
-        elif keyboard.is_pressed('esc'):
-            print("Exiting...")
-            break
\ No newline at end of file
+    keys = ", ".join(f"'{key}' for {marker}" for key, marker in key_map.items())
+    print(f"Press {keys}. Press 'esc' to quit.")
+    keyboard.wait('esc')  # blocks in the hook thread, no polling
+    print("Exiting...")
+    marker_pusher.stop_listening()
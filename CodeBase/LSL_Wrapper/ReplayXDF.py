@@ -0,0 +1,197 @@
+"""Replay a recorded XDF session into LSL outlets, for testing online consumers offline.
+
+The EEG, Markers and Video streams of the file (the ones load_xdf_data reads) are published again with their
+original metadata (name, type, channel count and format, nominal rate, source_id and the desc tree), so a
+consumer resolves them exactly as it would resolve the live devices. Samples keep their relative timestamps:
+sample t of the recording is pushed with the timestamp start + (t - t0), where t0 is the first timestamp of
+the session and start the local_clock() at the beginning of the replay, which keeps EEG, markers and video
+aligned with each other. The speed factor only sets how fast the samples are sent: 1 is real time, 10 sends
+ten seconds of recording per second, 0 sends everything as fast as possible. Samples go out as chunks (one
+push_chunk per stream every --chunk-time seconds, or of at most --max-chunk samples at full speed).
+
+Example:
+    python ReplayXDF.py session.xdf --speed 10 --wait-consumers 10
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+import pyxdf
+
+import pylsl
+
+REPLAY_TYPES = ("EEG", "Markers", "Video")
+
+
+def _append_desc(element, desc):
+    """Copy a pyxdf desc tree ({name: [str or dict, ...]}) under a pylsl XMLElement."""
+    for name, values in (desc or {}).items():
+        for value in values:
+            if isinstance(value, dict):
+                _append_desc(element.append_child(name), value)
+            else:
+                element.append_child_value(name, "" if value is None else str(value))
+
+
+def _info_value(info, key, default=""):
+    value = info.get(key) or [default]
+    return value[0] if value[0] is not None else default
+
+
+def create_replay_outlet(stream, chunk_size=0, max_buffered=360):
+    """Outlet with the metadata of a recorded stream (pyxdf stream dict)."""
+    info = stream["info"]
+    replay_info = pylsl.StreamInfo(
+        _info_value(info, "name"),
+        _info_value(info, "type"),
+        int(_info_value(info, "channel_count", "1")),
+        float(_info_value(info, "nominal_srate", "0")),
+        _info_value(info, "channel_format", "float32"),
+        _info_value(info, "source_id"),
+    )
+    desc = info.get("desc") or [None]
+    if isinstance(desc[0], dict):
+        _append_desc(replay_info.desc(), desc[0])
+    return pylsl.StreamOutlet(replay_info, chunk_size, max_buffered)
+
+
+def select_streams(streams, types=REPLAY_TYPES):
+    """Streams of the given types; the Video/Markers streams are also matched by name like xdf_loader does."""
+    aliases = {"VideoFrames": "Video", "Markers": "Markers"}
+    selected = []
+    for stream in streams:
+        stream_type = _info_value(stream["info"], "type")
+        stream_name = _info_value(stream["info"], "name")
+        if (stream_type in types or aliases.get(stream_name) in types) and len(stream["time_stamps"]):
+            selected.append(stream)
+    return selected
+
+
+class StreamReplay:
+    """
+    Replay of one recorded stream.
+
+    Args:
+        stream    : pyxdf stream dict
+        t0        : session start (recording clock), common to all the streams
+        speed     : replay speed factor, 0 = as fast as possible
+        chunk_time: seconds of wall clock between two pushes (speed > 0)
+        max_chunk : maximum samples per push_chunk
+    """
+
+    def __init__(self, stream, t0, speed=1.0, chunk_time=0.02, max_chunk=1024):
+        self.stream = stream
+        self.name = _info_value(stream["info"], "name")
+        self.speed = speed
+        self.chunk_time = chunk_time
+        self.max_chunk = max_chunk
+        self.relative_times = np.asarray(stream["time_stamps"], dtype=np.float64) - t0
+        series = stream["time_series"]
+        if isinstance(series, np.ndarray):
+            self.samples = series if series.ndim == 2 else series.reshape(len(series), -1)
+        else:
+            self.samples = [list(sample) for sample in series]  # string stream
+        duration = self.relative_times[-1] - self.relative_times[0]
+        srate = float(_info_value(stream["info"], "nominal_srate", "0"))
+        # At full speed the whole stream can be queued before a consumer pulls: size the buffer for it
+        # (max_buffered is in seconds for regular streams, in hundreds of samples for irregular ones).
+        if srate > 0:
+            max_buffered = 360 if speed else max(360, int(duration) + 10)
+        else:
+            max_buffered = 360 if speed else max(360, len(self.relative_times) // 100 + 10)
+        self.outlet = create_replay_outlet(stream, max_buffered=max_buffered)
+        self.pushed = 0
+
+    def _push(self, lo, hi, start):
+        self.outlet.push_chunk(self.samples[lo:hi], (start + self.relative_times[lo:hi]).tolist())
+        self.pushed = hi
+
+    def run(self, start, stop_event):
+        """Push every sample; start is the local_clock() matching t0, wall time runs `speed` times slower."""
+        n = len(self.relative_times)
+        while self.pushed < n and not stop_event.is_set():
+            if self.speed:
+                position = (pylsl.local_clock() - start) * self.speed
+                due = int(np.searchsorted(self.relative_times, position, side="right"))
+            else:
+                due = n
+            while self.pushed < due:
+                self._push(self.pushed, min(due, self.pushed + self.max_chunk), start)
+            if self.speed and self.pushed < n:
+                # One chunk_time for a dense stream, up to the next sample for a sparse one (markers)
+                next_time = start + self.relative_times[self.pushed] / self.speed
+                stop_event.wait(min(max(next_time - pylsl.local_clock(), self.chunk_time), 1.0))
+
+
+def replay_xdf(filepath, speed=1.0, types=REPLAY_TYPES, chunk_time=0.02, max_chunk=1024, wait_consumers=0.0,
+               linger=2.0, stop_event=None, ready_event=None):
+    """
+    Replay the streams of an XDF file, returns when everything is sent (or stop_event is set).
+
+    Args:
+        filepath       : XDF file
+        speed          : replay speed factor (1 = real time), 0 = as fast as possible
+        types          : stream types to replay
+        chunk_time     : seconds between two pushes of a stream
+        max_chunk      : maximum samples per push_chunk
+        wait_consumers : seconds to wait for every outlet to have a consumer before starting (0 = do not wait)
+        linger         : seconds the outlets stay open after the last sample, so consumers can pull it
+        stop_event     : threading.Event to stop the replay early
+        ready_event    : threading.Event set when the outlets are created
+
+    Returns:
+        dict stream name -> samples pushed
+    """
+    stop_event = stop_event or threading.Event()
+    streams, _ = pyxdf.load_xdf(filepath)
+    streams = select_streams(streams, types)
+    if not streams:
+        raise ValueError(f"No {', '.join(types)} stream found in {filepath}")
+    t0 = min(float(s["time_stamps"][0]) for s in streams)
+    replays = [StreamReplay(s, t0, speed, chunk_time, max_chunk) for s in streams]
+    for replay in replays:
+        print(f"[INFO] Replaying {replay.name} ({_info_value(replay.stream['info'], 'type')}): "
+              f"{len(replay.relative_times)} samples, {replay.relative_times[-1]:.1f} s")
+    if ready_event is not None:
+        ready_event.set()
+
+    if wait_consumers:
+        deadline = time.time() + wait_consumers
+        for replay in replays:
+            if not replay.outlet.wait_for_consumers(max(deadline - time.time(), 0.0)):
+                print(f"[WARN] No consumer for {replay.name}, replaying anyway")
+
+    start = pylsl.local_clock()
+    threads = [threading.Thread(target=r.run, args=(start, stop_event), name=f"replay-{r.name}", daemon=True)
+               for r in replays]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = pylsl.local_clock() - start
+    duration = max(r.relative_times[-1] for r in replays)
+    print(f"[STATS] {duration:.1f} s of recording replayed in {elapsed:.1f} s ({duration / max(elapsed, 1e-9):.1f}x)")
+    stop_event.wait(linger)
+    return {r.name: r.pushed for r in replays}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded XDF session into LSL outlets.")
+    parser.add_argument("filepath", help="XDF file to replay.")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed factor (1 = real time, 10 = ten times faster, 0 = as fast as possible).")
+    parser.add_argument("--types", default=",".join(REPLAY_TYPES), help="Comma-separated stream types to replay.")
+    parser.add_argument("--chunk-time", type=float, default=0.02, help="Seconds between two pushes of a stream.")
+    parser.add_argument("--max-chunk", type=int, default=1024, help="Maximum samples per push.")
+    parser.add_argument("--wait-consumers", type=float, default=0.0,
+                        help="Seconds to wait for a consumer on every stream before starting.")
+    arg = parser.parse_args()
+
+    stop = threading.Event()
+    try:
+        replay_xdf(arg.filepath, speed=arg.speed, types=tuple(arg.types.split(",")), chunk_time=arg.chunk_time,
+                   max_chunk=arg.max_chunk, wait_consumers=arg.wait_consumers, stop_event=stop)
+    except KeyboardInterrupt:
+        stop.set()
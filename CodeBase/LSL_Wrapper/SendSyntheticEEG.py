@@ -0,0 +1,269 @@
+"""Synthetic EEG streams for load testing LSL consumers (blink detectors, recorders).
+
+Every chunk is generated as one float32 NumPy array and sent with a single push_chunk:
+pink background noise, a 10 Hz alpha rhythm, slow drift, line noise, EMG bursts and blink
+templates. Blinks are injected at known times: every blink is written to a CSV log (stream,
+sample index, LSL time of the peak) and can also be sent as a Blink_Index:<n> marker, so a
+detector can be scored against the ground truth. Several streams run at once, one thread each.
+
+Example:
+    python SendSyntheticEEG.py --channels 64 --srate 2000 --streams 2 --duration 60 --log blinks.csv
+"""
+
+import argparse
+import csv
+import threading
+import time
+
+import numpy as np
+from scipy.signal import lfilter
+
+import pylsl
+
+# Pink noise filter (Paul Kellet's economy 1/f approximation)
+PINK_B = np.array([0.049922035, -0.095993537, 0.050612699, -0.004408786])
+PINK_A = np.array([1.0, -2.494956002, 2.017265875, -0.522189400])
+# Unit-variance gain: the output std of the filter for unit white noise is the L2 norm of its impulse response
+# (the slowest pole is 0.995, the response is negligible after a few thousand samples)
+PINK_GAIN = 1.0 / np.sqrt(np.sum(lfilter(PINK_B, PINK_A, np.eye(1, 1 << 14)[0]) ** 2))
+PINK_WARMUP = 1 << 12  # samples run at startup so that the filter state is stationary from the first chunk
+
+
+def blink_template(srate, rise=0.1, fall=0.2):
+    """Unit-peak blink waveform: fast rise, slower decay (about 300 ms in total)."""
+    t_rise = np.arange(int(rise * srate)) / srate
+    t_fall = np.arange(int(fall * srate)) / srate
+    up = np.sin(0.5 * np.pi * t_rise / rise) ** 2
+    down = np.cos(0.5 * np.pi * t_fall / fall) ** 2
+    return np.concatenate([up, down]).astype(np.float32)
+
+
+class SyntheticEEG:
+    """
+    Chunk generator of one synthetic EEG stream (microvolts).
+
+    Args:
+        n_channels      : number of channels
+        srate           : sampling rate (Hz)
+        blink_rate      : mean blinks per minute (Poisson process)
+        blink_amplitude : peak of a blink on the most frontal channel (uV)
+        noise_amplitude : standard deviation of the pink background (uV)
+        alpha_amplitude : amplitude of the 10 Hz rhythm on the posterior channels (uV)
+        line_freq       : line noise frequency (Hz), 0 to disable
+        line_amplitude  : line noise amplitude (uV)
+        drift_amplitude : amplitude of the slow drift (uV)
+        emg_rate        : mean EMG bursts per minute
+        emg_amplitude   : EMG burst standard deviation (uV)
+        seed            : random seed
+    """
+
+    def __init__(self, n_channels=8, srate=250.0, blink_rate=15.0, blink_amplitude=150.0, noise_amplitude=10.0,
+                 alpha_amplitude=5.0, line_freq=50.0, line_amplitude=5.0, drift_amplitude=30.0, emg_rate=4.0,
+                 emg_amplitude=20.0, seed=None):
+        self.n_channels = n_channels
+        self.srate = srate
+        self.rng = np.random.default_rng(seed)
+        self.blink_rate = blink_rate
+        self.blink_amplitude = blink_amplitude
+        self.noise_amplitude = noise_amplitude
+        self.alpha_amplitude = alpha_amplitude
+        self.line_freq = line_freq
+        self.line_amplitude = line_amplitude
+        self.emg_rate = emg_rate
+        self.emg_amplitude = emg_amplitude
+
+        # Channels are ordered front to back: blinks on the first ones, alpha on the last ones
+        depth = np.linspace(0.0, 1.0, n_channels, dtype=np.float32)
+        self.blink_weights = np.exp(-4.0 * depth)
+        self.alpha_weights = depth
+        self.template = blink_template(srate)
+        self.drift_freqs = self.rng.uniform(0.01, 0.1, n_channels)
+        self.drift_phases = self.rng.uniform(0, 2 * np.pi, n_channels)
+        self.drift_amplitude = drift_amplitude
+        self.line_phases = self.rng.uniform(0, 2 * np.pi, n_channels)
+
+        _, self._pink_state = lfilter(PINK_B, PINK_A, self.rng.standard_normal((PINK_WARMUP, n_channels)), axis=0,
+                                      zi=np.zeros((len(PINK_A) - 1, n_channels)))
+        self.sample_index = 0
+        self._next_blink = self._interval(blink_rate)
+        self._active_blinks = []    # onset sample index of the blinks still running
+        self._next_emg = self._interval(emg_rate)
+        self._active_emg = []       # (start, end) sample index of the EMG bursts still running
+
+    def _interval(self, rate_per_minute):
+        """Samples to the next event of a Poisson process."""
+        if rate_per_minute <= 0:
+            return np.inf
+        return int(self.rng.exponential(60.0 / rate_per_minute) * self.srate)
+
+    def generate(self, n):
+        """
+        Next n samples.
+
+        Returns:
+            chunk  : np.ndarray (n, n_channels) float32
+            blinks : list of sample indices (stream counting from 0) of the blink peaks started in this chunk
+        """
+        start = self.sample_index
+        t = (start + np.arange(n)) / self.srate
+
+        white = self.rng.standard_normal((n, self.n_channels))
+        pink, self._pink_state = lfilter(PINK_B, PINK_A, white, axis=0, zi=self._pink_state)
+        chunk = (pink * (PINK_GAIN * self.noise_amplitude)).astype(np.float32)
+
+        chunk += np.outer(np.sin(2 * np.pi * 10.0 * t), self.alpha_weights * self.alpha_amplitude).astype(np.float32)
+        chunk += (self.drift_amplitude * np.sin(2 * np.pi * np.outer(t, self.drift_freqs) + self.drift_phases)
+                  ).astype(np.float32)
+        if self.line_freq:
+            chunk += (self.line_amplitude * np.sin(2 * np.pi * self.line_freq * t[:, None] + self.line_phases)
+                      ).astype(np.float32)
+
+        # EMG bursts: 0.2-1 s of broadband noise on every channel
+        end = start + n
+        while self._next_emg < end:
+            burst_end = self._next_emg + int(self.rng.uniform(0.2, 1.0) * self.srate)
+            self._active_emg.append((self._next_emg, burst_end))
+            self._next_emg = burst_end + self._interval(self.emg_rate)
+        for burst_start, burst_end in self._active_emg:
+            lo, hi = max(burst_start, start) - start, min(burst_end, end) - start
+            if lo < hi:
+                chunk[lo:hi] += self.rng.normal(0, self.emg_amplitude, (hi - lo, self.n_channels)).astype(np.float32)
+        self._active_emg = [burst for burst in self._active_emg if burst[1] > end]
+
+        # Blinks, including the ones that started in a previous chunk
+        new_blinks = []
+        while self._next_blink < end:
+            self._active_blinks.append(self._next_blink)
+            new_blinks.append(self._next_blink + int(0.1 * self.srate))  # peak of the template
+            self._next_blink += len(self.template) + self._interval(self.blink_rate)
+        length = len(self.template)
+        for onset in self._active_blinks:
+            lo, hi = max(onset, start), min(onset + length, end)
+            if lo < hi:
+                chunk[lo - start:hi - start] += np.outer(self.template[lo - onset:hi - onset],
+                                                         self.blink_weights * self.blink_amplitude)
+        self._active_blinks = [onset for onset in self._active_blinks if onset + length > end]
+
+        self.sample_index = end
+        return chunk, new_blinks
+
+
+class BlinkLog:
+    """Thread-safe CSV log of the injected blinks (and optional ground-truth marker outlet)."""
+
+    def __init__(self, path=None, marker_outlet=None):
+        self.lock = threading.Lock()
+        self.marker_outlet = marker_outlet
+        self.count = 0
+        self._file = open(path, mode="w", newline="") if path else None
+        self._writer = csv.writer(self._file) if self._file else None
+        if self._writer:
+            self._writer.writerow(["stream", "blink", "sample_index", "lsl_time"])
+
+    def add(self, stream_name, sample_index, lsl_time):
+        with self.lock:
+            self.count += 1
+            if self._writer:
+                self._writer.writerow([stream_name, self.count, sample_index, f"{lsl_time:.6f}"])
+            if self.marker_outlet is not None:
+                self.marker_outlet.push_sample([f"Blink_Index:{self.count}"], lsl_time)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+def create_outlet(name, stream_type, n_channels, srate, source_id):
+    info = pylsl.StreamInfo(name, stream_type, n_channels, srate, "float32", source_id)
+    info.desc().append_child_value("manufacturer", "Vigilens synthetic EEG")
+    chns = info.desc().append_child("channels")
+    for chan_ix in range(n_channels):
+        ch = chns.append_child("channel")
+        ch.append_child_value("label", f"Ch{chan_ix + 1}")
+        ch.append_child_value("unit", "microvolts")
+        ch.append_child_value("type", "EEG")
+    # transmission chunk of about 20 ms, 360 s outgoing buffer
+    return pylsl.StreamOutlet(info, max(1, int(srate * 0.02)), 360)
+
+
+def run_stream(generator, outlet, name, stop_event, blink_log=None, chunk_time=0.02, stats=None):
+    """
+    Send the generator output in real time: every chunk_time, the samples due since the start are generated
+    as one array and sent with one push_chunk (timestamp of the last sample).
+    """
+    srate = generator.srate
+    start_time = pylsl.local_clock()
+    late = 0.0
+    while not stop_event.is_set():
+        due = int((pylsl.local_clock() - start_time) * srate) - generator.sample_index
+        if due > 0:
+            first = generator.sample_index
+            chunk, blinks = generator.generate(due)
+            outlet.push_chunk(chunk, start_time + (first + due - 1) / srate)
+            if blink_log is not None:
+                for peak in blinks:
+                    blink_log.add(name, peak, start_time + peak / srate)
+            # How far behind real time the generator is (should stay near one chunk)
+            late = max(late, due / srate)
+        stop_event.wait(chunk_time)
+    if stats is not None:
+        stats[name] = {"samples": generator.sample_index, "max_chunk_s": late,
+                       "rate": generator.sample_index / max(pylsl.local_clock() - start_time, 1e-9)}
+
+
+def main(name="SyntheticEEG", stream_type="EEG", n_channels=8, srate=250.0, n_streams=1, duration=None,
+         log_path=None, markers=False, seed=None, chunk_time=0.02, **generator_options):
+    blink_log = BlinkLog(log_path, pylsl.StreamOutlet(pylsl.StreamInfo(
+        f"{name}_Blinks", "Markers", 1, 0, "string", "synthetic_blinks")) if markers else None)
+    stop_event = threading.Event()
+    stats = {}
+    threads = []
+    for i in range(n_streams):
+        stream_name = name if n_streams == 1 else f"{name}_{i + 1}"
+        generator = SyntheticEEG(n_channels, srate, seed=None if seed is None else seed + i, **generator_options)
+        outlet = create_outlet(stream_name, stream_type, n_channels, srate, f"synthetic_eeg_{i + 1:03d}")
+        threads.append(threading.Thread(target=run_stream, name=stream_name, daemon=True,
+                                        args=(generator, outlet, stream_name, stop_event, blink_log, chunk_time,
+                                              stats)))
+    print(f"now sending {n_streams} x {n_channels} channels at {srate:g} Hz...")
+    cpu_start, wall_start = time.process_time(), time.time()
+    for thread in threads:
+        thread.start()
+    try:
+        stop_event.wait(duration)
+    except KeyboardInterrupt:
+        pass
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+    blink_log.close()
+
+    wall = time.time() - wall_start
+    for stream_name, s in stats.items():
+        print(f"[STATS] {stream_name}: {s['samples']} samples, {s['rate']:.1f} Hz effective, "
+              f"largest chunk {s['max_chunk_s'] * 1000:.0f} ms")
+    print(f"[STATS] {blink_log.count} blinks injected, CPU {100 * (time.process_time() - cpu_start) / wall:.0f} % "
+          f"of one core")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--name", default="SyntheticEEG", help="Name of the created stream(s).")
+    parser.add_argument("--type", default="EEG", help="Type of the created stream(s).")
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--srate", type=float, default=250.0)
+    parser.add_argument("--streams", type=int, default=1, help="Number of streams sent in parallel.")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to send (default: until Ctrl+C).")
+    parser.add_argument("--blink-rate", type=float, default=15.0, help="Blinks per minute.")
+    parser.add_argument("--blink-amplitude", type=float, default=150.0, help="Blink peak (uV).")
+    parser.add_argument("--line-freq", type=float, default=50.0, help="Line noise frequency, 0 to disable.")
+    parser.add_argument("--emg-rate", type=float, default=4.0, help="EMG bursts per minute.")
+    parser.add_argument("--log", default=None, help="CSV file of the injected blinks.")
+    parser.add_argument("--markers", action="store_true", help="Also send every blink as a Blink_Index marker.")
+    parser.add_argument("--seed", type=int, default=None)
+    arg = parser.parse_args()
+
+    main(name=arg.name, stream_type=arg.type, n_channels=arg.channels, srate=arg.srate, n_streams=arg.streams,
+         duration=arg.duration, log_path=arg.log, markers=arg.markers, seed=arg.seed,
+         blink_rate=arg.blink_rate, blink_amplitude=arg.blink_amplitude, line_freq=arg.line_freq,
+         emg_rate=arg.emg_rate)
@@ -0,0 +1,312 @@
+"""Latency benchmark of the LSL acquisition chain on loopback outlet/inlet pairs.
+
+Data streams: a sender thread emulates an amplifier the way SendDataAdvanced.py pushes (one push_chunk of
+chunk_size samples stamped with local_clock() once the last sample is acquired), the receiver blocks on
+pull_sample for the first sample and takes the rest with pull_chunk(timeout=0). Channel 0 carries the sample
+index, so each received sample is matched to its acquisition time and push time:
+    chunking    : push time - acquisition time (waiting for the chunk to fill)
+    transport   : receive time - push time (liblsl, loopback TCP, pull loop)
+    end_to_end  : receive time - acquisition time
+    timestamp   : received timestamp + time_correction - acquisition time (error of the stamped time)
+    clock_offset: inlet.time_correction() values (0 on the same host: any deviation is error)
+
+Markers: a cue simulator waits for frame boundaries like FrameScheduler in experiment_protocol.py (sleep,
+then spin for the last 2 ms as core.wait(hogCPUperiod=0.002) does) and pushes the marker right after the
+"flip"; flip_jitter is push time - ideal flip time, marker_transport receive time - push time. The 'sleep'
+wait mode (no spinning) is measured as a reference.
+
+The report (JSON) holds, for every configuration and metric, the percentiles and a histogram on fixed
+log-spaced bins (ms), so two reports can be compared bin by bin; --baseline prints the p50/p99 change
+against a previous report.
+
+Usage: python bench_latency.py --srates 250,1000,2000 --channels 4,64 --chunk-sizes 1,8,32,128 --duration 2
+"""
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+
+import numpy as np
+import pylsl
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+HISTOGRAM_EDGES_MS = np.logspace(-3, 3, 61)  # 1 us .. 1 s, 10 bins per decade
+SPIN_PERIOD = 0.002  # same as the hogCPUperiod of FrameScheduler
+
+
+def wait_until(deadline, spin=True):
+    """Sleep until `deadline` (local_clock), spinning for the last SPIN_PERIOD seconds when spin is set."""
+    while True:
+        remaining = deadline - pylsl.local_clock()
+        if remaining <= 0:
+            return
+        if not spin:
+            time.sleep(remaining)
+        elif remaining > SPIN_PERIOD:
+            time.sleep(remaining - SPIN_PERIOD)
+
+
+def summarize(values_s):
+    """Percentiles (ms) and histogram counts of a latency sample (seconds)."""
+    values = np.asarray(values_s, dtype=np.float64) * 1000.0
+    if values.size == 0:
+        return {"count": 0}
+    summary = {"count": int(values.size), "mean": float(values.mean()), "std": float(values.std()),
+               "min": float(values.min()), "max": float(values.max())}
+    summary.update({f"p{p:g}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))})
+    # Negative values (timestamp error) are binned by magnitude, the sign is in the mean/percentiles
+    summary["histogram"] = np.histogram(np.abs(values), bins=HISTOGRAM_EDGES_MS)[0].tolist()
+    return summary
+
+
+def _loopback_pair(info, max_buflen=360):
+    outlet = pylsl.StreamOutlet(info)
+    inlet = pylsl.StreamInlet(pylsl.resolve_byprop("source_id", info.source_id(), 1, 5.0)[0],
+                              max_buflen=max_buflen)
+    inlet.open_stream(timeout=5.0)
+    outlet.wait_for_consumers(5.0)
+    return outlet, inlet
+
+
+def _receive(inlet, n_expected, deadline, on_chunk):
+    # pull_chunk with a timeout keeps waiting for more samples until max_samples (or a gap of `timeout`),
+    # which would be measured as latency: block on the first sample only, then take what is already there.
+    received = 0
+    while received < n_expected and pylsl.local_clock() < deadline:
+        sample, timestamp = inlet.pull_sample(timeout=0.1)
+        if timestamp is None:
+            continue
+        on_chunk(pylsl.local_clock(), [sample], [timestamp])
+        data, timestamps = inlet.pull_chunk(timeout=0.0, max_samples=4096)
+        if timestamps:
+            on_chunk(pylsl.local_clock(), data, timestamps)
+        received += 1 + len(timestamps)
+    return received
+
+
+def bench_stream(srate, n_channels, chunk_size, duration=2.0, warmup=0.2):
+    """Loopback latency of one stream configuration, returns the report entry."""
+    source_id = f"bench_latency_{srate:g}_{n_channels}_{chunk_size}"
+    info = pylsl.StreamInfo("BenchLatency", "EEG", n_channels, srate, "float32", source_id)
+    outlet, inlet = _loopback_pair(info)
+
+    n_samples = int(srate * duration)
+    acquired = np.empty(n_samples)
+    pushed = np.full(n_samples, np.nan)
+    received = {"recv": [], "seq": [], "ts": []}
+    corrections = []
+
+    def on_chunk(recv_time, data, timestamps):
+        received["recv"].append(np.full(len(timestamps), recv_time))
+        received["seq"].append(np.asarray(data, dtype=np.float64)[:, 0].astype(np.int64))
+        received["ts"].append(np.asarray(timestamps))
+
+    block = np.random.default_rng(0).standard_normal((chunk_size, n_channels)).astype(np.float32)
+    # The first time_correction call takes a few hundred ms: do it before the data flows
+    corrections.append(inlet.time_correction(timeout=2.0))
+    t_start = pylsl.local_clock() + 0.1
+    acquired[:] = t_start + np.arange(n_samples) / srate
+
+    def send():
+        for first in range(0, n_samples, chunk_size):
+            last = min(first + chunk_size, n_samples)
+            wait_until(acquired[last - 1])
+            block[:last - first, 0] = np.arange(first, last)
+            now = pylsl.local_clock()
+            outlet.push_chunk(block[:last - first], now)
+            pushed[first:last] = now
+
+    sender = threading.Thread(target=send, name="bench-sender", daemon=True)
+    sender.start()
+    n_received = _receive(inlet, n_samples, t_start + duration + 2.0, on_chunk)
+    sender.join()
+    for _ in range(10):
+        corrections.append(inlet.time_correction(timeout=2.0))
+    inlet.close_stream()
+    del inlet, outlet
+
+    recv = np.concatenate(received["recv"]) if received["recv"] else np.array([])
+    seq = np.concatenate(received["seq"]) if received["seq"] else np.array([], dtype=np.int64)
+    ts = np.concatenate(received["ts"]) if received["ts"] else np.array([])
+    keep = (seq >= 0) & (seq < n_samples)
+    recv, seq, ts = recv[keep], seq[keep], ts[keep]
+    steady = acquired[seq] >= t_start + warmup
+    recv, seq, ts = recv[steady], seq[steady], ts[steady]
+    offset = float(np.median(corrections))
+    return {
+        "srate": srate, "channels": n_channels, "chunk_size": chunk_size, "duration": duration,
+        "samples": n_samples, "received": int(n_received), "lost": int(n_samples - n_received),
+        "metrics": {
+            "chunking": summarize(pushed[seq] - acquired[seq]),
+            "transport": summarize(recv - pushed[seq]),
+            "end_to_end": summarize(recv - acquired[seq]),
+            "timestamp": summarize(ts + offset - acquired[seq]),
+            "clock_offset": summarize(corrections),
+        },
+    }
+
+
+def bench_markers(n_cues=100, frame_rate=60.0, cue_frames=(6, 30), spin=True, seed=0):
+    """Cue simulator: markers pushed right after simulated flips, like FrameScheduler."""
+    info = pylsl.StreamInfo("BenchMarkers", "Markers", 1, 0, "string", f"bench_markers_{int(spin)}")
+    outlet, inlet = _loopback_pair(info)
+    rng = np.random.default_rng(seed)
+    frame = 1.0 / frame_rate
+    t_start = pylsl.local_clock() + 0.1
+    # Cues on frame boundaries, a random number of frames apart (like the task timelines)
+    flips = t_start + np.cumsum(rng.integers(cue_frames[0], cue_frames[1] + 1, n_cues)) * frame
+    pushed = np.full(n_cues, np.nan)
+    received = {}
+
+    def send():
+        for i, flip in enumerate(flips):
+            wait_until(flip, spin=spin)
+            now = pylsl.local_clock()
+            outlet.push_sample([f"cue:{i}"], now)
+            pushed[i] = now
+
+    def on_chunk(recv_time, data, timestamps):
+        for sample in data:
+            received[int(sample[0].split(":")[1])] = recv_time
+
+    sender = threading.Thread(target=send, name="bench-cues", daemon=True)
+    sender.start()
+    _receive(inlet, n_cues, flips[-1] + 2.0, on_chunk)
+    sender.join()
+    inlet.close_stream()
+    del inlet, outlet
+
+    index = np.array(sorted(received), dtype=np.int64)
+    recv = np.array([received[i] for i in index])
+    return {
+        "wait": "hybrid" if spin else "sleep", "frame_rate": frame_rate, "cues": n_cues,
+        "received": int(len(index)), "lost": int(n_cues - len(index)),
+        "metrics": {
+            "flip_jitter": summarize(pushed - flips),
+            "marker_transport": summarize(recv - pushed[index]),
+        },
+    }
+
+
+def config_key(entry):
+    if "srate" in entry:
+        return f"{entry['srate']:g}Hz/{entry['channels']}ch/chunk{entry['chunk_size']}"
+    return f"markers/{entry['wait']}"
+
+
+def compare(report, baseline, threshold=0.2):
+    """Print the p50/p99 change of every metric against a baseline report, returns the regressions."""
+    old = {config_key(e): e for e in baseline.get("streams", []) + baseline.get("markers", [])}
+    regressions = []
+    print(f"\n{'configuration':<28} {'metric':<17} {'p50 ms':>17} {'p99 ms':>17}")
+    for entry in report["streams"] + report["markers"]:
+        key = config_key(entry)
+        if key not in old:
+            continue
+        for name, new in entry["metrics"].items():
+            ref = old[key]["metrics"].get(name, {})
+            if not new.get("count") or not ref.get("count") or name in ("timestamp", "clock_offset"):
+                continue
+            cells = [f"{ref[p]:7.3f}->{new[p]:7.3f}" for p in ("p50", "p99")]
+            flag = ""
+            if new["p99"] > ref["p99"] * (1 + threshold) and new["p99"] - ref["p99"] > 0.5:
+                flag = "  [REGRESSION]"
+                regressions.append((key, name))
+            print(f"{key:<28} {name:<17} {cells[0]:>17} {cells[1]:>17}{flag}")
+    return regressions
+
+
+def plot_histograms(report, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    metrics = ("chunking", "transport", "end_to_end")
+    fig, axes = plt.subplots(1, len(metrics) + 1, figsize=(5 * (len(metrics) + 1), 4), sharey=False)
+    centers = np.sqrt(HISTOGRAM_EDGES_MS[:-1] * HISTOGRAM_EDGES_MS[1:])
+    for ax, name in zip(axes, metrics):
+        for entry in report["streams"]:
+            counts = np.array(entry["metrics"][name].get("histogram", []))
+            if counts.sum():
+                ax.step(centers, counts / counts.sum(), where="mid", label=config_key(entry))
+        ax.set_xscale("log")
+        ax.set_title(name)
+        ax.set_xlabel("latency (ms)")
+    for entry in report["markers"]:
+        counts = np.array(entry["metrics"]["flip_jitter"].get("histogram", []))
+        if counts.sum():
+            axes[-1].step(centers, counts / counts.sum(), where="mid", label=config_key(entry))
+    axes[-1].set_xscale("log")
+    axes[-1].set_title("flip_jitter")
+    axes[-1].set_xlabel("|jitter| (ms)")
+    axes[0].set_ylabel("fraction of samples")
+    for ax in axes:
+        ax.legend(fontsize=6)
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+
+
+def main(srates=(250.0, 1000.0, 2000.0), channels=(4, 64), chunk_sizes=(1, 8, 32, 128), duration=2.0,
+         n_cues=100, output="latency_report.json", baseline=None, plot=None):
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"), "host": platform.node(), "platform": platform.platform(),
+            "python": platform.python_version(), "pylsl": getattr(pylsl, "__version__", ""),
+            "liblsl": pylsl.library_version(), "duration": duration,
+        },
+        "histogram_edges_ms": HISTOGRAM_EDGES_MS.tolist(),
+        "streams": [],
+        "markers": [],
+    }
+    print(f"{'configuration':<28} {'lost':>5} {'chunk p50':>10} {'transp p50':>11} {'transp p99':>11} "
+          f"{'e2e p99':>9} {'ts err p99':>11}   (ms)")
+    for srate in srates:
+        for n_channels in channels:
+            for chunk_size in chunk_sizes:
+                entry = bench_stream(srate, n_channels, chunk_size, duration)
+                report["streams"].append(entry)
+                m = entry["metrics"]
+                if not m["transport"].get("count"):
+                    print(f"{config_key(entry):<28} no sample received")
+                    continue
+                print(f"{config_key(entry):<28} {entry['lost']:>5} {m['chunking']['p50']:>10.3f} "
+                      f"{m['transport']['p50']:>11.3f} {m['transport']['p99']:>11.3f} "
+                      f"{m['end_to_end']['p99']:>9.3f} {m['timestamp']['p99']:>11.3f}")
+    for spin in (True, False):
+        entry = bench_markers(n_cues, spin=spin)
+        report["markers"].append(entry)
+        m = entry["metrics"]
+        print(f"{config_key(entry):<28} {entry['lost']:>5} flip jitter p50 {m['flip_jitter']['p50']:.3f} "
+              f"p99 {m['flip_jitter']['p99']:.3f}, transport p99 {m['marker_transport']['p99']:.3f}")
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nReport written to {output}")
+    if plot:
+        plot_histograms(report, plot)
+        print(f"Histograms written to {plot}")
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(report, json.load(f))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--srates", default="250,1000,2000", help="Comma-separated sampling rates (Hz).")
+    parser.add_argument("--channels", default="4,64", help="Comma-separated channel counts.")
+    parser.add_argument("--chunk-sizes", default="1,8,32,128", help="Comma-separated samples per push.")
+    parser.add_argument("--duration", default=2.0, type=float, help="Seconds per stream configuration.")
+    parser.add_argument("--cues", default=100, type=int, help="Cues per marker measurement.")
+    parser.add_argument("--output", default="latency_report.json", help="JSON report.")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare with (exit 1 on regression).")
+    parser.add_argument("--plot", default=None, help="PNG file for the latency histograms (needs matplotlib).")
+    arg = parser.parse_args()
+
+    main(srates=[float(v) for v in arg.srates.split(",")], channels=[int(v) for v in arg.channels.split(",")],
+         chunk_sizes=[int(v) for v in arg.chunk_sizes.split(",")], duration=arg.duration, n_cues=arg.cues,
+         output=arg.output, baseline=arg.baseline, plot=arg.plot)